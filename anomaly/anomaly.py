@@ -1,13 +1,47 @@
 '''This script sends emails based on anomalies from the data.'''
-import datetime
 from os import environ as ENV
 
 import json
-import numpy as np
-import boto3
 from dotenv import load_dotenv
 from pymssql import connect
-import pandas as pd
+from metrics import start_run
+from notifications import build_messages, dispatch, get_transport, render_email
+from thresholds import N_SIGMA
+
+LOCAL_MODE = "local"
+SQL_MODE = "sql"
+ONLINE_MODE = "online"
+DETECTORS_MODE = "detectors"
+
+# The NumPy engines and boto3 are imported by the modes that use them, so the
+# default sql mode starts without loading either
+_s3_client = None
+
+# Sent a digest of every plant's anomalies unless ANOMALY_DIGEST_RECIPIENTS names others
+DIGEST_RECIPIENTS = ",".join([
+    "trainee.isaac.schaessens.coleman@sigmalabs.co.uk",
+    "trainee.mahin.rahman@sigmalabs.co.uk",
+    "trainee.saniya.shaikh@sigmalabs.co.uk"
+])
+
+# Per-plant means and deviations over the last hour, computed with window functions,
+# and each reading flagged against its own plant's baseline.
+FLAGGED_READINGS_QUERY = """WITH LastHour AS (
+    SELECT PlantID, TimeRecorded, SoilMoisture, Temperature,
+           AVG(SoilMoisture) OVER (PARTITION BY PlantID) AS MoistureMean,
+           STDEVP(SoilMoisture) OVER (PARTITION BY PlantID) AS MoistureDeviation,
+           AVG(Temperature) OVER (PARTITION BY PlantID) AS TemperatureMean,
+           STDEVP(Temperature) OVER (PARTITION BY PlantID) AS TemperatureDeviation
+    FROM s_epsilon.PlantMeasurementRecord
+    WHERE TimeRecorded >= DATEADD(hour, -1, GETDATE())
+), Flagged AS (
+    SELECT PlantID, TimeRecorded, SoilMoisture, Temperature,
+           CASE WHEN ABS(SoilMoisture - MoistureMean) > %(n_sigma)s * MoistureDeviation
+                THEN 1 ELSE 0 END AS MoistureAnomaly,
+           CASE WHEN ABS(Temperature - TemperatureMean) > %(n_sigma)s * TemperatureDeviation
+                THEN 1 ELSE 0 END AS TemperatureAnomaly
+    FROM LastHour
+)"""
 
 
 def handler(event, context) -> dict:
@@ -21,6 +55,16 @@ def handler(event, context) -> dict:
     }
 
 
+def get_s3_client():
+    """Returns an S3 client, created on first use and kept for warm invocations"""
+
+    global _s3_client
+    if _s3_client is None:
+        import boto3
+        _s3_client = boto3.client('s3')
+    return _s3_client
+
+
 def get_database_connection(config):
     '''This function returns a database connection.'''
 
@@ -41,35 +85,42 @@ def fetch_data_from_last_hour(conn):
         return cur.fetchall()
 
 
-def search_anomalies(data: list[dict]):
-    """Filters through the data and finds any anomalies via
-    standard deviation"""
+def fetch_data_since(conn, last_id: int):
+    """Retrieves the readings recorded after the reading with the given ID,
+    in the order they were recorded"""
+    with conn.cursor(as_dict=True) as cur:
+        query = """SELECT MeasurementRecordID, PlantID, TimeRecorded, SoilMoisture, Temperature
+FROM s_epsilon.PlantMeasurementRecord
+WHERE MeasurementRecordID > %d
+ORDER BY MeasurementRecordID;"""
+        cur.execute(query, (int(last_id),))
+        return cur.fetchall()
 
-    anomalies = []
-    moisture_values = [row['SoilMoisture'] for row in data]
-    temperature_values = [row['Temperature'] for row in data]
-    moisture_deviation = 2 * np.std(moisture_values)
-    temperature_deviation = 2 * np.std(temperature_values)
-    temperature_mean = np.mean(temperature_values)
-    moisture_mean = np.mean(moisture_values)
-    for row in data:
-        moisture_anomaly = False
-        temperature_anomaly = False
-        if abs(row['SoilMoisture'] - moisture_mean) > moisture_deviation:
-            moisture_anomaly = True
-        if abs(row['Temperature'] - temperature_mean) > temperature_deviation:
-            temperature_anomaly = True
-        if moisture_anomaly or temperature_anomaly:
-            anomalies.append({
-                'timestamp': row['TimeRecorded'],
-                'plant_id': row['PlantID'],
-                'moisture_anomaly': moisture_anomaly,
-                'temperature_anomaly': temperature_anomaly,
-                'moisture_value': row['SoilMoisture'],
-                'temperature_value': row['Temperature']
-            })
-
-    return anomalies
+
+def fetch_anomaly_summary_from_sql(conn, n_sigma: float = N_SIGMA) -> list[dict]:
+    """Retrieves the number of anomalies of each plant from the last hour, most
+    anomalous first, in the same format as plant_anomaly_info.
+    Only one summary row per anomalous plant is sent back by the database."""
+
+    with conn.cursor(as_dict=True) as cur:
+        query = FLAGGED_READINGS_QUERY + """
+SELECT Flagged.PlantID, Plant.Name AS PlantName,
+       SUM(Flagged.TemperatureAnomaly) AS TemperatureAnomalies,
+       SUM(Flagged.MoistureAnomaly) AS MoistureAnomalies
+FROM Flagged
+JOIN s_epsilon.Plant Plant ON Flagged.PlantID = Plant.PlantID
+WHERE Flagged.MoistureAnomaly = 1 OR Flagged.TemperatureAnomaly = 1
+GROUP BY Flagged.PlantID, Plant.Name
+ORDER BY SUM(Flagged.TemperatureAnomaly) + SUM(Flagged.MoistureAnomaly) DESC,
+         Flagged.PlantID;"""
+        cur.execute(query, {'n_sigma': float(n_sigma)})
+        return [{
+            'plant_id': row['PlantID'],
+            'plant_name': row['PlantName'],
+            'temp_anomaly_num': row['TemperatureAnomalies'],
+            'moisture_anomaly_num': row['MoistureAnomalies'],
+            'total_anomaly_num': row['TemperatureAnomalies'] + row['MoistureAnomalies']
+        } for row in cur.fetchall()]
 
 
 def plant_anomaly_info(conn, anomalies: list[dict]):
@@ -81,32 +132,8 @@ def plant_anomaly_info(conn, anomalies: list[dict]):
         of soil moisture anomalies (in the last hour).
         e.g. {'plant_id': 47, 'temp_anomaly_num': 1, 'moisture_anomaly_num': 76, 'total_anomaly_num': 77}"""
 
-    plant_id_name_dict = get_plant_id_name_dict(conn)
-
-    # dataframe with each row being representing a plant with an anomaly (from the last hour)
-    anomaly_df = pd.DataFrame(anomalies)
-
-    plant_ids_with_anomalies = anomaly_df["plant_id"].unique()
-
-    anomaly_info = []
-    for plant_id in plant_ids_with_anomalies:
-
-        # Dataframe with anomaly rows for specific plant id
-        plant_id_df = anomaly_df[anomaly_df['plant_id'] == plant_id]
-
-        # Number of temperature anomalies
-        plant_id_temp_df = plant_id_df[plant_id_df["temperature_anomaly"] == True]
-        num_of_temp_anomalies = len(plant_id_temp_df.index)
-
-        # number of moisture anomalies
-        plant_id_moisture_df = plant_id_df[plant_id_df["moisture_anomaly"] == True]
-        num_of_moisture_anomalies = len(plant_id_moisture_df.index)
-
-        anomaly_info.append({"plant_id": plant_id, "plant_name": plant_id_name_dict[plant_id], "temp_anomaly_num": num_of_temp_anomalies,
-                            "moisture_anomaly_num": num_of_moisture_anomalies, "total_anomaly_num": num_of_temp_anomalies+num_of_moisture_anomalies})
-
-    return sorted(
-        anomaly_info, key=lambda x: x["total_anomaly_num"], reverse=True)
+    from detection import summarise_anomalies
+    return summarise_anomalies(anomalies, get_plant_id_name_dict(conn))
 
 
 def get_plant_id_name_dict(conn) -> dict:
@@ -125,66 +152,72 @@ def get_plant_id_name_dict(conn) -> dict:
     return plant_id_name_dict
 
 
-def email_html(anomaly_data: list[dict]) -> str:
-    """This function accepts a list of dictionaries of anomaly data for plants
-     and returns a html formatted string intended for an email. """
-
-    current_datetime = datetime.datetime.now()
-    one_hour_ago = current_datetime - datetime.timedelta(hours=1)
-
-    html_table_sub_string = ""
-    for plant in anomaly_data:
-        html_table_sub_string += f"""<tr>
-                                    <td>{plant["plant_id"]}</td>
-                                    <td>{plant["plant_name"]}</td>
-                                    <td>{plant["total_anomaly_num"]}</td>
-                                    <td>{plant["temp_anomaly_num"]}</td>
-                                    <td>{plant["moisture_anomaly_num"]}</td>
-                                    </tr>"""
-
-    html_string = f"""
-
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <title>Anomaly Report from the Hour</title>
-            </head>
-            <body>
-                <h1>Anomaly Table</h1>
-                <p>Here is a table of measurement anomalies of the plants in the last hour  ({datetime.datetime.strftime(one_hour_ago, "%H:%M:%S")} to {datetime.datetime.strftime(current_datetime, "%H:%M:%S")}).</p>
- 
-                <table>
-                    <tr>
-                        <th>Plant ID</th>
-                        <th>Plant Name</th>
-                        <th>Total Number of Anomalies</th>
-                        <th>Number of Temperature Anomalies</th>
-                        <th>Number of Soil Moisture Anomalies</th>
-                    </tr>
-    
-                    {html_table_sub_string}
-                </table>
-
-            </body>
-            </html>
-                    """
-
-    return html_string
+def get_plant_botanist_dict(conn) -> dict:
+    """Returns the botanist who took each plant's latest reading, which is the
+    botanist currently responsible for it.
+    e.g. {47: {'email': 'carl.linnaeus@lnhm.co.uk', 'name': 'Carl Linnaeus'}}"""
 
+    with conn.cursor(as_dict=True) as cur:
+        query = """WITH Latest AS (
+    SELECT PlantID, BotanistID,
+           ROW_NUMBER() OVER (PARTITION BY PlantID ORDER BY MeasurementRecordID DESC) AS RowNumber
+    FROM s_epsilon.PlantMeasurementRecord
+)
+SELECT Latest.PlantID, Botanist.Email, Botanist.FirstName, Botanist.LastName
+FROM Latest
+JOIN s_epsilon.Botanist Botanist ON Latest.BotanistID = Botanist.BotanistID
+WHERE Latest.RowNumber = 1;"""
+        cur.execute(query)
+        return {row['PlantID']: {'email': row['Email'],
+                                 'name': f"{row['FirstName']} {row['LastName']}"}
+                for row in cur.fetchall()}
 
-def main():
-    """Main function (script)."""
-
-    load_dotenv()
 
-    connection = get_database_connection(ENV)
+def email_html(anomaly_data: list[dict]) -> str:
+    """This function accepts a list of dictionaries of anomaly data for plants
+     and returns a html formatted string intended for an email. """
 
-    last_hours_data = fetch_data_from_last_hour(connection)
+    return render_email(anomaly_data)
+
+
+def get_plant_anomaly_list(conn, mode: str = LOCAL_MODE) -> list[dict]:
+    """Returns the per-plant anomaly summary for the last hour.
+    In sql mode the database computes it; in online mode only readings recorded
+    since the last run are fetched and checked against each plant's persisted
+    running statistics; in detectors mode the last hour is fetched and run through
+    the configured detectors; in local mode the last hour is fetched and analysed
+    here against each plant's mean and deviation."""
+
+    if mode == SQL_MODE:
+        plant_anomaly_list = fetch_anomaly_summary_from_sql(conn)
+        print(f"Anomalies detected in {len(plant_anomaly_list)} plants.")
+        return plant_anomaly_list
+
+    if mode == ONLINE_MODE:
+        from online_stats import load_store, save_store
+        bucket = ENV.get("ANOMALY_STATE_BUCKET")
+        s3_client = get_s3_client() if bucket else None
+        store = load_store(s3_client, bucket)
+        new_data = fetch_data_since(conn, store.last_id)
+        anomalies = store.process(new_data)
+        save_store(store, s3_client, bucket)
+        print(f"Checked {len(new_data)} new readings, {len(anomalies)} anomalies detected.")
+        return plant_anomaly_info(conn, anomalies)
+
+    last_hours_data = fetch_data_from_last_hour(conn)
+    anomalies = []
 
     # Check if data is retrieved properly
     if last_hours_data:
         print("Data retrieved successfully.")
-        anomalies = search_anomalies(last_hours_data)
+        if mode == DETECTORS_MODE:
+            from detectors import (build_detectors, load_detector_config,
+                                   search_anomalies_with_detectors)
+            detectors = build_detectors(load_detector_config(ENV.get("ANOMALY_DETECTORS")))
+            anomalies = search_anomalies_with_detectors(last_hours_data, detectors)
+        else:
+            from detection import search_anomalies
+            anomalies = search_anomalies(last_hours_data)
         if anomalies:
             print("Anomalies detected:")
         else:
@@ -192,35 +225,47 @@ def main():
     else:
         print("No data retrieved from the database.")
 
-    plant_anomaly_list = plant_anomaly_info(connection, anomalies)
+    return plant_anomaly_info(conn, anomalies)
+
+
+def main():
+    """Main function (script)."""
+
+    load_dotenv()
+
+    metrics = start_run("anomaly")
+    try:
+        send_anomaly_emails(metrics)
+    finally:
+        metrics.emit()
+
 
-    email_html_string = email_html(plant_anomaly_list)
+def send_anomaly_emails(metrics):
+    """Finds the last hour's anomalies and emails them to the botanists,
+    timing each stage"""
+
+    with metrics.timer("connect"):
+        connection = get_database_connection(ENV)
+
+    mode = ENV.get("ANOMALY_MODE", LOCAL_MODE)
+    with metrics.timer("detect", mode=mode):
+        plant_anomaly_list = get_plant_anomaly_list(connection, mode)
+    metrics.increment("anomalous_plants_total", len(plant_anomaly_list))
+    metrics.increment("anomalies_total",
+                      sum(plant['total_anomaly_num'] for plant in plant_anomaly_list))
+
+    with metrics.timer("botanists"):
+        plant_botanists = get_plant_botanist_dict(connection)
 
     connection.close()
 
-    ses_client = boto3.client('ses',
-                              aws_access_key_id=ENV["AWS_PUBLIC_KEY"],
-                              aws_secret_access_key=ENV["AWS_PRIVATE_KEY"], region_name="eu-west-2")
-
-    response = ses_client.send_email(
-        Destination={
-            "ToAddresses": [
-                "trainee.isaac.schaessens.coleman@sigmalabs.co.uk",
-                "trainee.mahin.rahman@sigmalabs.co.uk",
-                "trainee.saniya.shaikh@sigmalabs.co.uk"
-            ],
-        },
-        Message={
-            "Body": {
-                "Html": {
-                    "Charset": "UTF-8",
-                    "Data": email_html_string,
-                }
-            },
-            "Subject": {
-                "Charset": "UTF-8",
-                "Data": "Hourly Plant Anomaly Update",
-            },
-        },
-        Source="trainee.isaac.schaessens.coleman@sigmalabs.co.uk",
-    )
+    digest_recipients = ENV.get("ANOMALY_DIGEST_RECIPIENTS", DIGEST_RECIPIENTS)
+    with metrics.timer("render"):
+        messages = build_messages(plant_anomaly_list, plant_botanists,
+                                  [email for email in digest_recipients.split(",") if email])
+
+    with metrics.timer("dispatch"):
+        result = dispatch(messages, get_transport(ENV))
+    metrics.increment("emails_sent_total", result['sent'])
+    metrics.increment("emails_failed_total", len(result['failed']))
+    print(f"Sent {result['sent']} anomaly emails, {len(result['failed'])} failed.")
@@ -0,0 +1 @@
+../shared/archive_schedule.py
\ No newline at end of file
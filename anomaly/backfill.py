@@ -0,0 +1,173 @@
+'''Replays the anomaly detectors over a date range of the S3 archive.
+
+Work is split across a process pool, either one task per archived file (about a
+day of readings) or one task per shard of plants, and anomalies are written to
+a CSV file as each task finishes.
+
+Usage: python backfill.py --start 2024-03-01 --end 2024-04-01 --output anomalies.csv'''
+import argparse
+import csv
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from fnmatch import fnmatch
+
+from boto3 import client
+
+from archive_schedule import ARCHIVE_INTERVAL, ARCHIVE_LAG, TIMEZONE_MARGIN
+from detectors import build_detectors, load_detector_config, search_anomalies_with_detectors
+
+BUCKET = 'permian-triassic'
+ARCHIVE_KEY_PATTERN = '[0-9][0-9][0-9][0-9]/[0-9][0-9]/[0-9][0-9]/*'
+ARCHIVE_KEY_FORMAT = '%Y/%m/%d/%H:%M:%S'
+
+BY_DAY = 'day'
+BY_PLANT = 'plant'
+OUTPUT_COLUMNS = ['timestamp', 'plant_id', 'moisture_anomaly', 'temperature_anomaly',
+                  'moisture_value', 'temperature_value', 'detectors']
+
+_s3_client = None
+
+
+def get_s3_client():
+    """Returns this process's S3 client, creating it on first use"""
+
+    global _s3_client
+    if _s3_client is None:
+        _s3_client = client('s3')
+    return _s3_client
+
+
+def get_export_time(key: str) -> datetime:
+    """Returns the time an archive object was exported, from its key"""
+
+    return datetime.strptime(key, ARCHIVE_KEY_FORMAT)
+
+
+def select_archive_keys(keys: list[str], start: datetime, end: datetime) -> list[str]:
+    """Returns the archive keys that can hold readings recorded between start and end"""
+
+    first_export = start + ARCHIVE_LAG - TIMEZONE_MARGIN
+    last_export = end + ARCHIVE_LAG + ARCHIVE_INTERVAL + TIMEZONE_MARGIN
+    return sorted(key for key in keys
+                  if fnmatch(key, ARCHIVE_KEY_PATTERN)
+                  and first_export < get_export_time(key) <= last_export)
+
+
+def list_archive_keys(source: str) -> list[str]:
+    """Lists the archive objects in the bucket, or the files in a local directory
+    named like the dashboard's mirror (YYYY-MM-DD-HH:MM:SS.csv)"""
+
+    if source != BUCKET:
+        if not os.path.isdir(source):
+            raise ValueError(f"Archive source {source} is neither the bucket {BUCKET} "
+                             "nor a local directory")
+        return [f"{name[:4]}/{name[5:7]}/{name[8:10]}/{name[11:].removesuffix('.csv')}"
+                for name in os.listdir(source) if fnmatch(name, '[0-9]*-*-*-*')]
+
+    keys = []
+    paginator = get_s3_client().get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=BUCKET):
+        keys.extend(o['Key'] for o in page.get('Contents', []))
+    return keys
+
+
+def read_archive_rows(source: str, key: str, start: datetime, end: datetime,
+                      shard: tuple[int, int] = None) -> list[dict]:
+    """Reads the readings recorded between start and end from one archive object,
+    keeping only the plants in the shard (index, count) if one is given"""
+
+    if source == BUCKET:
+        body = get_s3_client().get_object(Bucket=BUCKET, Key=key)['Body'].read().decode('utf-8')
+    else:
+        path = os.path.join(source, f"{key.replace('/', '-')}.csv")
+        with open(path, 'r', encoding='utf-8') as file:
+            body = file.read()
+
+    rows = []
+    for row in csv.DictReader(io.StringIO(body)):
+        plant_id = int(row['PlantID'])
+        if shard is not None and plant_id % shard[1] != shard[0]:
+            continue
+        time_recorded = datetime.fromisoformat(row['TimeRecorded'])
+        if start <= time_recorded < end:
+            rows.append({'PlantID': plant_id, 'TimeRecorded': time_recorded,
+                         'SoilMoisture': float(row['SoilMoisture']),
+                         'Temperature': float(row['Temperature'])})
+    return rows
+
+
+def detect_in_partition(source: str, keys: list[str], start: datetime, end: datetime,
+                        detector_config: dict, shard: tuple[int, int] = None) -> list[dict]:
+    """Runs the detectors over the readings of one partition of the archive"""
+
+    rows = []
+    for key in keys:
+        rows.extend(read_archive_rows(source, key, start, end, shard))
+    return search_anomalies_with_detectors(rows, build_detectors(detector_config))
+
+
+def get_partitions(keys: list[str], by: str, workers: int) -> list[tuple]:
+    """Splits the work into one partition per archive file, or one per plant shard
+    where each shard reads every file but keeps a continuous series per plant"""
+
+    if by == BY_PLANT:
+        return [(keys, (index, workers)) for index in range(workers)]
+    return [([key], None) for key in keys]
+
+
+def backfill(source: str, start: datetime, end: datetime, output_path: str,
+             by: str = BY_DAY, workers: int = None, detector_config: dict = None) -> int:
+    """Runs the detectors over the archive between start and end across a process
+    pool, writing anomalies to a CSV file as each partition finishes.
+    Returns the number of anomalies written."""
+
+    workers = workers or os.cpu_count()
+    detector_config = detector_config or load_detector_config()
+    keys = select_archive_keys(list_archive_keys(source), start, end)
+    partitions = get_partitions(keys, by, workers)
+    print(f"Backfilling {len(keys)} archive files in {len(partitions)} partitions...")
+
+    total = 0
+    with open(output_path, 'w', newline='', encoding='utf-8') as file, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        writer = csv.DictWriter(file, fieldnames=OUTPUT_COLUMNS)
+        writer.writeheader()
+        tasks = [executor.submit(detect_in_partition, source, partition_keys, start, end,
+                                 detector_config, shard)
+                 for partition_keys, shard in partitions]
+        for task in as_completed(tasks):
+            anomalies = task.result()
+            for anomaly in anomalies:
+                writer.writerow({**anomaly, 'detectors': '|'.join(anomaly['detectors'])})
+            file.flush()
+            total += len(anomalies)
+
+    print(f"Wrote {total} anomalies to {output_path}")
+    return total
+
+
+def parse_args():
+    """Parses the command line arguments"""
+
+    parser = argparse.ArgumentParser(description="Replay anomaly detection over the archive")
+    parser.add_argument('--start', required=True, type=datetime.fromisoformat,
+                        help="first time to include, e.g. 2024-03-01")
+    parser.add_argument('--end', required=True, type=datetime.fromisoformat,
+                        help="time to stop before, e.g. 2024-04-01")
+    parser.add_argument('--output', default='backfill_anomalies.csv')
+    parser.add_argument('--by', choices=[BY_DAY, BY_PLANT], default=BY_DAY,
+                        help="partition work by archive file or by plant")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--source', default=BUCKET,
+                        help="archive bucket, or a local directory of archive files")
+    parser.add_argument('--detectors', default=None,
+                        help="JSON overrides of the detector thresholds")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    backfill(args.source, args.start, args.end, args.output, args.by, args.workers,
+             load_detector_config(args.detectors))
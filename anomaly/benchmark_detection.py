@@ -0,0 +1,102 @@
+'''Benchmarks the vectorised per-plant anomaly engine against the previous
+global-threshold loop and per-plant pandas filter.
+Run with: python benchmark_detection.py'''
+from datetime import datetime, timedelta
+from time import perf_counter
+import numpy as np
+import pandas as pd
+from detection import flag_anomalies, rows_to_arrays, search_anomalies, summarise_anomalies
+
+PLANTS = 1000
+READINGS_PER_PLANT = 60
+REPEATS = 5
+
+
+def make_rows(n_plants: int, n_readings: int) -> list[dict]:
+    """Returns an hour of minute readings for every plant, each plant with its own
+    typical soil moisture and temperature"""
+
+    rng = np.random.default_rng(42)
+    moisture_bases = rng.uniform(15, 45, n_plants)
+    temperature_bases = rng.uniform(8, 30, n_plants)
+    start = datetime(2024, 4, 16, 12)
+    return [{
+        'MeasurementRecordID': plant * n_readings + minute,
+        'PlantID': plant + 1,
+        'TimeRecorded': start + timedelta(minutes=minute),
+        'SoilMoisture': moisture_bases[plant] + rng.normal(0, 1),
+        'Temperature': temperature_bases[plant] + rng.normal(0, 0.5)
+    } for plant in range(n_plants) for minute in range(n_readings)]
+
+
+def legacy_search_anomalies(data: list[dict]) -> list[dict]:
+    """The previous implementation: one global mean and deviation for all plants"""
+
+    anomalies = []
+    moisture_values = [row['SoilMoisture'] for row in data]
+    temperature_values = [row['Temperature'] for row in data]
+    moisture_deviation = 2 * np.std(moisture_values)
+    temperature_deviation = 2 * np.std(temperature_values)
+    temperature_mean = np.mean(temperature_values)
+    moisture_mean = np.mean(moisture_values)
+    for row in data:
+        moisture_anomaly = abs(row['SoilMoisture'] - moisture_mean) > moisture_deviation
+        temperature_anomaly = abs(row['Temperature'] - temperature_mean) > temperature_deviation
+        if moisture_anomaly or temperature_anomaly:
+            anomalies.append({
+                'timestamp': row['TimeRecorded'], 'plant_id': row['PlantID'],
+                'moisture_anomaly': moisture_anomaly,
+                'temperature_anomaly': temperature_anomaly,
+                'moisture_value': row['SoilMoisture'],
+                'temperature_value': row['Temperature']
+            })
+    return anomalies
+
+
+def legacy_plant_anomaly_info(anomalies: list[dict], plant_names: dict) -> list[dict]:
+    """The previous implementation: one DataFrame filter per plant"""
+
+    anomaly_df = pd.DataFrame(anomalies)
+    anomaly_info = []
+    for plant_id in anomaly_df["plant_id"].unique():
+        plant_id_df = anomaly_df[anomaly_df['plant_id'] == plant_id]
+        temp_num = len(plant_id_df[plant_id_df["temperature_anomaly"]].index)
+        moisture_num = len(plant_id_df[plant_id_df["moisture_anomaly"]].index)
+        anomaly_info.append({"plant_id": plant_id, "plant_name": plant_names[plant_id],
+                             "temp_anomaly_num": temp_num,
+                             "moisture_anomaly_num": moisture_num,
+                             "total_anomaly_num": temp_num + moisture_num})
+    return sorted(anomaly_info, key=lambda x: x["total_anomaly_num"], reverse=True)
+
+
+def time_best(function, *args) -> tuple[float, object]:
+    """Returns the best time of several runs of a function and its result"""
+
+    best, result = float('inf'), None
+    for _ in range(REPEATS):
+        start = perf_counter()
+        result = function(*args)
+        best = min(best, perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    rows = make_rows(PLANTS, READINGS_PER_PLANT)
+    names = {plant_id: f"Plant {plant_id}" for plant_id in range(1, PLANTS + 1)}
+
+    legacy_search_time, legacy_anomalies = time_best(legacy_search_anomalies, rows)
+    search_time, anomalies = time_best(search_anomalies, rows)
+    convert_time, arrays = time_best(rows_to_arrays, rows)
+    flag_time, _ = time_best(flag_anomalies, arrays)
+    legacy_summary_time, _ = time_best(legacy_plant_anomaly_info, anomalies, names)
+    summary_time, summary = time_best(summarise_anomalies, anomalies, names)
+
+    print(f"{PLANTS} plants x {READINGS_PER_PLANT} readings ({len(rows)} rows)")
+    print(f"search   legacy global loop: {legacy_search_time * 1000:8.1f} ms "
+          f"({len(legacy_anomalies)} anomalies)")
+    print(f"search   vectorised:         {search_time * 1000:8.1f} ms "
+          f"({len(anomalies)} anomalies in {len(summary)} plants)")
+    print(f"           rows to arrays:   {convert_time * 1000:8.1f} ms")
+    print(f"           per-plant flags:  {flag_time * 1000:8.1f} ms")
+    print(f"summary  legacy filter loop: {legacy_summary_time * 1000:8.1f} ms")
+    print(f"summary  vectorised:         {summary_time * 1000:8.1f} ms")
@@ -0,0 +1,78 @@
+'''Benchmarks the anomaly detectors on synthetic plant readings with injected
+spikes, level shifts and stuck sensors, reporting throughput and precision/recall.
+Run with: python benchmark_detectors.py'''
+from time import perf_counter
+import numpy as np
+from detectors import build_detectors, detect_per_plant, load_detector_config
+
+PLANTS = 1000
+READINGS_PER_PLANT = 60
+SPIKE_RATE = 0.01
+SHIFT_PLANTS = 0.05
+SHIFT_SIZE = 3
+FLATLINE_PLANTS = 0.05
+FLATLINE_LENGTH = 20
+
+
+def make_readings(n_plants: int, n_readings: int, seed: int = 42):
+    """Returns an hour of plant IDs and soil moisture readings grouped by plant in
+    time order, and the ground truth anomaly labels"""
+
+    rng = np.random.default_rng(seed)
+    minutes = np.arange(n_readings)
+    plant_ids = np.repeat(np.arange(1, n_plants + 1), n_readings)
+    bases = np.repeat(rng.uniform(15, 45, n_plants), n_readings)
+    daily = 3 * np.sin(np.tile(minutes, n_plants) / (24 * 60) * 2 * np.pi)
+    values = bases + daily + rng.normal(0, 0.5, n_plants * n_readings)
+    labels = np.zeros(len(values), dtype=bool)
+
+    # Sudden spikes or drops of 4 to 8 deviations
+    spikes = rng.random(len(values)) < SPIKE_RATE
+    values[spikes] += rng.choice([-1, 1], spikes.sum()) * rng.uniform(2, 4, spikes.sum())
+    labels |= spikes
+
+    # Sudden lasting shifts in level for the rest of the hour
+    for plant in rng.choice(n_plants, int(n_plants * SHIFT_PLANTS), replace=False):
+        start = plant * n_readings + rng.integers(n_readings // 4, n_readings // 2)
+        end = (plant + 1) * n_readings
+        values[start:end] += SHIFT_SIZE
+        labels[start:end] = True
+
+    # Sensors stuck on their last value, anomalous once the detector window has passed
+    window = load_detector_config()['flatline']['window']
+    for plant in rng.choice(n_plants, int(n_plants * FLATLINE_PLANTS), replace=False):
+        start = plant * n_readings + rng.integers(n_readings // 2, n_readings - FLATLINE_LENGTH)
+        values[start:start + FLATLINE_LENGTH] = values[start]
+        labels[start + window:start + FLATLINE_LENGTH] = True
+        labels[start + 1:start + window] = False
+
+    return plant_ids, values, labels
+
+
+def precision_recall(flags: np.ndarray, labels: np.ndarray) -> tuple[float, float]:
+    """Returns the precision and recall of flags against labels"""
+
+    true_positives = np.sum(flags & labels)
+    precision = true_positives / flags.sum() if flags.sum() else 0.0
+    recall = true_positives / labels.sum() if labels.sum() else 0.0
+    return precision, recall
+
+
+if __name__ == "__main__":
+    plant_ids, values, labels = make_readings(PLANTS, READINGS_PER_PLANT)
+    detectors = build_detectors()
+
+    start = perf_counter()
+    flags = detect_per_plant(plant_ids, values, detectors)
+    seconds = perf_counter() - start
+
+    print(f"{PLANTS} plants x {READINGS_PER_PLANT} readings, {labels.sum()} anomalies")
+    print(f"all detectors: {seconds * 1000:.1f} ms, {len(values) / seconds:,.0f} readings/s")
+    for name, detector_flags in flags.items():
+        precision, recall = precision_recall(detector_flags, labels)
+        print(f"{name:>15}: {detector_flags.sum():6} flagged, "
+              f"precision {precision:.2f}, recall {recall:.2f}")
+    combined = np.logical_or.reduce(list(flags.values()))
+    precision, recall = precision_recall(combined, labels)
+    print(f"{'any':>15}: {combined.sum():6} flagged, "
+          f"precision {precision:.2f}, recall {recall:.2f}")
@@ -0,0 +1,65 @@
+'''Load-tests anomaly email dispatch offline with thousands of plants, comparing
+one blocking send per botanist against the rate limited worker pool.
+Run with: python benchmark_notifications.py'''
+import logging
+import tempfile
+import time
+from time import perf_counter
+from notifications import FileTransport, build_messages, dispatch
+
+PLANTS = 5000
+BOTANISTS = 500
+SEND_LATENCY = 0.02
+FAILURE_EVERY = 50
+RATE = 200
+
+
+class SlowFileTransport(FileTransport):
+    """Writes emails to files after a delay like an SES round trip, failing
+    every FAILURE_EVERY-th attempt like a throttled request"""
+
+    def __init__(self, directory: str):
+        super().__init__(directory)
+        self.attempts = 0
+
+    def send(self, recipients, subject, html):
+        time.sleep(SEND_LATENCY)
+        with self._lock:
+            self.attempts += 1
+            attempt = self.attempts
+        if attempt % FAILURE_EVERY == 0:
+            raise ConnectionError("Throttling: Maximum sending rate exceeded")
+        super().send(recipients, subject, html)
+
+
+def make_plant_anomalies(n_plants: int, n_botanists: int) -> tuple[list[dict], dict]:
+    """Returns per-plant anomaly summaries and the botanist of each plant"""
+
+    plants = [{'plant_id': plant_id, 'plant_name': f"Plant {plant_id}",
+               'temp_anomaly_num': plant_id % 3, 'moisture_anomaly_num': plant_id % 5,
+               'total_anomaly_num': plant_id % 3 + plant_id % 5}
+              for plant_id in range(1, n_plants + 1)]
+    botanists = {plant_id: {'email': f"botanist{plant_id % n_botanists}@lnhm.co.uk",
+                            'name': f"Botanist {plant_id % n_botanists}"}
+                 for plant_id in range(1, n_plants + 1)}
+    return plants, botanists
+
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    plant_anomalies, plant_botanists = make_plant_anomalies(PLANTS, BOTANISTS)
+
+    start = perf_counter()
+    messages = build_messages(plant_anomalies, plant_botanists, ['digest@lnhm.co.uk'])
+    render_time = perf_counter() - start
+    print(f"{PLANTS} plants, {len(messages)} emails rendered in {render_time * 1000:.1f} ms")
+
+    for workers in (1, 8, 32):
+        with tempfile.TemporaryDirectory() as directory:
+            transport = SlowFileTransport(directory)
+            start = perf_counter()
+            result = dispatch(messages, transport, max_workers=workers, rate=RATE,
+                              retry_delay=0.01)
+            seconds = perf_counter() - start
+        print(f"{workers:>3} workers: {seconds:6.2f} s, {result['sent'] / seconds:6.1f} emails/s, "
+              f"{transport.attempts - result['sent']} retries, {len(result['failed'])} failed")
@@ -0,0 +1,94 @@
+'''Vectorised per-plant anomaly detection over NumPy arrays.'''
+import numpy as np
+from thresholds import N_SIGMA
+
+
+def rows_to_arrays(data: list[dict]) -> dict[str, np.ndarray]:
+    """Converts rows from the PlantMeasurementRecord table into one array per column."""
+
+    return {
+        'PlantID': np.fromiter((row['PlantID'] for row in data), dtype=np.int64,
+                               count=len(data)),
+        'SoilMoisture': np.fromiter((row['SoilMoisture'] for row in data), dtype=np.float64,
+                                    count=len(data)),
+        'Temperature': np.fromiter((row['Temperature'] for row in data), dtype=np.float64,
+                                   count=len(data)),
+        'TimeRecorded': np.array([row['TimeRecorded'] for row in data], dtype=object)
+    }
+
+
+def group_statistics(groups: np.ndarray, n_groups: int,
+                     values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the mean and (population) standard deviation of the values in each group,
+    where groups holds the group index of every value."""
+
+    counts = np.bincount(groups, minlength=n_groups)
+    means = np.bincount(groups, weights=values, minlength=n_groups) / counts
+    deviations = values - means[groups]
+    variances = np.bincount(groups, weights=deviations ** 2, minlength=n_groups) / counts
+    return means, np.sqrt(variances)
+
+
+def flag_anomalies(arrays: dict[str, np.ndarray], n_sigma: float = N_SIGMA) -> dict:
+    """Flags every reading that is more than n_sigma standard deviations from its own
+    plant's mean, for soil moisture and temperature in one pass over the arrays.
+    Returns boolean arrays aligned with the input rows."""
+
+    _, groups = np.unique(arrays['PlantID'], return_inverse=True)
+    n_groups = groups.max() + 1 if len(groups) else 0
+
+    flags = {}
+    for column, flag_name in (('SoilMoisture', 'moisture_anomaly'),
+                              ('Temperature', 'temperature_anomaly')):
+        values = arrays[column]
+        means, deviations = group_statistics(groups, n_groups, values)
+        flags[flag_name] = np.abs(values - means[groups]) > n_sigma * deviations[groups]
+    return flags
+
+
+def search_anomalies(data: list[dict], n_sigma: float = N_SIGMA) -> list[dict]:
+    """Finds the readings that are anomalous for their plant and returns them in the
+    same format as the anomaly email expects."""
+
+    if not data:
+        return []
+
+    arrays = rows_to_arrays(data)
+    flags = flag_anomalies(arrays, n_sigma)
+    moisture_flags, temperature_flags = flags['moisture_anomaly'], flags['temperature_anomaly']
+
+    return [{
+        'timestamp': arrays['TimeRecorded'][i],
+        'plant_id': int(arrays['PlantID'][i]),
+        'moisture_anomaly': bool(moisture_flags[i]),
+        'temperature_anomaly': bool(temperature_flags[i]),
+        'moisture_value': float(arrays['SoilMoisture'][i]),
+        'temperature_value': float(arrays['Temperature'][i])
+    } for i in np.flatnonzero(moisture_flags | temperature_flags)]
+
+
+def summarise_anomalies(anomalies: list[dict], plant_names: dict) -> list[dict]:
+    """Counts the temperature and soil moisture anomalies of each plant in a single
+    grouped pass and returns one summary per plant, most anomalous first.
+    e.g. {'plant_id': 47, 'plant_name': 'Venus Flytrap', 'temp_anomaly_num': 1,
+          'moisture_anomaly_num': 76, 'total_anomaly_num': 77}"""
+
+    if not anomalies:
+        return []
+
+    plant_ids = np.fromiter((a['plant_id'] for a in anomalies), dtype=np.int64)
+    temperature_flags = np.fromiter((a['temperature_anomaly'] for a in anomalies), dtype=bool)
+    moisture_flags = np.fromiter((a['moisture_anomaly'] for a in anomalies), dtype=bool)
+
+    plants, groups = np.unique(plant_ids, return_inverse=True)
+    temperature_counts = np.bincount(groups, weights=temperature_flags, minlength=len(plants))
+    moisture_counts = np.bincount(groups, weights=moisture_flags, minlength=len(plants))
+    totals = temperature_counts + moisture_counts
+
+    return [{
+        'plant_id': int(plants[i]),
+        'plant_name': plant_names.get(int(plants[i])),
+        'temp_anomaly_num': int(temperature_counts[i]),
+        'moisture_anomaly_num': int(moisture_counts[i]),
+        'total_anomaly_num': int(totals[i])
+    } for i in np.argsort(-totals, kind='stable')]
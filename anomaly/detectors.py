@@ -0,0 +1,265 @@
+'''Pluggable anomaly detectors that run together over each plant's readings.'''
+import json
+from functools import cached_property
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from detection import rows_to_arrays
+
+# Thresholds of each detector. Override them with a JSON object of the same shape,
+# e.g. {"mad": {"threshold": 5}, "flatline": {"enabled": false}}
+DEFAULT_CONFIG = {
+    'zscore': {'threshold': 3.0},
+    'mad': {'window': 15, 'threshold': 5.0},
+    'ewma': {'alpha': 0.05, 'threshold': 4.0},
+    'rate_of_change': {'threshold': 4.0},
+    'flatline': {'window': 10, 'tolerance': 1e-6}
+}
+MAD_SCALE = 1.4826
+# Largest power of ten the EWMA's decay weights reach, well inside float64's range
+MAX_DECAY_EXPONENT = 100
+
+
+def exponential_moving_average(values: np.ndarray, alpha: float,
+                               initial: float) -> np.ndarray:
+    """Returns the exponentially weighted moving average of values, starting from
+    initial, i.e. level = alpha * value + (1 - alpha) * level after each value.
+    The recursion is unrolled into a cumulative sum of the values divided by the
+    powers of the decay, over blocks short enough that those powers stay in range,
+    each block starting from the last level of the one before."""
+
+    decay = 1 - alpha
+    if decay <= 0:
+        return np.array(values, dtype=np.float64)
+    if decay >= 1:
+        return np.full(len(values), initial, dtype=np.float64)
+
+    block = max(1, int(MAX_DECAY_EXPONENT / -np.log10(decay)))
+    ewma = np.empty(len(values), dtype=np.float64)
+    level = initial
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        powers = decay ** np.arange(1, len(chunk) + 1)
+        ewma[start:start + len(chunk)] = powers * (level + alpha * np.cumsum(chunk / powers))
+        level = ewma[start + len(chunk) - 1]
+    return ewma
+
+
+class SeriesWindows:
+    """One plant's readings of one metric, in time order, with the intermediates
+    the detectors share. Each intermediate is computed once, the first time a
+    detector asks for it."""
+
+    def __init__(self, values: np.ndarray):
+        self.values = np.asarray(values, dtype=np.float64)
+        self._trailing = {}
+        self._trailing_medians = {}
+
+    @cached_property
+    def mean(self) -> float:
+        """Mean of the series"""
+        return float(self.values.mean())
+
+    @cached_property
+    def std(self) -> float:
+        """Standard deviation of the series"""
+        return float(self.values.std())
+
+    @cached_property
+    def diffs(self) -> np.ndarray:
+        """Change from the previous reading, NaN for the first"""
+        return np.concatenate(([np.nan], np.diff(self.values)))
+
+    @cached_property
+    def median(self) -> float:
+        """Median of the series"""
+        return float(np.median(self.values))
+
+    @cached_property
+    def diff_scale(self) -> float:
+        """Robust standard deviation of the changes between readings, from their
+        median absolute size, so that the spikes being looked for do not inflate it"""
+        if len(self.values) < 2:
+            return 0.0
+        return MAD_SCALE * float(np.median(np.abs(self.diffs[1:])))
+
+    @cached_property
+    def noise_std(self) -> float:
+        """Robust standard deviation of the reading to reading noise, which unlike
+        the series' standard deviation is not inflated by slow trends"""
+        return self.diff_scale / np.sqrt(2)
+
+    def trailing(self, window: int) -> np.ndarray:
+        """Returns an (n, window) array whose row i holds the window readings before
+        reading i, padded with NaN where there is not yet enough history"""
+
+        if window not in self._trailing:
+            padded = np.concatenate((np.full(window, np.nan), self.values))
+            self._trailing[window] = sliding_window_view(padded, window)[:len(self.values)]
+        return self._trailing[window]
+
+    def trailing_median(self, window: int) -> np.ndarray:
+        """Median of the window readings before each reading"""
+
+        if window not in self._trailing_medians:
+            self._trailing_medians[window] = np.median(self.trailing(window), axis=1)
+        return self._trailing_medians[window]
+
+
+class Detector:
+    """Flags readings of a series. Subclasses set name and implement detect."""
+
+    name = None
+
+    def __init__(self, **thresholds):
+        self.thresholds = thresholds
+
+    def detect(self, windows: SeriesWindows) -> np.ndarray:
+        """Returns a boolean array flagging the anomalous readings"""
+        raise NotImplementedError
+
+
+class ZScoreDetector(Detector):
+    """Readings more than threshold standard deviations from the series mean"""
+
+    name = 'zscore'
+
+    def detect(self, windows: SeriesWindows) -> np.ndarray:
+        return np.abs(windows.values - windows.mean) > self.thresholds['threshold'] * windows.std
+
+
+class MADDetector(Detector):
+    """Readings far from the median of the readings before them, measured in
+    median absolute deviations, which single outliers cannot inflate.
+    Windows with no deviation at all are left to the flatline detector."""
+
+    name = 'mad'
+
+    def detect(self, windows: SeriesWindows) -> np.ndarray:
+        window = self.thresholds['window']
+        medians = windows.trailing_median(window)
+        mad = np.median(np.abs(windows.trailing(window) - medians[:, None]), axis=1)
+        with np.errstate(invalid='ignore'):
+            return (mad > 0) & (np.abs(windows.values - medians)
+                                > self.thresholds['threshold'] * MAD_SCALE * mad)
+
+
+class EWMADetector(Detector):
+    """Readings that push the exponentially weighted moving average outside its
+    control limits around the series median, with limits set from the reading to
+    reading noise so that sustained shifts are caught but slow trends are not"""
+
+    name = 'ewma'
+
+    def detect(self, windows: SeriesWindows) -> np.ndarray:
+        alpha = self.thresholds['alpha']
+        ewma = exponential_moving_average(windows.values, alpha, windows.median)
+        limit = self.thresholds['threshold'] * windows.noise_std * np.sqrt(alpha / (2 - alpha))
+        return np.abs(ewma - windows.median) > max(limit, 1e-9)
+
+
+class RateOfChangeDetector(Detector):
+    """Readings that change from the previous reading by more than threshold
+    times the series' typical change"""
+
+    name = 'rate_of_change'
+
+    def detect(self, windows: SeriesWindows) -> np.ndarray:
+        with np.errstate(invalid='ignore'):
+            return np.abs(windows.diffs) > self.thresholds['threshold'] * max(
+                windows.diff_scale, 1e-9)
+
+
+class FlatlineDetector(Detector):
+    """Readings equal to every one of the window readings before them, which
+    suggests a stuck sensor"""
+
+    name = 'flatline'
+
+    def detect(self, windows: SeriesWindows) -> np.ndarray:
+        trailing = windows.trailing(self.thresholds['window'])
+        with np.errstate(invalid='ignore'):
+            spread = np.maximum(trailing.max(axis=1), windows.values) - np.minimum(
+                trailing.min(axis=1), windows.values)
+            return spread <= self.thresholds['tolerance']
+
+
+DETECTORS = {detector.name: detector for detector in (
+    ZScoreDetector, MADDetector, EWMADetector, RateOfChangeDetector, FlatlineDetector)}
+
+
+def load_detector_config(overrides: str = None) -> dict:
+    """Returns the default detector thresholds updated with a JSON string of overrides"""
+
+    config = {name: dict(thresholds) for name, thresholds in DEFAULT_CONFIG.items()}
+    for name, thresholds in json.loads(overrides or '{}').items():
+        if name not in DETECTORS:
+            raise ValueError(f"Unknown anomaly detector: {name}")
+        config[name].update(thresholds)
+    return config
+
+
+def build_detectors(config: dict = None) -> list[Detector]:
+    """Creates the enabled detectors with their configured thresholds"""
+
+    config = config or load_detector_config()
+    return [DETECTORS[name](**{k: v for k, v in thresholds.items() if k != 'enabled'})
+            for name, thresholds in config.items() if thresholds.get('enabled', True)]
+
+
+def run_detectors(values: np.ndarray, detectors: list[Detector]) -> dict[str, np.ndarray]:
+    """Runs every detector over one series, sharing its intermediates.
+    Returns the flags of each detector by name."""
+
+    windows = SeriesWindows(values)
+    return {detector.name: detector.detect(windows) for detector in detectors}
+
+
+def detect_per_plant(plant_ids: np.ndarray, values: np.ndarray,
+                     detectors: list[Detector]) -> dict[str, np.ndarray]:
+    """Runs the detectors over each plant's readings separately. The readings must
+    be grouped by plant and in time order within each plant.
+    Returns the flags of each detector aligned with the input readings."""
+
+    flags = {detector.name: np.zeros(len(values), dtype=bool) for detector in detectors}
+    if not len(values):
+        return flags
+
+    boundaries = np.flatnonzero(np.diff(plant_ids)) + 1
+    for start, end in zip(np.concatenate(([0], boundaries)),
+                          np.concatenate((boundaries, [len(values)]))):
+        for name, plant_flags in run_detectors(values[start:end], detectors).items():
+            flags[name][start:end] = plant_flags
+    return flags
+
+
+def search_anomalies_with_detectors(data: list[dict],
+                                    detectors: list[Detector] = None) -> list[dict]:
+    """Runs the detectors over each plant's soil moisture and temperature readings
+    and returns the readings any of them flag, in the same format as
+    detection.search_anomalies, with the names of the detectors that fired."""
+
+    if not data:
+        return []
+
+    detectors = detectors or build_detectors()
+    arrays = rows_to_arrays(data)
+    order = np.lexsort((arrays['TimeRecorded'].astype('datetime64[ns]'), arrays['PlantID']))
+    arrays = {column: values[order] for column, values in arrays.items()}
+
+    moisture_flags = detect_per_plant(arrays['PlantID'], arrays['SoilMoisture'], detectors)
+    temperature_flags = detect_per_plant(arrays['PlantID'], arrays['Temperature'], detectors)
+    moisture_any = np.logical_or.reduce(list(moisture_flags.values()))
+    temperature_any = np.logical_or.reduce(list(temperature_flags.values()))
+
+    return [{
+        'timestamp': arrays['TimeRecorded'][i],
+        'plant_id': int(arrays['PlantID'][i]),
+        'moisture_anomaly': bool(moisture_any[i]),
+        'temperature_anomaly': bool(temperature_any[i]),
+        'moisture_value': float(arrays['SoilMoisture'][i]),
+        'temperature_value': float(arrays['Temperature'][i]),
+        'detectors': sorted({name for name, flags in moisture_flags.items() if flags[i]} |
+                            {name for name, flags in temperature_flags.items() if flags[i]})
+    } for i in np.flatnonzero(moisture_any | temperature_any)]
@@ -0,0 +1,241 @@
+'''Sends each botanist an email about the anomalies of the plants they look after.'''
+import datetime
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from html import escape
+from threading import Lock
+
+SES_TRANSPORT = "ses"
+FILE_TRANSPORT = "file"
+SMTP_TRANSPORT = "smtp"
+
+SENDER = "trainee.isaac.schaessens.coleman@sigmalabs.co.uk"
+SUBJECT = "Hourly Plant Anomaly Update"
+OUTBOX_DIRECTORY = "/tmp/outbox"
+
+# SES accounts out of the sandbox default to 14 emails a second
+MAX_WORKERS = 8
+SEND_RATE = 14
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 0.5
+
+EMAIL_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Anomaly Report from the Hour</title>
+</head>
+<body>
+    <h1>Anomaly Table</h1>
+    <p>{greeting}Here is a table of measurement anomalies of the plants in the last hour ({start} to {end}).</p>
+    <table>
+        <tr>
+            <th>Plant ID</th>
+            <th>Plant Name</th>
+            <th>Total Number of Anomalies</th>
+            <th>Number of Temperature Anomalies</th>
+            <th>Number of Soil Moisture Anomalies</th>
+        </tr>
+        {rows}
+    </table>
+</body>
+</html>
+"""
+
+ROW_TEMPLATE = """<tr>
+            <td>{plant_id}</td>
+            <td>{plant_name}</td>
+            <td>{total_anomaly_num}</td>
+            <td>{temp_anomaly_num}</td>
+            <td>{moisture_anomaly_num}</td>
+        </tr>"""
+
+
+# Only the transport in use is imported, and its client kept for warm invocations
+_ses_client = None
+
+
+class Transport:
+    """Delivers one rendered email. Subclasses implement send."""
+
+    def send(self, recipients: list[str], subject: str, html: str) -> None:
+        """Sends an email, raising an exception if it could not be sent"""
+        raise NotImplementedError
+
+
+class SESTransport(Transport):
+    """Sends emails through Amazon SES"""
+
+    def __init__(self, ses_client, sender: str = SENDER):
+        self.ses_client = ses_client
+        self.sender = sender
+
+    def send(self, recipients: list[str], subject: str, html: str) -> None:
+        self.ses_client.send_email(
+            Destination={"ToAddresses": recipients},
+            Message={
+                "Body": {"Html": {"Charset": "UTF-8", "Data": html}},
+                "Subject": {"Charset": "UTF-8", "Data": subject},
+            },
+            Source=self.sender,
+        )
+
+
+class FileTransport(Transport):
+    """Writes each email to an HTML file in a directory, for running offline"""
+
+    def __init__(self, directory: str = OUTBOX_DIRECTORY):
+        self.directory = directory
+        self._count = 0
+        self._lock = Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def send(self, recipients: list[str], subject: str, html: str) -> None:
+        with self._lock:
+            self._count += 1
+            number = self._count
+        path = os.path.join(self.directory, f"{number:06d}-{recipients[0]}.html")
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(f"<!-- To: {', '.join(recipients)} | Subject: {subject} -->\n{html}")
+
+
+class SMTPTransport(Transport):
+    """Sends emails to an SMTP server, such as a local debugging server"""
+
+    def __init__(self, host: str = "localhost", port: int = 1025, sender: str = SENDER):
+        self.host = host
+        self.port = port
+        self.sender = sender
+
+    def send(self, recipients: list[str], subject: str, html: str) -> None:
+        import smtplib
+        from email.message import EmailMessage
+
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = ", ".join(recipients)
+        message["Subject"] = subject
+        message.set_content(html, subtype="html")
+        with smtplib.SMTP(self.host, self.port) as server:
+            server.send_message(message)
+
+
+class RateLimiter:
+    """Spaces out calls across threads to at most rate per second"""
+
+    def __init__(self, rate: float = SEND_RATE):
+        self.interval = 1 / rate if rate else 0
+        self._next_slot = 0.0
+        self._lock = Lock()
+
+    def wait(self) -> None:
+        """Blocks until the caller may go ahead"""
+
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def get_transport(config) -> Transport:
+    """Returns the transport named by NOTIFICATION_TRANSPORT, SES by default"""
+
+    name = config.get("NOTIFICATION_TRANSPORT", SES_TRANSPORT)
+    if name == FILE_TRANSPORT:
+        return FileTransport(config.get("NOTIFICATION_OUTBOX", OUTBOX_DIRECTORY))
+    if name == SMTP_TRANSPORT:
+        return SMTPTransport(config.get("SMTP_HOST", "localhost"),
+                             int(config.get("SMTP_PORT", 1025)))
+
+    global _ses_client
+    if _ses_client is None:
+        import boto3
+        _ses_client = boto3.client('ses',
+                                   aws_access_key_id=config["AWS_PUBLIC_KEY"],
+                                   aws_secret_access_key=config["AWS_PRIVATE_KEY"],
+                                   region_name="eu-west-2")
+    return SESTransport(_ses_client)
+
+
+def group_by_botanist(plant_anomalies: list[dict], plant_botanists: dict) -> dict:
+    """Groups per-plant anomaly summaries by the email of the botanist responsible
+    for each plant, keeping their order. Plants without a known botanist are
+    grouped under None.
+    e.g. {'carl.linnaeus@lnhm.co.uk': {'name': 'Carl Linnaeus', 'plants': [...]}}"""
+
+    groups = {}
+    for plant in plant_anomalies:
+        botanist = plant_botanists.get(plant['plant_id'], {})
+        email = botanist.get('email')
+        group = groups.setdefault(email, {'name': botanist.get('name'), 'plants': []})
+        group['plants'].append(plant)
+    return groups
+
+
+def render_email(plant_anomalies: list[dict], botanist_name: str = None,
+                 end: datetime.datetime = None) -> str:
+    """Renders the anomaly table email for a list of per-plant anomaly summaries"""
+
+    end = end or datetime.datetime.now()
+    start = end - datetime.timedelta(hours=1)
+    rows = "\n        ".join(
+        ROW_TEMPLATE.format(**{**plant, 'plant_name': escape(str(plant['plant_name']))})
+        for plant in plant_anomalies)
+    return EMAIL_TEMPLATE.format(
+        greeting=f"Hello {escape(botanist_name)}, " if botanist_name else "",
+        start=start.strftime("%H:%M:%S"), end=end.strftime("%H:%M:%S"), rows=rows)
+
+
+def build_messages(plant_anomalies: list[dict], plant_botanists: dict,
+                   digest_recipients: list[str] = None) -> list[dict]:
+    """Returns one message per botanist with their plants' anomalies, and a digest
+    of every plant's anomalies for the digest recipients if there are any.
+    Anomalies of plants without a known botanist only appear in the digest."""
+
+    end = datetime.datetime.now()
+    messages = [{'recipients': [email], 'subject': SUBJECT,
+                 'html': render_email(group['plants'], group['name'], end)}
+                for email, group in group_by_botanist(plant_anomalies, plant_botanists).items()
+                if email is not None]
+    if digest_recipients:
+        messages.append({'recipients': digest_recipients, 'subject': SUBJECT,
+                         'html': render_email(plant_anomalies, end=end)})
+    return messages
+
+
+def send_with_retry(transport: Transport, message: dict, limiter: RateLimiter,
+                    max_attempts: int = MAX_ATTEMPTS, retry_delay: float = RETRY_DELAY) -> bool:
+    """Sends a message, retrying failures with exponential backoff.
+    Returns whether it was sent."""
+
+    for attempt in range(max_attempts):
+        limiter.wait()
+        try:
+            transport.send(message['recipients'], message['subject'], message['html'])
+            return True
+        except Exception as error:  # pylint: disable=broad-except
+            logging.warning("Sending to %s failed (attempt %d): %s",
+                            message['recipients'], attempt + 1, error)
+            if attempt + 1 < max_attempts:
+                time.sleep(retry_delay * 2 ** attempt)
+    return False
+
+
+def dispatch(messages: list[dict], transport: Transport, max_workers: int = MAX_WORKERS,
+             rate: float = SEND_RATE, max_attempts: int = MAX_ATTEMPTS,
+             retry_delay: float = RETRY_DELAY) -> dict:
+    """Sends messages concurrently across a pool of threads, at most rate a second.
+    Returns the number of messages sent and the recipients of those that failed."""
+
+    limiter = RateLimiter(rate)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(
+            lambda message: send_with_retry(transport, message, limiter,
+                                            max_attempts, retry_delay), messages))
+
+    failed = [message['recipients'] for message, sent in zip(messages, results) if not sent]
+    return {'sent': len(messages) - len(failed), 'failed': failed}
@@ -0,0 +1,160 @@
+'''Per-plant running statistics that are updated incrementally between anomaly runs.'''
+import json
+import math
+import os
+
+from thresholds import N_SIGMA
+
+METRICS = ('SoilMoisture', 'Temperature')
+EWMA_ALPHA = 0.05
+MIN_BASELINE_COUNT = 30
+STATE_PATH = '/tmp/online_stats.json'
+STATE_KEY = 'anomaly/online_stats.json'
+
+
+class RunningStats:
+    """Running statistics of one metric of one plant.
+    The mean and variance over every reading seen are kept with Welford's algorithm,
+    and an exponentially weighted mean and variance track its recent level."""
+
+    __slots__ = ('count', 'mean', 'm2', 'ewma', 'ewm_var')
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0,
+                 ewma: float = 0.0, ewm_var: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.ewma = ewma
+        self.ewm_var = ewm_var
+
+    @property
+    def std(self) -> float:
+        """Standard deviation of every reading seen"""
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+    @property
+    def ewm_std(self) -> float:
+        """Exponentially weighted standard deviation of recent readings"""
+        return math.sqrt(self.ewm_var)
+
+    def is_anomalous(self, value: float, n_sigma: float = N_SIGMA) -> bool:
+        """Whether a reading is outside n_sigma deviations of both the long-run
+        baseline and the recent level. A reading that only leaves the long-run
+        baseline is gradual drift rather than an anomaly."""
+
+        if self.count < MIN_BASELINE_COUNT:
+            return False
+        return (abs(value - self.mean) > n_sigma * self.std
+                and abs(value - self.ewma) > n_sigma * self.ewm_std)
+
+    def update(self, value: float) -> None:
+        """Adds one reading to the statistics"""
+
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        if self.count == 1:
+            self.ewma, self.ewm_var = value, 0.0
+        else:
+            ewma_delta = value - self.ewma
+            self.ewma += EWMA_ALPHA * ewma_delta
+            self.ewm_var = (1 - EWMA_ALPHA) * (self.ewm_var + EWMA_ALPHA * ewma_delta ** 2)
+
+    def to_list(self) -> list[float]:
+        """Returns the statistics in the order they are stored"""
+        return [self.count, self.mean, self.m2, self.ewma, self.ewm_var]
+
+
+class OnlineStatsStore:
+    """Running statistics for every plant and the ID of the last reading included,
+    so each run only has to process readings recorded since the previous one."""
+
+    def __init__(self, last_id: int = 0, plants: dict = None):
+        self.last_id = last_id
+        self.plants = plants or {}
+
+    def get_stats(self, plant_id: int) -> dict[str, RunningStats]:
+        """Returns the statistics of a plant, creating them for a new plant"""
+
+        if plant_id not in self.plants:
+            self.plants[plant_id] = {metric: RunningStats() for metric in METRICS}
+        return self.plants[plant_id]
+
+    def process(self, data: list[dict], n_sigma: float = N_SIGMA) -> list[dict]:
+        """Checks each new reading against its plant's baseline before adding it to
+        the baseline, and returns the anomalous readings in the same format as
+        detection.search_anomalies. Readings must be in record ID order."""
+
+        anomalies = []
+        for row in data:
+            stats = self.get_stats(int(row['PlantID']))
+            moisture = float(row['SoilMoisture'])
+            temperature = float(row['Temperature'])
+
+            moisture_anomaly = stats['SoilMoisture'].is_anomalous(moisture, n_sigma)
+            temperature_anomaly = stats['Temperature'].is_anomalous(temperature, n_sigma)
+            if moisture_anomaly or temperature_anomaly:
+                anomalies.append({
+                    'timestamp': row['TimeRecorded'],
+                    'plant_id': int(row['PlantID']),
+                    'moisture_anomaly': moisture_anomaly,
+                    'temperature_anomaly': temperature_anomaly,
+                    'moisture_value': moisture,
+                    'temperature_value': temperature
+                })
+
+            stats['SoilMoisture'].update(moisture)
+            stats['Temperature'].update(temperature)
+            self.last_id = max(self.last_id, int(row['MeasurementRecordID']))
+
+        return anomalies
+
+    def to_json(self) -> str:
+        """Serialises the store"""
+
+        return json.dumps({
+            'last_id': self.last_id,
+            'plants': {str(plant_id): {metric: stats[metric].to_list() for metric in METRICS}
+                       for plant_id, stats in self.plants.items()}
+        })
+
+    @classmethod
+    def from_json(cls, text: str) -> 'OnlineStatsStore':
+        """Deserialises a store"""
+
+        state = json.loads(text)
+        plants = {int(plant_id): {metric: RunningStats(*values)
+                                  for metric, values in stats.items()}
+                  for plant_id, stats in state['plants'].items()}
+        return cls(state['last_id'], plants)
+
+
+def load_store(aws_client=None, bucket: str = None, path: str = STATE_PATH) -> OnlineStatsStore:
+    """Loads the store from S3 if a bucket is given, otherwise from a local file.
+    Returns an empty store if none has been saved yet."""
+
+    if bucket:
+        try:
+            response = aws_client.get_object(Bucket=bucket, Key=STATE_KEY)
+        except aws_client.exceptions.NoSuchKey:
+            return OnlineStatsStore()
+        return OnlineStatsStore.from_json(response['Body'].read().decode('utf-8'))
+
+    if not os.path.exists(path):
+        return OnlineStatsStore()
+    with open(path, 'r', encoding='utf-8') as file:
+        return OnlineStatsStore.from_json(file.read())
+
+
+def save_store(store: OnlineStatsStore, aws_client=None, bucket: str = None,
+               path: str = STATE_PATH) -> None:
+    """Saves the store to S3 if a bucket is given, otherwise to a local file"""
+
+    if bucket:
+        aws_client.put_object(Bucket=bucket, Key=STATE_KEY, Body=store.to_json())
+        return
+
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(store.to_json())
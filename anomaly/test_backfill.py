@@ -0,0 +1,54 @@
+"""Tests replaying anomaly detection over the archive"""
+
+import csv
+from datetime import datetime, timedelta
+
+import pytest
+
+from backfill import BY_PLANT, backfill, list_archive_keys, select_archive_keys
+
+ARCHIVE_HEADER = ['MeasurementRecordID', 'TimeRecorded', 'SoilMoisture', 'Temperature',
+                  'PlantID']
+
+
+def write_archive_file(directory, export_time, spike_plant=None):
+    path = directory / f"{export_time:%Y-%m-%d-%H:%M:%S}.csv"
+    first_reading = export_time - timedelta(hours=48)
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(ARCHIVE_HEADER)
+        for minute in range(60):
+            for plant_id in (1, 2):
+                moisture = 30 + (minute % 2) * 0.5
+                if plant_id == spike_plant and minute == 30:
+                    moisture = 45
+                writer.writerow([0, first_reading + timedelta(minutes=minute),
+                                 moisture, 12 + (minute % 3) * 0.2, plant_id])
+
+
+def test_select_archive_keys_keeps_exports_that_can_hold_the_range():
+    keys = ['2024/04/02/09:00:00', '2024/04/03/09:00:00', '2024/04/03/23:00:00',
+            '2024/04/06/09:00:00', 'summaries/daily/2024/04/02']
+    selected = select_archive_keys(keys, datetime(2024, 4, 1, 12), datetime(2024, 4, 2))
+    assert selected == ['2024/04/03/09:00:00', '2024/04/03/23:00:00']
+
+
+def test_backfill_writes_anomalies_from_every_partition(tmp_path):
+    write_archive_file(tmp_path, datetime(2024, 4, 3, 9), spike_plant=1)
+    write_archive_file(tmp_path, datetime(2024, 4, 4, 9), spike_plant=2)
+    output = tmp_path / "anomalies.csv"
+
+    total = backfill(str(tmp_path), datetime(2024, 4, 1), datetime(2024, 4, 3), str(output),
+                     by=BY_PLANT, workers=2)
+
+    with open(output, encoding='utf-8') as file:
+        rows = list(csv.DictReader(file))
+    spikes = {(row['plant_id'], row['timestamp']) for row in rows
+              if float(row['moisture_value']) == 45}
+    assert total == len(rows)
+    assert spikes == {('1', '2024-04-01 09:30:00'), ('2', '2024-04-02 09:30:00')}
+
+
+def test_unknown_archive_source_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        list_archive_keys(str(tmp_path / "missing"))
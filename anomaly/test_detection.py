@@ -0,0 +1,42 @@
+"""Tests the vectorised per-plant anomaly engine"""
+
+from datetime import datetime
+
+from detection import search_anomalies, summarise_anomalies
+
+
+def make_rows(plant_id, moistures, temperatures):
+    return [{'PlantID': plant_id, 'TimeRecorded': datetime(2024, 4, 16, 12, minute),
+             'SoilMoisture': moisture, 'Temperature': temperature}
+            for minute, (moisture, temperature) in enumerate(zip(moistures, temperatures))]
+
+
+def test_search_anomalies_uses_each_plants_own_baseline():
+    # Plant 2 is always much hotter than plant 1, which alone is not anomalous
+    rows = (make_rows(1, [30] * 10, [10] * 9 + [20]) +
+            make_rows(2, [30] * 10, [40] * 10))
+    anomalies = search_anomalies(rows)
+    assert len(anomalies) == 1
+    assert anomalies[0]['plant_id'] == 1
+    assert anomalies[0]['temperature_anomaly']
+    assert not anomalies[0]['moisture_anomaly']
+    assert anomalies[0]['temperature_value'] == 20
+
+
+def test_search_anomalies_without_data():
+    assert search_anomalies([]) == []
+
+
+def test_summarise_anomalies_counts_per_plant():
+    anomalies = [
+        {'plant_id': 3, 'temperature_anomaly': True, 'moisture_anomaly': True},
+        {'plant_id': 5, 'temperature_anomaly': False, 'moisture_anomaly': True},
+        {'plant_id': 3, 'temperature_anomaly': True, 'moisture_anomaly': False}
+    ]
+    summary = summarise_anomalies(anomalies, {3: 'Bird Of Paradise', 5: 'Cactus'})
+    assert summary == [
+        {'plant_id': 3, 'plant_name': 'Bird Of Paradise', 'temp_anomaly_num': 2,
+         'moisture_anomaly_num': 1, 'total_anomaly_num': 3},
+        {'plant_id': 5, 'plant_name': 'Cactus', 'temp_anomaly_num': 0,
+         'moisture_anomaly_num': 1, 'total_anomaly_num': 1}
+    ]
@@ -0,0 +1,71 @@
+"""Tests the pluggable anomaly detectors"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from detectors import (build_detectors, detect_per_plant, exponential_moving_average,
+                       load_detector_config, run_detectors, search_anomalies_with_detectors)
+
+
+def noisy_series(n_readings=60, seed=0):
+    return 30 + np.random.default_rng(seed).normal(0, 0.5, n_readings)
+
+
+def test_detectors_flag_a_spike():
+    values = noisy_series()
+    values[40] += 6
+    flags = run_detectors(values, build_detectors())
+    assert flags['zscore'][40]
+    assert flags['mad'][40]
+    assert flags['rate_of_change'][40]
+    assert not flags['flatline'].any()
+
+
+def test_flatline_detector_flags_stuck_sensor():
+    values = noisy_series()
+    values[30:] = values[30]
+    flags = run_detectors(values, build_detectors())
+    assert not flags['flatline'][:40].any()
+    assert flags['flatline'][40:].all()
+
+
+@pytest.mark.parametrize('alpha', [0.05, 0.5, 0.99])
+def test_exponential_moving_average_matches_the_recursion(alpha):
+    values = noisy_series(20_000)
+    expected, level = [], 25.0
+    for value in values:
+        level = alpha * value + (1 - alpha) * level
+        expected.append(level)
+    assert np.allclose(exponential_moving_average(values, alpha, 25.0), expected)
+
+
+def test_detect_per_plant_uses_each_plants_readings():
+    plant_ids = np.repeat([1, 2], 60)
+    plant_1 = np.tile([29.5, 30.5], 30)
+    plant_1[50] = 33
+    values = np.concatenate((plant_1, np.tile([32.5, 33.5], 30)))
+    flags = detect_per_plant(plant_ids, values, build_detectors())
+    assert list(np.flatnonzero(flags['zscore'])) == [50]
+
+
+def test_load_detector_config_applies_overrides():
+    config = load_detector_config('{"mad": {"threshold": 8}, "flatline": {"enabled": false}}')
+    assert config['mad'] == {'window': 15, 'threshold': 8}
+    assert 'flatline' not in [detector.name for detector in build_detectors(config)]
+    with pytest.raises(ValueError):
+        load_detector_config('{"humidity": {}}')
+
+
+def test_search_anomalies_with_detectors_names_detectors():
+    start = datetime(2024, 4, 16, 12)
+    moistures = noisy_series()
+    moistures[45] += 6
+    rows = [{'PlantID': 3, 'TimeRecorded': start + timedelta(minutes=i),
+             'SoilMoisture': moisture, 'Temperature': 12 + (i % 2) * 0.1}
+            for i, moisture in enumerate(moistures)]
+    anomalies = search_anomalies_with_detectors(rows[::-1])
+    spike = [a for a in anomalies if a['timestamp'] == start + timedelta(minutes=45)]
+    assert spike[0]['moisture_anomaly']
+    assert 'zscore' in spike[0]['detectors']
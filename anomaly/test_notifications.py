@@ -0,0 +1,69 @@
+"""Tests grouping, rendering and dispatching anomaly emails"""
+
+from notifications import (FileTransport, Transport, build_messages, dispatch,
+                           group_by_botanist, render_email)
+
+PLANT_ANOMALIES = [
+    {'plant_id': 1, 'plant_name': 'Venus Flytrap', 'temp_anomaly_num': 1,
+     'moisture_anomaly_num': 4, 'total_anomaly_num': 5},
+    {'plant_id': 2, 'plant_name': 'Corpse Flower', 'temp_anomaly_num': 0,
+     'moisture_anomaly_num': 3, 'total_anomaly_num': 3},
+    {'plant_id': 3, 'plant_name': 'Rafflesia & Co', 'temp_anomaly_num': 2,
+     'moisture_anomaly_num': 0, 'total_anomaly_num': 2}
+]
+PLANT_BOTANISTS = {
+    1: {'email': 'carl.linnaeus@lnhm.co.uk', 'name': 'Carl Linnaeus'},
+    3: {'email': 'carl.linnaeus@lnhm.co.uk', 'name': 'Carl Linnaeus'}
+}
+
+
+class FlakyTransport(Transport):
+    """Fails the first attempt at sending to each recipient"""
+
+    def __init__(self):
+        self.attempts = {}
+
+    def send(self, recipients, subject, html):
+        key = tuple(recipients)
+        self.attempts[key] = self.attempts.get(key, 0) + 1
+        if self.attempts[key] == 1:
+            raise ConnectionError("throttled")
+
+
+def test_group_by_botanist():
+    groups = group_by_botanist(PLANT_ANOMALIES, PLANT_BOTANISTS)
+    assert [plant['plant_id'] for plant in groups['carl.linnaeus@lnhm.co.uk']['plants']] == [1, 3]
+    assert [plant['plant_id'] for plant in groups[None]['plants']] == [2]
+
+
+def test_render_email_escapes_names():
+    html = render_email(PLANT_ANOMALIES[2:], 'Carl Linnaeus')
+    assert 'Hello Carl Linnaeus' in html
+    assert 'Rafflesia &amp; Co' in html
+
+
+def test_build_messages_sends_unassigned_plants_only_in_the_digest():
+    messages = build_messages(PLANT_ANOMALIES, PLANT_BOTANISTS, ['digest@lnhm.co.uk'])
+    assert [message['recipients'] for message in messages] == [
+        ['carl.linnaeus@lnhm.co.uk'], ['digest@lnhm.co.uk']]
+    assert 'Corpse Flower' not in messages[0]['html']
+    assert 'Corpse Flower' in messages[1]['html']
+
+
+def test_dispatch_retries_failures():
+    transport = FlakyTransport()
+    messages = [{'recipients': [f"botanist{i}@lnhm.co.uk"], 'subject': 'Test', 'html': ''}
+                for i in range(10)]
+    result = dispatch(messages, transport, rate=0, retry_delay=0)
+    assert result == {'sent': 10, 'failed': []}
+    assert all(attempts == 2 for attempts in transport.attempts.values())
+
+    result = dispatch(messages[:1], FlakyTransport(), rate=0, max_attempts=1)
+    assert result == {'sent': 0, 'failed': [['botanist0@lnhm.co.uk']]}
+
+
+def test_file_transport_writes_each_email(tmp_path):
+    transport = FileTransport(str(tmp_path))
+    messages = build_messages(PLANT_ANOMALIES, PLANT_BOTANISTS, ['digest@lnhm.co.uk'])
+    assert dispatch(messages, transport, rate=0)['sent'] == 2
+    assert len(list(tmp_path.iterdir())) == 2
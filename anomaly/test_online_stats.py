@@ -0,0 +1,53 @@
+"""Tests the incremental per-plant running statistics"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from online_stats import OnlineStatsStore, RunningStats, load_store, save_store
+
+
+def make_rows(plant_id, moistures, first_id=1):
+    start = datetime(2024, 4, 16, 12)
+    return [{'MeasurementRecordID': first_id + i, 'PlantID': plant_id,
+             'TimeRecorded': start + timedelta(minutes=i),
+             'SoilMoisture': moisture, 'Temperature': 12.0}
+            for i, moisture in enumerate(moistures)]
+
+
+def test_running_stats_match_numpy():
+    values = np.random.default_rng(1).normal(30, 2, 500)
+    stats = RunningStats()
+    for value in values:
+        stats.update(value)
+    assert stats.count == 500
+    assert np.isclose(stats.mean, values.mean())
+    assert np.isclose(stats.std, values.std())
+
+
+def test_store_flags_reading_against_previous_runs():
+    store = OnlineStatsStore()
+    baseline = [29.5, 30.5] * 30
+    assert store.process(make_rows(4, baseline)) == []
+    assert store.last_id == 60
+
+    anomalies = store.process(make_rows(4, [30.2, 45.0], first_id=61))
+    assert len(anomalies) == 1
+    assert anomalies[0]['plant_id'] == 4
+    assert anomalies[0]['moisture_anomaly']
+    assert not anomalies[0]['temperature_anomaly']
+
+
+def test_store_round_trips_through_file(tmp_path):
+    store = OnlineStatsStore()
+    store.process(make_rows(4, [30.0, 31.0, 29.0]))
+    path = str(tmp_path / "state.json")
+    save_store(store, path=path)
+
+    loaded = load_store(path=path)
+    assert loaded.last_id == 3
+    assert loaded.plants[4]['SoilMoisture'].to_list() == store.plants[4]['SoilMoisture'].to_list()
+
+
+def test_load_store_without_saved_state(tmp_path):
+    assert load_store(path=str(tmp_path / "missing.json")).last_id == 0
@@ -0,0 +1,4 @@
+'''Thresholds shared by the anomaly engines. Kept free of heavy imports so the
+SQL engine can use them without loading NumPy.'''
+
+N_SIGMA = 2
@@ -0,0 +1,269 @@
+'''Benchmarks the whole system offline at several scales. Each run seeds a
+synthetic garden into local stand-ins for the plants API, the database and S3,
+then runs extract -> transform -> load -> anomaly -> archive -> dashboard
+loaders, including the archive summaries, through the components' own code,
+recording throughput, latency and peak Python memory per stage as JSON for
+regression comparison.
+Run with: python benchmark_end_to_end.py --scales 50 1000 10000 --output results.json
+Compare with: python benchmark_end_to_end.py --compare previous.json'''
+import argparse
+import asyncio
+import importlib.util
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import tracemalloc
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime, timedelta
+from pathlib import Path
+from time import perf_counter
+
+from fake_api import FakePlantsAPI
+from fake_database import FakeDatabase
+from fake_s3 import create_s3_client
+from synthetic import SyntheticGarden
+
+ROOT = Path(__file__).resolve().parent.parent
+SCALES = [50, 1000, 10000]
+HISTORY_MINUTES = 60
+ARCHIVE_MINUTES = 30
+ARCHIVE_AGE = timedelta(hours=25)
+BUCKET = 'permian-triassic'
+REGRESSION_THRESHOLD = 1.25
+CONFIG = {'DB_HOST': 'localhost', 'DB_USER': 'benchmark', 'DB_PASSWORD': 'benchmark',
+          'DB_NAME': 'plants', 'DB_PORT': '1433'}
+
+
+def import_component(component: str, module: str, alias: str = None):
+    """Imports a module from a component's directory under an alias, since
+    several components have modules of the same name"""
+
+    directory = str(ROOT / component)
+    if directory not in sys.path:
+        sys.path.append(directory)
+    spec = importlib.util.spec_from_file_location(alias or module,
+                                                  os.path.join(directory, f"{module}.py"))
+    loaded = importlib.util.module_from_spec(spec)
+    sys.modules[alias or module] = loaded
+    spec.loader.exec_module(loaded)
+    return loaded
+
+
+class StageRecorder:
+    """Times stages and records their throughput and peak Python heap memory"""
+
+    def __init__(self, track_memory: bool = True):
+        self.track_memory = track_memory
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Records the enclosed block as a stage. The block sets 'items' on the
+        yielded dict, and may add other measurements."""
+
+        record = {'items': 0}
+        if self.track_memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        start = perf_counter()
+        with redirect_stdout(io.StringIO()):
+            yield record
+        seconds = perf_counter() - start
+
+        record['seconds'] = round(seconds, 6)
+        record['items_per_second'] = round(record['items'] / seconds, 1) if seconds else None
+        if self.track_memory:
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+            record['peak_memory_mb'] = round(peak / 2 ** 20, 2)
+        self.stages[name] = record
+        print(f"  {name:<20} {seconds * 1000:10.1f} ms  {record['items']:>9} items  "
+              f"{record.get('peak_memory_mb', '-'):>8} MB")
+
+
+def seed_database(database: FakeDatabase, garden: SyntheticGarden,
+                  history_minutes: int, archive_minutes: int) -> int:
+    """Seeds the garden's tables, the last history_minutes of readings and
+    archive_minutes of readings old enough to be archived. Returns the rows."""
+
+    database.insert_frame('Botanist', garden.botanists())
+    database.insert_frame('Location', garden.locations())
+    database.insert_frame('Plant', garden.plants())
+    old = garden.readings(garden.now - ARCHIVE_AGE, archive_minutes)
+    recent = garden.readings(garden.now - timedelta(minutes=1), history_minutes)
+    database.insert_frame('PlantMeasurementRecord', old)
+    database.insert_frame('PlantMeasurementRecord', recent)
+    return len(old) + len(recent)
+
+
+def run_scale(n_plants: int, args) -> dict:
+    """Runs every stage against a fresh synthetic garden of n_plants plants"""
+
+    pipeline = import_component('pipeline', 'pipeline')
+    anomaly = import_component('anomaly', 'anomaly')
+    notifications = sys.modules['notifications']
+    archive = import_component('database', 'load_from_db', 'archive_load_from_db')
+    dashboard = import_component('dashboard', 'load_from_db', 'dashboard_load_from_db')
+    dashboard_s3 = import_component('dashboard', 'load_from_s3', 'dashboard_load_from_s3')
+    query_archive = import_component('dashboard', 'query_archive')
+    dashboard_summaries = import_component('dashboard', 'summaries', 'dashboard_summaries')
+    metrics = sys.modules['metrics']
+
+    garden = SyntheticGarden(n_plants, datetime.now())
+    database = FakeDatabase(garden.now)
+    api = FakePlantsAPI(garden.api_responses(), args.api_latency).start()
+    s3_client, stop_s3 = create_s3_client(BUCKET)
+    for module in (pipeline, anomaly, archive, dashboard):
+        module.connect = database.connect
+    pipeline.API_URL = api.url
+    archive._s3_client = s3_client  # pylint: disable=protected-access
+    for key, value in CONFIG.items():
+        os.environ.setdefault(key, value)
+
+    recorder = StageRecorder(not args.no_memory)
+    print(f"{n_plants} plants")
+    try:
+        with recorder.stage('seed') as record:
+            record['items'] = seed_database(database, garden, args.history_minutes,
+                                            args.archive_minutes)
+
+        with recorder.stage('extract') as record:
+            run_metrics = pipeline.start_run('benchmark')
+            plant_data = asyncio.run(pipeline.extract_plant_data(range(1, n_plants + 1)))
+            latencies = run_metrics.histograms[('extract_request_seconds', ())]
+            record['items'] = len(plant_data)
+            summary = metrics.summarise(latencies)
+            record.update({f"request_{key}_ms": round(summary[key] * 1000, 3)
+                           for key in ('p50', 'p95', 'p99', 'max')})
+
+        with recorder.stage('transform') as record:
+            cleaned_data = pipeline.clean_data(plant_data)
+            record['items'] = len(cleaned_data)
+
+        with recorder.stage('load') as record:
+            queries = database.queries
+            connection = pipeline.get_database_connection(CONFIG)
+            query_string = pipeline.db_query_string(cleaned_data, connection)
+            pipeline.db_inserting_data(query_string, connection)
+            record['items'] = len(cleaned_data)
+            record['round_trips'] = database.queries - queries
+            record['bytes'] = len(query_string.encode('utf-8'))
+
+        last_hour = database.connection.execute(
+            "SELECT COUNT(*) FROM s_epsilon.PlantMeasurementRecord WHERE TimeRecorded >= ?",
+            [garden.now - timedelta(hours=1)]).fetchone()[0]
+        for mode in (anomaly.LOCAL_MODE, anomaly.SQL_MODE, anomaly.DETECTORS_MODE):
+            with recorder.stage(f'anomaly_{mode}') as record:
+                connection = anomaly.get_database_connection(CONFIG)
+                plant_anomalies = anomaly.get_plant_anomaly_list(connection, mode)
+                record['items'] = last_hour
+                record['anomalous_plants'] = len(plant_anomalies)
+
+        with recorder.stage('notify') as record, tempfile.TemporaryDirectory() as outbox:
+            connection = anomaly.get_database_connection(CONFIG)
+            plant_botanists = anomaly.get_plant_botanist_dict(connection)
+            messages = notifications.build_messages(plant_anomalies, plant_botanists)
+            result = notifications.dispatch(messages, notifications.FileTransport(outbox),
+                                            rate=0)
+            record['items'] = result['sent']
+
+        with recorder.stage('archive') as record:
+            before = database.count('PlantMeasurementRecord')
+            archive.archive_old_data(metrics.Metrics('archive'))
+            record['items'] = before - database.count('PlantMeasurementRecord')
+
+        with recorder.stage('dashboard_hot') as record:
+            frame = dashboard.load_frame(CONFIG)
+            dashboard.load_latest_readings(CONFIG)
+            dashboard.load_summary_metrics(CONFIG)
+            dashboard.load_extreme_values(CONFIG)
+            dashboard.get_data_version(CONFIG)
+            record['items'] = len(frame)
+
+        with recorder.stage('dashboard_archive') as record, \
+                tempfile.TemporaryDirectory() as directory:
+            keys = dashboard_s3.filter_objects(
+                BUCKET, dashboard_s3.get_bucket_objects(s3_client, BUCKET),
+                dashboard_s3.FILE_STRUCTURE, s3_client)
+            dashboard_s3.download_plant_data_files(s3_client, keys, BUCKET, directory)
+            archived = query_archive.query_archive(list(range(1, n_plants + 1)),
+                                                   directory=directory)
+            record['items'] = len(archived)
+
+        with recorder.stage('dashboard_summaries') as record, \
+                tempfile.TemporaryDirectory() as directory:
+            dashboard_s3.sync_summaries(s3_client, directory)
+            summaries = dashboard_summaries.query_summaries(list(range(1, n_plants + 1)),
+                                                            directory=directory)
+            record['items'] = len(summaries)
+            record['bytes'] = sum(os.path.getsize(os.path.join(root, name))
+                                  for root, _, names in os.walk(directory) for name in names)
+    finally:
+        api.stop()
+        stop_s3()
+
+    return {'plants': n_plants, 'stages': recorder.stages}
+
+
+def compare(results: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD) -> list:
+    """Prints the change in each stage's time against a baseline run and returns
+    the stages that slowed down by more than the threshold"""
+
+    regressions = []
+    for scale, result in results['scales'].items():
+        baseline_stages = baseline['scales'].get(scale, {}).get('stages', {})
+        for name, stage in result['stages'].items():
+            if name not in baseline_stages or not baseline_stages[name]['seconds']:
+                continue
+            ratio = stage['seconds'] / baseline_stages[name]['seconds']
+            flag = "  REGRESSION" if ratio > threshold else ""
+            print(f"{scale:>6} {name:<20} {ratio:6.2f}x{flag}")
+            if flag:
+                regressions.append((scale, name, ratio))
+    return regressions
+
+
+def parse_args():
+    """Parses the command line arguments"""
+
+    parser = argparse.ArgumentParser(description="End-to-end offline benchmark")
+    parser.add_argument('--scales', type=int, nargs='+', default=SCALES,
+                        help="numbers of plants to run with")
+    parser.add_argument('--history-minutes', type=int, default=HISTORY_MINUTES)
+    parser.add_argument('--archive-minutes', type=int, default=ARCHIVE_MINUTES)
+    parser.add_argument('--api-latency', type=float, default=0.0,
+                        help="seconds the fake API waits before each response")
+    parser.add_argument('--no-memory', action='store_true',
+                        help="skip memory tracking, which slows Python code down")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', default=None,
+                        help="a previous results file to compare against")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if not args.no_memory:
+        tracemalloc.start()
+
+    results = {
+        'generated_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'settings': {'history_minutes': args.history_minutes,
+                     'archive_minutes': args.archive_minutes,
+                     'api_latency': args.api_latency,
+                     'memory_tracked': not args.no_memory},
+        'scales': {str(n_plants): run_scale(n_plants, args) for n_plants in args.scales}
+    }
+
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            regressions = compare(results, json.load(file))
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,170 @@
+"""Benchmarks the memory and CPU time per reading of the pipeline's Reading record
+against the plain dicts readings used to be, at 10k readings a minute. Each
+reading is built from a freshly decoded API response, cleaned and written into
+the insert query string by the pipeline's own db_query_string, over several
+consecutive minute runs. Every plant has its own last watered time, which
+changes once a day, so the last watered cache sees the hits and misses of a
+real run.
+Run with: python benchmark_records.py"""
+import json
+import tracemalloc
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from benchmark_end_to_end import import_component
+
+READINGS = 10_000
+PLANTS_PER_BOTANIST = 20
+RUNS = 5
+START = datetime(2024, 4, 16, 12, 21, 22)
+LAST_WATERED_FORMAT = '%a, %d %b %Y %H:%M:%S GMT'
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+def get_last_watered(plant_id: int, now: datetime) -> str:
+    """Returns when a plant was last watered, each plant being watered once a day
+    at its own time"""
+
+    watered_second = plant_id * 7919 % SECONDS_PER_DAY
+    day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    watered = day_start + timedelta(seconds=watered_second)
+    if watered > now:
+        watered -= timedelta(days=1)
+    return watered.strftime(LAST_WATERED_FORMAT)
+
+
+def make_responses(n_readings: int, now: datetime) -> list[bytes]:
+    """Returns the plants API response bodies of n_readings plants at a time"""
+
+    return [json.dumps({
+        "botanist": {"email": f"botanist{i // PLANTS_PER_BOTANIST}@lnhm.co.uk",
+                     "name": f"Botanist {i // PLANTS_PER_BOTANIST}",
+                     "phone": f"(146)994-{i // PLANTS_PER_BOTANIST:04d}"},
+        "last_watered": get_last_watered(i, now),
+        "name": f"Plant {i % 50}",
+        "origin_location": ["7.65649", "4.92235", f"Town {i % 50}", "NG", "Africa/Lagos"],
+        "plant_id": i,
+        "recording_taken": str(now),
+        "soil_moisture": 27.36278335759782 + i % 7,
+        "temperature": 9.117554081392257 + i % 5
+    }).encode() for i in range(n_readings)]
+
+
+class BotanistConnection:
+    """Stands in for a pymssql connection that only answers the botanist query"""
+
+    def __init__(self, n_botanists: int):
+        self.rows = [{'BotanistID': i, 'Email': f"botanist{i}@lnhm.co.uk"}
+                     for i in range(n_botanists)]
+
+    def cursor(self, as_dict: bool = False):
+        """Returns a cursor over the botanist rows"""
+
+        assert as_dict
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+    def execute(self, query: str) -> None:
+        """Accepts the botanist query"""
+
+        assert 'Botanist' in query
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+def build_dict(plant_info: dict) -> dict:
+    """Builds a reading the way extract_data_for_each_plant used to"""
+
+    data_to_append = {
+        'id': plant_info.get('plant_id'),
+        'name': plant_info.get('name'),
+        'soil_moisture': plant_info.get('soil_moisture'),
+        'temperature': plant_info.get('temperature'),
+        'recording_taken': plant_info.get('recording_taken'),
+        'last_watered': plant_info.get('last_watered'),
+        'botanist_name': plant_info['botanist']['name'],
+        'botanist_email': plant_info['botanist']['email'],
+        'botanist_phone': plant_info['botanist']['phone']
+    }
+    origin_location = plant_info['origin_location']
+    data_to_append['latitude'] = origin_location[0]
+    data_to_append['longitude'] = origin_location[1]
+    data_to_append['origin_location'] = origin_location[-3:]
+    return data_to_append
+
+
+def clean_dicts(plant_data: list[dict]) -> list[dict]:
+    """Cleans dict readings the way clean_data used to"""
+
+    for plant in plant_data:
+        plant['soil_moisture'] = round(float(plant['soil_moisture']), 2)
+        plant['temperature'] = round(float(plant['temperature']), 2)
+    for plant in plant_data:
+        plant['name'] = plant['name'].title().replace(r'[^\w\s]', '')
+    return plant_data
+
+
+def dict_query_string(data: list[dict], conn, get_botanist_id_dictionary) -> str:
+    """Writes dict readings into the insert query the way db_query_string used to"""
+
+    botanist_dict = get_botanist_id_dictionary(conn)
+    output_string = ""
+    for row in data:
+        output_string += f"""( '{row['recording_taken']}', {float(row['soil_moisture'])},
+          {float(row['temperature'])}, '{str(datetime.strptime(row['last_watered'], '%a, %d %b %Y %H:%M:%S %Z'))}',
+            {int(row['id'])}, {int(botanist_dict[row['botanist_email']])} ),"""
+    return output_string[:-1]
+
+
+def measure(runs: list[list[bytes]], build, clean, write, conn) -> dict:
+    """Returns the mean time to build, clean and write every reading over the runs
+    and the memory the built readings of one run hold, each per reading"""
+
+    seconds = 0.0
+    for responses in runs:
+        start = perf_counter()
+        readings = clean([build(json.loads(body)) for body in responses])
+        write(readings, conn)
+        seconds += perf_counter() - start
+        del readings
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    readings = clean([build(json.loads(body)) for body in runs[-1]])
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    n_readings = sum(len(responses) for responses in runs)
+    return {'us_per_reading': seconds / n_readings * 1e6,
+            'bytes_per_reading': held / len(readings)}
+
+
+if __name__ == "__main__":
+    pipeline = import_component('pipeline', 'pipeline')
+    records = import_component('pipeline', 'records')
+    connection = BotanistConnection(READINGS // PLANTS_PER_BOTANIST + 1)
+    minute_runs = [make_responses(READINGS, START + timedelta(minutes=minute))
+                   for minute in range(RUNS)]
+
+    before = measure(minute_runs, build_dict, clean_dicts,
+                     lambda data, conn: dict_query_string(
+                         data, conn, pipeline.get_botanist_id_dictionary),
+                     connection)
+    pipeline.parse_last_watered.cache_clear()
+    after = measure(minute_runs, records.Reading.from_api, pipeline.clean_data,
+                    pipeline.db_query_string, connection)
+    cache_info = pipeline.parse_last_watered.cache_info()
+
+    print(f"{READINGS} readings a minute over {RUNS} minutes")
+    print(f"  memory: {before['bytes_per_reading']:.0f} -> "
+          f"{after['bytes_per_reading']:.0f} bytes per reading "
+          f"({1 - after['bytes_per_reading'] / before['bytes_per_reading']:.0%} smaller)")
+    print(f"  cpu:    {before['us_per_reading']:.1f} -> {after['us_per_reading']:.1f} "
+          f"us per reading ({1 - after['us_per_reading'] / before['us_per_reading']:.0%} faster)")
+    print(f"  last watered cache: {cache_info.hits} hits, {cache_info.misses} misses")
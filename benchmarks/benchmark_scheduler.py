@@ -0,0 +1,82 @@
+'''Simulates a day of minute runs with the adaptive polling scheduler against a
+garden of stable and changing plants, and compares the API requests and rows
+loaded with polling every plant every minute, and how stale the loaded data is.
+Run with: python benchmark_scheduler.py --plants 1000 --minutes 1440'''
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from benchmark_end_to_end import import_component
+
+STABLE_SHARE = 0.8
+STABLE_NOISE = 0.3
+CHANGING_NOISE = 3.0
+SPIKE_RATE = 0.001
+
+
+def simulate_readings(n_plants: int, minutes: int, seed: int = 42) -> tuple:
+    """Returns the soil moisture and temperature of every plant each minute.
+    Most plants barely change, the rest are noisy, and any plant may spike."""
+
+    rng = np.random.default_rng(seed)
+    noise = np.where(rng.random(n_plants) < STABLE_SHARE, STABLE_NOISE, CHANGING_NOISE)
+    moisture = rng.uniform(15, 45, n_plants)[:, None] + rng.normal(
+        0, 1, (n_plants, minutes)) * noise[:, None]
+    temperature = rng.uniform(8, 30, n_plants)[:, None] + rng.normal(
+        0, 0.5, (n_plants, minutes)) * noise[:, None]
+    spikes = rng.random((n_plants, minutes)) < SPIKE_RATE
+    moisture[spikes] += 15
+    return moisture, temperature
+
+
+def simulate(n_plants: int, minutes: int) -> dict:
+    """Runs the scheduler once a simulated minute and counts the polls"""
+
+    scheduler_module = import_component('pipeline', 'scheduler')
+    reading_class = sys.modules['records'].Reading
+    scheduler = scheduler_module.PollScheduler()
+    moisture, temperature = simulate_readings(n_plants, minutes)
+    plant_ids = list(range(n_plants))
+    polled_moisture = np.zeros(n_plants)
+    staleness = []
+    polls = 0
+
+    for minute in range(minutes):
+        now = minute * 60.0
+        due_ids = scheduler.get_due(plant_ids, now)
+        polls += len(due_ids)
+        readings = [reading_class(plant_id, f"Plant {plant_id}", moisture[plant_id, minute],
+                                  temperature[plant_id, minute], str(minute), '', '', '', '')
+                    for plant_id in due_ids]
+        polled_moisture[due_ids] = moisture[due_ids, minute]
+        anomalous_ids = [plant_id for plant_id in due_ids if minute and abs(
+            moisture[plant_id, minute] - moisture[plant_id, minute - 1]) > 10]
+        scheduler.record(due_ids, readings, anomalous_ids, now)
+        staleness.append(np.abs(moisture[:, minute] - polled_moisture).mean())
+
+    every_minute = n_plants * minutes
+    return {
+        'plants': n_plants,
+        'minutes': minutes,
+        'polls': polls,
+        'polls_every_minute': every_minute,
+        'poll_reduction': round(1 - polls / every_minute, 3),
+        'mean_interval_seconds': round(scheduler.mean_interval(), 1),
+        'mean_moisture_error': round(float(np.mean(staleness)), 3)
+    }
+
+
+def parse_args():
+    """Parses the command line arguments"""
+
+    parser = argparse.ArgumentParser(description="Adaptive polling simulation")
+    parser.add_argument('--plants', type=int, default=1000)
+    parser.add_argument('--minutes', type=int, default=1440)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print(json.dumps(simulate(args.plants, args.minutes), indent=2))
@@ -0,0 +1,70 @@
+'''A local stand-in for the plants API, served by aiohttp from a background thread.'''
+import asyncio
+import socket
+from threading import Event, Thread
+
+from aiohttp import web
+
+
+class FakePlantsAPI:
+    """Serves /plants/{plant_id} from prepared responses, optionally after a delay
+    like the real API's response time. Unknown plants get a 404, as they do from
+    the real API."""
+
+    def __init__(self, responses: dict[int, dict], latency: float = 0.0):
+        self.responses = responses
+        self.latency = latency
+        self.port = None
+        self.requests = 0
+        self._loop = None
+        self._runner = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """The base URL that plant IDs are appended to"""
+        return f"http://127.0.0.1:{self.port}/plants/"
+
+    async def get_plant(self, request: web.Request) -> web.Response:
+        """Returns one plant's response"""
+
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        plant = self.responses.get(int(request.match_info['plant_id']))
+        if plant is None:
+            return web.json_response({'error': 'plant not found'}, status=404)
+        return web.json_response(plant)
+
+    def start(self) -> 'FakePlantsAPI':
+        """Starts serving on a free local port"""
+
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            self.port = probe.getsockname()[1]
+
+        started = Event()
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            app = web.Application()
+            app.router.add_get('/plants/{plant_id}', self.get_plant)
+            self._runner = web.AppRunner(app, access_log=None)
+            self._loop.run_until_complete(self._runner.setup())
+            site = web.TCPSite(self._runner, '127.0.0.1', self.port, backlog=1024)
+            self._loop.run_until_complete(site.start())
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = Thread(target=serve, daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def stop(self) -> None:
+        """Stops serving"""
+
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
@@ -0,0 +1,223 @@
+'''An in-process stand-in for the SQL Server database, backed by DuckDB.
+Connections behave like pymssql's: parameters are substituted client side with
+pymssql's placeholders, rows can be returned as dicts, and the T-SQL the
+components use is translated to DuckDB's dialect before it runs.'''
+import re
+from datetime import date, datetime
+from decimal import Decimal
+
+import duckdb
+
+SCHEMA = """
+CREATE SCHEMA IF NOT EXISTS s_epsilon;
+CREATE SEQUENCE IF NOT EXISTS s_epsilon.BotanistIDs START 1;
+CREATE SEQUENCE IF NOT EXISTS s_epsilon.LocationIDs START 1;
+CREATE SEQUENCE IF NOT EXISTS s_epsilon.MeasurementRecordIDs START 1;
+
+CREATE TABLE s_epsilon.Botanist(
+    BotanistID INTEGER PRIMARY KEY DEFAULT nextval('s_epsilon.BotanistIDs'),
+    FirstName VARCHAR NOT NULL,
+    LastName VARCHAR NOT NULL,
+    Email VARCHAR,
+    Phone VARCHAR
+);
+
+CREATE TABLE s_epsilon.Location(
+    LocationID INTEGER PRIMARY KEY DEFAULT nextval('s_epsilon.LocationIDs'),
+    Longitude DECIMAL(11,6) NOT NULL,
+    Latitude DECIMAL(11,6) NOT NULL,
+    Town VARCHAR NOT NULL,
+    City VARCHAR NOT NULL,
+    CountryCode VARCHAR NOT NULL,
+    Continent VARCHAR NOT NULL
+);
+
+CREATE TABLE s_epsilon.Plant(
+    PlantID INTEGER PRIMARY KEY,
+    Name VARCHAR NOT NULL,
+    ScientificName VARCHAR,
+    LocationID INTEGER NOT NULL
+);
+
+CREATE TABLE s_epsilon.PlantMeasurementRecord(
+    MeasurementRecordID INTEGER PRIMARY KEY
+        DEFAULT nextval('s_epsilon.MeasurementRecordIDs'),
+    TimeRecorded TIMESTAMP NOT NULL,
+    SoilMoisture DECIMAL(5,2) NOT NULL,
+    Temperature DECIMAL(5,2) NOT NULL,
+    PlantID INTEGER,
+    BotanistID INTEGER,
+    TimeLastWatered TIMESTAMP NOT NULL
+);
+"""
+
+GETDATE = re.compile(r"GETDATE\(\)", re.IGNORECASE)
+DATEADD = re.compile(r"DATEADD\(\s*(\w+)\s*,\s*(-?\d+)\s*,\s*([^()]+?)\s*\)", re.IGNORECASE)
+TOP = re.compile(r"\bTOP\s+(\d+)\s+", re.IGNORECASE)
+FUNCTIONS = {re.compile(r"\bSTDEVP\(", re.IGNORECASE): "STDDEV_POP(",
+             re.compile(r"\bSTDEV\(", re.IGNORECASE): "STDDEV_SAMP(",
+             re.compile(r"\bISNULL\(", re.IGNORECASE): "COALESCE("}
+
+
+def quote(value) -> str:
+    """Returns a value as a SQL literal, as pymssql does when substituting parameters"""
+
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+    if isinstance(value, datetime):
+        return f"'{value.isoformat(sep=' ')}'"
+    if isinstance(value, date):
+        return f"'{value.isoformat()}'"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def substitute(query: str, params) -> str:
+    """Substitutes pymssql style %s, %d and %(name)s parameters into a query"""
+
+    if params is None:
+        return query
+    if isinstance(params, dict):
+        return query % {key: quote(value) for key, value in params.items()}
+    if not isinstance(params, (tuple, list)):
+        params = (params,)
+    return query.replace("%d", "%s") % tuple(quote(value) for value in params)
+
+
+def move_top_to_limit(query: str) -> str:
+    """Rewrites each SELECT TOP n as a LIMIT n at the end of its own (sub)query"""
+
+    while match := TOP.search(query):
+        depth = 0
+        end = len(query)
+        for position in range(match.end(), len(query)):
+            character = query[position]
+            if character == "(":
+                depth += 1
+            elif character == ")":
+                if depth == 0:
+                    end = position
+                    break
+                depth -= 1
+            elif character == ";" and depth == 0:
+                end = position
+                break
+        query = (query[:match.start()] + query[match.end():end].rstrip()
+                 + f" LIMIT {match.group(1)}" + query[end:])
+    return query
+
+
+def translate(query: str, now: datetime = None) -> str:
+    """Translates the T-SQL the components use into DuckDB SQL. GETDATE() is
+    replaced by now if given, so results do not depend on the wall clock."""
+
+    now_literal = f"TIMESTAMP '{now.isoformat(sep=' ')}'" if now else "CURRENT_LOCALTIMESTAMP"
+    query = GETDATE.sub(now_literal, query)
+    query = DATEADD.sub(lambda m: f"({m.group(3)} + INTERVAL ({m.group(2)}) {m.group(1)})",
+                        query)
+    for pattern, replacement in FUNCTIONS.items():
+        query = pattern.sub(replacement, query)
+    return move_top_to_limit(query)
+
+
+class FakeCursor:
+    """A pymssql style cursor over a DuckDB connection"""
+
+    def __init__(self, database: 'FakeDatabase', as_dict: bool):
+        self.database = database
+        self.as_dict = as_dict
+        self._result = None
+        self.rowcount = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def execute(self, query: str, params=None) -> None:
+        """Runs a query after substituting its parameters and translating it"""
+
+        self.database.queries += 1
+        sql = translate(substitute(query, params), self.database.now)
+        self._result = self.database.connection.cursor().execute(sql)
+        self.rowcount = -1
+
+    def fetchall(self) -> list:
+        """Returns every remaining row of the last query"""
+
+        if self._result is None or self._result.description is None:
+            return []
+        rows = self._result.fetchall()
+        if not self.as_dict:
+            return rows
+        columns = [column[0] for column in self._result.description]
+        return [dict(zip(columns, row)) for row in rows]
+
+    def fetchone(self):
+        """Returns the next row of the last query"""
+
+        row = self._result.fetchone()
+        if row is None or not self.as_dict:
+            return row
+        return dict(zip([column[0] for column in self._result.description], row))
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self) -> None:
+        """Releases the last result"""
+        self._result = None
+
+
+class FakeConnection:
+    """A pymssql style connection. DuckDB commits every statement, so commit is
+    a no-op."""
+
+    def __init__(self, database: 'FakeDatabase', as_dict: bool = False):
+        self.database = database
+        self.as_dict = as_dict
+
+    def cursor(self, as_dict: bool = None) -> FakeCursor:
+        """Returns a new cursor, returning dict rows if as_dict here or on connect"""
+        return FakeCursor(self.database, self.as_dict if as_dict is None else as_dict)
+
+    def commit(self) -> None:
+        """Commits the current transaction"""
+
+    def close(self) -> None:
+        """Closes the connection"""
+
+
+class FakeDatabase:
+    """An in-memory DuckDB database with the s_epsilon schema. Its connect method
+    takes pymssql.connect's place in the components under test."""
+
+    def __init__(self, now: datetime = None):
+        self.now = now
+        self.connection = duckdb.connect()
+        self.connection.execute(SCHEMA)
+        self.connections = 0
+        self.queries = 0
+
+    def connect(self, *_, as_dict: bool = False, **__) -> FakeConnection:
+        """Opens a connection, ignoring the server and credentials"""
+
+        self.connections += 1
+        return FakeConnection(self, as_dict)
+
+    def insert_frame(self, table: str, frame) -> None:
+        """Bulk inserts a DataFrame into a table of the s_epsilon schema"""
+
+        self.connection.register('new_rows', frame)
+        columns = ", ".join(frame.columns)
+        self.connection.execute(
+            f"INSERT INTO s_epsilon.{table} ({columns}) SELECT {columns} FROM new_rows")
+        self.connection.unregister('new_rows')
+
+    def count(self, table: str) -> int:
+        """Returns the number of rows in a table"""
+        return self.connection.execute(f"SELECT COUNT(*) FROM s_epsilon.{table}").fetchone()[0]
@@ -0,0 +1,120 @@
+'''An S3 stand-in for the benchmarks. moto's mocked S3 is used when moto is
+installed; otherwise an in-memory bucket store that implements the calls the
+components make.'''
+import io
+import os
+from datetime import datetime, timezone
+from hashlib import md5
+
+REGION = 'eu-west-2'
+
+
+class NoSuchKey(Exception):
+    """Raised when an object does not exist, like botocore's NoSuchKey"""
+
+
+class Exceptions:
+    """Mirrors the exceptions attribute of a boto3 client"""
+    NoSuchKey = NoSuchKey
+
+
+class Paginator:
+    """Pages through list_objects_v2 results"""
+
+    def __init__(self, s3_client: 'InMemoryS3', page_size: int = 1000):
+        self.s3_client = s3_client
+        self.page_size = page_size
+
+    def paginate(self, Bucket: str, Prefix: str = ''):  # pylint: disable=invalid-name
+        """Yields pages of at most page_size objects"""
+
+        objects = self.s3_client.list_objects_v2(Bucket=Bucket, Prefix=Prefix)['Contents']
+        for start in range(0, max(len(objects), 1), self.page_size):
+            yield {'Contents': objects[start:start + self.page_size]}
+
+
+class InMemoryS3:
+    """The subset of a boto3 S3 client the components use, over dicts of bytes"""
+
+    exceptions = Exceptions
+
+    def __init__(self):
+        self.buckets = {}
+        self.requests = 0
+        self.bytes_uploaded = 0
+
+    def create_bucket(self, Bucket: str, **_) -> None:  # pylint: disable=invalid-name
+        """Creates an empty bucket"""
+        self.buckets.setdefault(Bucket, {})
+
+    def put_object(self, Bucket: str, Key: str, Body, **_) -> dict:  # pylint: disable=invalid-name
+        """Stores an object from bytes or a string"""
+
+        self.requests += 1
+        body = Body.encode('utf-8') if isinstance(Body, str) else bytes(Body)
+        self.bytes_uploaded += len(body)
+        self.buckets[Bucket][Key] = (body, datetime.now(timezone.utc))
+        return {'ETag': f'"{md5(body).hexdigest()}"'}
+
+    def upload_file(self, Filename: str, Bucket: str, Key: str) -> None:  # pylint: disable=invalid-name
+        """Stores a local file as an object"""
+
+        with open(Filename, 'rb') as file:
+            self.put_object(Bucket=Bucket, Key=Key, Body=file.read())
+
+    def get_object(self, Bucket: str, Key: str) -> dict:  # pylint: disable=invalid-name
+        """Returns an object's body as a readable stream"""
+
+        self.requests += 1
+        if Key not in self.buckets[Bucket]:
+            raise NoSuchKey(Key)
+        body, _ = self.buckets[Bucket][Key]
+        return {'Body': io.BytesIO(body), 'ContentLength': len(body)}
+
+    def download_file(self, Bucket: str, Key: str, Filename: str) -> None:  # pylint: disable=invalid-name
+        """Writes an object to a local file"""
+
+        with open(Filename, 'wb') as file:
+            file.write(self.get_object(Bucket=Bucket, Key=Key)['Body'].read())
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = '') -> dict:  # pylint: disable=invalid-name
+        """Lists every object in a bucket whose key starts with the prefix"""
+
+        self.requests += 1
+        return {'Contents': [{'Key': key, 'Size': len(body), 'LastModified': modified,
+                              'ETag': f'"{md5(body).hexdigest()}"'}
+                             for key, (body, modified) in sorted(self.buckets[Bucket].items())
+                             if key.startswith(Prefix)]}
+
+    def list_objects(self, Bucket: str, Prefix: str = '') -> dict:  # pylint: disable=invalid-name
+        """Lists every object in a bucket, like list_objects_v2"""
+        return self.list_objects_v2(Bucket=Bucket, Prefix=Prefix)
+
+    def get_paginator(self, operation: str) -> Paginator:
+        """Returns a paginator for list_objects_v2"""
+
+        if operation != 'list_objects_v2':
+            raise ValueError(f"Unsupported operation: {operation}")
+        return Paginator(self)
+
+
+def create_s3_client(bucket: str):
+    """Returns an S3 client with an empty bucket, and a function that stops any mock.
+    Uses moto if it is installed, otherwise the in-memory stand-in."""
+
+    try:
+        import boto3
+        from moto import mock_aws
+    except ImportError:
+        s3_client = InMemoryS3()
+        s3_client.create_bucket(Bucket=bucket)
+        return s3_client, lambda: None
+
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+    mock = mock_aws()
+    mock.start()
+    s3_client = boto3.client('s3', region_name=REGION)
+    s3_client.create_bucket(Bucket=bucket,
+                            CreateBucketConfiguration={'LocationConstraint': REGION})
+    return s3_client, mock.stop
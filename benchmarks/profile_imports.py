@@ -0,0 +1,88 @@
+'''Profiles the import time of each Lambda handler with python -X importtime, as
+a cold start pays it on every new container. Each handler is imported in a
+fresh interpreter several times and the fastest run is reported, with the
+modules that take longest to import.
+Run with: python profile_imports.py --output import_times.json'''
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+HANDLERS = {
+    'pipeline': ('pipeline', 'pipeline'),
+    'anomaly': ('anomaly', 'anomaly'),
+    'archive': ('database', 'load_from_db')
+}
+REPEATS = 5
+TOP_MODULES = 10
+
+
+def parse_importtime(output: str) -> list[dict]:
+    """Parses -X importtime lines into one entry per module, with its own and
+    cumulative import time in milliseconds and its depth in the import tree"""
+
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line.removeprefix("import time:").split("|")
+        modules.append({'module': name.strip(),
+                        'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+                        'self_ms': int(own) / 1000,
+                        'cumulative_ms': int(cumulative) / 1000})
+    return modules
+
+
+def profile_handler(component: str, module: str, repeats: int = REPEATS) -> dict:
+    """Imports a handler in a fresh interpreter repeats times and returns the
+    fastest run's total and its slowest modules"""
+
+    best = None
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                cwd=ROOT / component, capture_output=True, text=True,
+                                check=True)
+        modules = parse_importtime(result.stderr)
+
+        # The handler's imports are listed before it, after the interpreter's own
+        end = max(i for i, entry in enumerate(modules) if entry['module'] == module)
+        start = max((i + 1 for i, entry in enumerate(modules[:end]) if entry['depth'] == 0),
+                    default=0)
+        total = modules[end]['cumulative_ms']
+        if best is None or total < best['total_ms']:
+            best = {'total_ms': total, 'modules': modules[start:end + 1]}
+
+    direct = [entry for entry in best['modules'] if entry['depth'] == 1]
+    return {
+        'total_ms': best['total_ms'],
+        'slowest_imports': sorted(direct, key=lambda entry: -entry['cumulative_ms'])[
+            :TOP_MODULES],
+        'slowest_modules': sorted(best['modules'], key=lambda entry: -entry['self_ms'])[
+            :TOP_MODULES]
+    }
+
+
+def parse_args():
+    """Parses the command line arguments"""
+
+    parser = argparse.ArgumentParser(description="Profile the Lambda handlers' import time")
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    parser.add_argument('--output', default=None, help="write the report to a JSON file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = {name: profile_handler(component, module, args.repeats)
+              for name, (component, module) in HANDLERS.items()}
+
+    for name, profile in report.items():
+        print(f"{name}: {profile['total_ms']:.1f} ms")
+        for entry in profile['slowest_imports']:
+            print(f"  {entry['module']:<30} {entry['cumulative_ms']:8.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
@@ -0,0 +1,120 @@
+'''Generates synthetic botanists, locations, plants and minute readings at any
+scale, as database tables and as plants API responses.'''
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+PLANTS_PER_BOTANIST = 20
+PLANTS_PER_LOCATION = 5
+SPIKE_RATE = 0.01
+CONTINENTS = ['Europe/London', 'Africa/Lagos', 'Asia/Tokyo', 'America/New_York',
+              'Australia/Sydney']
+LAST_WATERED_FORMAT = '%a, %d %b %Y %H:%M:%S GMT'
+
+
+class SyntheticGarden:
+    """A garden of n_plants plants, each with typical soil moisture and
+    temperature levels, and the botanists and origin locations they belong to"""
+
+    def __init__(self, n_plants: int, now: datetime, seed: int = 42):
+        self.n_plants = n_plants
+        self.now = now.replace(second=0, microsecond=0)
+        self.rng = np.random.default_rng(seed)
+        self.plant_ids = np.arange(1, n_plants + 1)
+        self.n_botanists = max(3, n_plants // PLANTS_PER_BOTANIST)
+        self.n_locations = max(1, n_plants // PLANTS_PER_LOCATION)
+        self.botanist_ids = self.rng.integers(1, self.n_botanists + 1, n_plants)
+        self.location_ids = self.rng.integers(1, self.n_locations + 1, n_plants)
+        self.moisture_bases = self.rng.uniform(15, 45, n_plants)
+        self.temperature_bases = self.rng.uniform(8, 30, n_plants)
+
+    def botanists(self) -> pd.DataFrame:
+        """Returns the Botanist table"""
+
+        ids = np.arange(1, self.n_botanists + 1)
+        return pd.DataFrame({
+            'BotanistID': ids,
+            'FirstName': [f"Botanist{i}" for i in ids],
+            'LastName': [f"Surname{i}" for i in ids],
+            'Email': [f"botanist{i}@lnhm.co.uk" for i in ids],
+            'Phone': [f"(146)994-{i:04d}" for i in ids]
+        })
+
+    def locations(self) -> pd.DataFrame:
+        """Returns the Location table"""
+
+        ids = np.arange(1, self.n_locations + 1)
+        continents = [CONTINENTS[i % len(CONTINENTS)] for i in ids]
+        return pd.DataFrame({
+            'LocationID': ids,
+            'Longitude': np.round(self.rng.uniform(-180, 180, len(ids)), 6),
+            'Latitude': np.round(self.rng.uniform(-90, 90, len(ids)), 6),
+            'Town': [f"Town{i}" for i in ids],
+            'City': [continent.split('/')[1] for continent in continents],
+            'CountryCode': [f"C{i % 200}" for i in ids],
+            'Continent': [continent.split('/')[0] for continent in continents]
+        })
+
+    def plants(self) -> pd.DataFrame:
+        """Returns the Plant table"""
+
+        return pd.DataFrame({
+            'PlantID': self.plant_ids,
+            'Name': [f"Plant {i}" for i in self.plant_ids],
+            'ScientificName': [f"Planta synthetica {i}" for i in self.plant_ids],
+            'LocationID': self.location_ids
+        })
+
+    def readings(self, end: datetime, minutes: int) -> pd.DataFrame:
+        """Returns a reading of every plant for each of the minutes up to end,
+        with occasional spikes, as PlantMeasurementRecord rows"""
+
+        n_rows = self.n_plants * minutes
+        plant_index = np.repeat(np.arange(self.n_plants), minutes)
+        offsets = np.tile(np.arange(minutes - 1, -1, -1), self.n_plants)
+        moisture = self.moisture_bases[plant_index] + self.rng.normal(0, 1, n_rows)
+        temperature = self.temperature_bases[plant_index] + self.rng.normal(0, 0.5, n_rows)
+        spikes = self.rng.random(n_rows) < SPIKE_RATE
+        moisture[spikes] += self.rng.choice([-10, 10], spikes.sum())
+
+        times = pd.Timestamp(end) - pd.to_timedelta(offsets, unit='min')
+        return pd.DataFrame({
+            'TimeRecorded': times,
+            'SoilMoisture': np.round(np.clip(moisture, 0, 100), 2),
+            'Temperature': np.round(temperature, 2),
+            'PlantID': self.plant_ids[plant_index],
+            'BotanistID': self.botanist_ids[plant_index],
+            'TimeLastWatered': times.floor('D')
+        }).sort_values('TimeRecorded', kind='stable')
+
+    def api_responses(self) -> dict[int, dict]:
+        """Returns the plants API response of every plant for the current minute"""
+
+        locations = self.locations().set_index('LocationID')
+        botanists = self.botanists().set_index('BotanistID')
+        moisture = self.moisture_bases + self.rng.normal(0, 1, self.n_plants)
+        temperature = self.temperature_bases + self.rng.normal(0, 0.5, self.n_plants)
+        last_watered = (self.now - timedelta(hours=6)).strftime(LAST_WATERED_FORMAT)
+
+        responses = {}
+        for i, plant_id in enumerate(self.plant_ids):
+            location = locations.loc[self.location_ids[i]]
+            botanist = botanists.loc[self.botanist_ids[i]]
+            responses[int(plant_id)] = {
+                'plant_id': int(plant_id),
+                'name': f"plant {plant_id}",
+                'soil_moisture': float(moisture[i]),
+                'temperature': float(temperature[i]),
+                'recording_taken': self.now.strftime('%Y-%m-%d %H:%M:%S'),
+                'last_watered': last_watered,
+                'botanist': {
+                    'name': f"{botanist['FirstName']} {botanist['LastName']}",
+                    'email': botanist['Email'],
+                    'phone': botanist['Phone']
+                },
+                'origin_location': [str(location['Latitude']), str(location['Longitude']),
+                                    location['Town'], location['CountryCode'],
+                                    f"{location['Continent']}/{location['City']}"]
+            }
+        return responses
@@ -0,0 +1,38 @@
+"""Tests the DuckDB stand-in for the SQL Server database"""
+
+from datetime import datetime
+
+from fake_database import FakeDatabase, substitute, translate
+
+NOW = datetime(2024, 4, 16, 12)
+
+
+def test_translate_dateadd_and_getdate():
+    assert translate("WHERE TimeRecorded >= DATEADD(hour, -24, GETDATE())", NOW) == (
+        "WHERE TimeRecorded >= (TIMESTAMP '2024-04-16 12:00:00' + INTERVAL (-24) hour)")
+
+
+def test_translate_moves_top_into_its_own_subquery():
+    query = ("SELECT * FROM (SELECT TOP 1 PlantID FROM Latest ORDER BY Temperature ASC) Lowest "
+             "CROSS JOIN (SELECT TOP 1 PlantID FROM Latest ORDER BY Temperature DESC) Highest;")
+    assert translate(query) == (
+        "SELECT * FROM (SELECT PlantID FROM Latest ORDER BY Temperature ASC LIMIT 1) Lowest "
+        "CROSS JOIN (SELECT PlantID FROM Latest ORDER BY Temperature DESC LIMIT 1) Highest;")
+
+
+def test_substitute_quotes_like_pymssql():
+    assert substitute("WHERE PlantID = %d AND Name = %s", (3, "O'Hara")) == (
+        "WHERE PlantID = 3 AND Name = 'O''Hara'")
+    assert substitute("WHERE x > %(n_sigma)s", {'n_sigma': 2.0}) == "WHERE x > 2.0"
+
+
+def test_connection_returns_dict_rows_and_assigns_ids():
+    database = FakeDatabase(NOW)
+    with database.connect().cursor(as_dict=True) as cursor:
+        cursor.execute("""INSERT INTO s_epsilon.PlantMeasurementRecord (TimeRecorded,
+            SoilMoisture, Temperature, TimeLastWatered, PlantID, BotanistID)
+            VALUES ('2024-04-16 11:30:00', 30.1, 12.2, '2024-04-16 09:00:00', 1, 1),
+                   ('2024-04-15 11:30:00', 31.1, 13.2, '2024-04-15 09:00:00', 2, 1)""")
+        cursor.execute("""SELECT MeasurementRecordID, PlantID FROM s_epsilon.PlantMeasurementRecord
+WHERE TimeRecorded >= DATEADD(hour, -1, GETDATE())""")
+        assert cursor.fetchall() == [{'MeasurementRecordID': 1, 'PlantID': 1}]
@@ -1,15 +1,38 @@
 """Streamlit App"""
 
+from datetime import datetime, timedelta
 from os import environ as ENV
 from dotenv import load_dotenv
 import streamlit as st
-import pandas as pd
 from charts import (latest_readings_temp, latest_readings_soil,
-                    get_latest_readings, get_moisture_over_last_24h,
+                    get_moisture_over_last_24h,
                     get_temperature_over_last_24h, get_moisture_over_time,
                     get_temperature_over_time)
-from load_from_db import get_db_connection, format_data, load_data
-from load_from_s3 import load_data_from_s3
+from cache import VersionedCache, VersionProbe
+from downsample import (BUCKET, CHART_WIDTH, LTTB, MAX_RAW_POINTS, RAW, downsample,
+                        get_target_points)
+from live_tail import LiveTail
+from load_from_db import (get_data_version, load_extreme_values, load_latest_readings,
+                          load_plant_ids, load_summary_metrics)
+from load_from_s3 import get_archive_version, get_s3_client, sync_archive, sync_summaries
+from readings import query_archive_tier, query_readings
+from summaries import query_summaries, summary_series
+
+HISTORY_COLUMNS = ['TimeRecorded', 'SoilMoisture', 'Temperature', 'PlantID']
+HISTORY_RANGES = {
+    "Last 7 days": timedelta(days=7),
+    "Last 30 days": timedelta(days=30),
+    "Last 90 days": timedelta(days=90),
+    "All time": None
+}
+LIVE_REFRESH_SECONDS = 60
+DAILY_SUMMARIES = 'daily'
+HISTORY_DETAIL = {
+    "Range bands": BUCKET,
+    "Shape preserving": LTTB,
+    "Every reading": RAW,
+    "Daily summaries": DAILY_SUMMARIES
+}
 
 
 def set_page_config():
@@ -25,63 +48,182 @@ def set_page_config():
     st.subheader("🌱 LMNH Plant Health 🌱")
 
 
-def get_extreme_values(data, column):
-    """Function to get the lowest and highest values along with their corresponding PlantIDs."""
+def get_specific_plant(plant_ids):
+    """Filter for a specific Plant ID"""
+    return st.sidebar.selectbox('Plant ID', plant_ids)
 
-    min_value = data[column].min()
-    min_index = data[column].idxmin()
-    min_plant_id = data.loc[min_index, 'PlantID']
 
-    max_value = data[column].max()
-    max_index = data[column].idxmax()
-    max_plant_id = data.loc[max_index, 'PlantID']
+def get_history_range():
+    """Select how far back the history goes"""
+    return st.sidebar.selectbox('History', list(HISTORY_RANGES))
 
-    return min_value, min_plant_id, max_value, max_plant_id
+
+def get_history_detail():
+    """Select how the history is downsampled"""
+    return HISTORY_DETAIL[st.sidebar.selectbox('History detail', list(HISTORY_DETAIL))]
 
 
-def get_specific_plant(data):
-    """Filter for a specific Plant ID"""
-    plants = data['PlantID'].unique()
-    return st.sidebar.selectbox('Plant ID', plants)
+def get_chart_width():
+    """Select how wide the history charts are, which sets how many points they show"""
+    return st.sidebar.slider('History chart width (px)', min_value=400, max_value=2400,
+                             value=CHART_WIDTH, step=100)
 
 
-if __name__ == "__main__":
+def load_history_series(cache, db_version, archive_version, plant_id, history_range,
+                        history_detail, chart_width=CHART_WIDTH):
+    """Returns the version of the plant's history and a function giving each metric's
+    series to chart. Daily summaries come from the archive's summary files alone, so
+    they end where the archive does. Every other detail downsamples the readings to
+    the chart's width."""
+    start = get_history_start(history_range)
+    if history_detail == DAILY_SUMMARIES:
+        cache.get(('summary_sync',), archive_version, lambda: sync_summaries(get_s3()))
+        daily_summaries = cache.get(('history_summaries', plant_id, history_range),
+                                    archive_version,
+                                    lambda: query_summaries(plant_id, start=start))
+        return archive_version, lambda column: summary_series(daily_summaries, column)
 
-    load_dotenv()
+    # The archive is only read again when it changes, and the database every refresh
+    cache.get(('archive_sync',), archive_version, lambda: sync_archive(get_s3()))
+    archived_data = cache.get(
+        ('history_archive', plant_id, history_range), archive_version,
+        lambda: query_archive_tier(plant_id, start=start, columns=HISTORY_COLUMNS))
+    history_version = (db_version, archive_version)
+    history_data = cache.get(
+        ('history_data', plant_id, history_range), history_version,
+        lambda: query_readings(ENV, plant_id, start=start, columns=HISTORY_COLUMNS,
+                               cold_frame=archived_data))
+    return history_version, lambda column: downsample(
+        history_data, column, get_target_points(chart_width), history_detail)
 
-    conn = get_db_connection(ENV)
 
-    plant_data = pd.DataFrame(format_data(load_data(ENV)))
+def get_history_start(history_range):
+    """Returns the start of the selected history range"""
+    if HISTORY_RANGES[history_range] is None:
+        return None
+    return datetime.now() - HISTORY_RANGES[history_range]
+
+
+@st.cache_resource(show_spinner=False)
+def get_cache():
+    """Data cache shared by every session"""
+    return VersionedCache()
+
+
+@st.cache_resource(show_spinner=False)
+def get_s3():
+    """S3 client shared by every session"""
+    return get_s3_client(ENV)
+
+
+@st.cache_resource(show_spinner=False)
+def get_version_probes():
+    """Database and archive version probes shared by every session"""
+    s3_client = get_s3()
+    return (VersionProbe(lambda: get_data_version(ENV)),
+            VersionProbe(lambda: get_archive_version(s3_client)))
+
+
+@st.cache_resource(show_spinner=False, max_entries=100)
+def get_live_tail(plant_id):
+    """Live readings of a plant over the last 24 hours, shared by every session"""
+    return LiveTail(ENV, plant_id)
 
-    set_page_config()
 
-    plant_id = get_specific_plant(plant_data)
-    specific_plant_data = plant_data[plant_data['PlantID'] == plant_id]
-    latest_readings = get_latest_readings(plant_data)
+def get_live_refresh():
+    """Select whether the last 24 hours refresh automatically"""
+    return st.sidebar.toggle('Live refresh', value=False)
 
-    archived_data = load_data_from_s3()
-    specific_archived_data = archived_data[archived_data['PlantID'] == plant_id]
 
-    chart_1 = latest_readings_temp(latest_readings)
-    chart_2 = latest_readings_soil(latest_readings)
-    chart_3 = get_moisture_over_last_24h(specific_plant_data)
-    chart_4 = get_temperature_over_last_24h(specific_plant_data)
-    chart_5 = get_moisture_over_time(specific_archived_data)
-    chart_6 = get_temperature_over_time(specific_archived_data)
+def show_last_24h_charts(plant_id):
+    """Refresh the plant's live readings and show its charts for the last 24 hours"""
+    live_tail = get_live_tail(plant_id)
+    live_tail.refresh()
+    specific_plant_data = live_tail.snapshot()
+    if specific_plant_data.empty:
+        st.info(f"No readings from the last 24 hours for plant {plant_id}")
+        return
+    st.altair_chart(get_temperature_over_last_24h(specific_plant_data),
+                    use_container_width=True)
+    st.altair_chart(get_moisture_over_last_24h(specific_plant_data),
+                    use_container_width=True)
+
+
+def get_history_chart(series, make_chart):
+    """Returns the chart of a history series, or None if the series is empty"""
+    return None if series.empty else make_chart(series)
+
+
+def show_history_charts(charts, plant_id, history_range, chart_width):
+    """Show the plant's history charts, or say there is no history to chart"""
+    if all(chart is None for chart in charts):
+        st.info(f"No history for plant {plant_id} in the selected range: {history_range}")
+        return
+    for chart in charts:
+        if chart is not None:
+            st.altair_chart(chart, width=chart_width)
+
+
+def show_cache_stats(cache):
+    """Show the hit and miss counts of the shared cache in the sidebar"""
+    stats = cache.stats()
+    with st.sidebar.expander("Cache"):
+        st.caption(f"Hits: {stats['hits']} · Misses: {stats['misses']} · "
+                   f"Entries: {stats['entries']} · Hit rate: {stats['hit_rate']:.0%}")
+
+
+if __name__ == "__main__":
+
+    load_dotenv()
+
+    cache = get_cache()
+    db_probe, archive_probe = get_version_probes()
+    db_version = db_probe.get()
+
+    plant_ids = cache.get(('plant_ids',), db_version, lambda: load_plant_ids(ENV))
+
+    set_page_config()
 
-    lowest_moisture, lowest_moisture_id, highest_moisture, highest_moisture_id = get_extreme_values(
-        latest_readings, 'SoilMoisture')
-    lowest_temp, lowest_temp_id, highest_temp, highest_temp_id = get_extreme_values(
-        latest_readings, 'Temperature')
+    plant_id = get_specific_plant(plant_ids)
+    history_range = get_history_range()
+    history_detail = get_history_detail()
+    chart_width = get_chart_width()
+    live_refresh = get_live_refresh()
+
+    latest_readings = cache.get(('latest_readings',), db_version,
+                                lambda: load_latest_readings(ENV))
+    metrics = cache.get(('metrics',), db_version, lambda: load_summary_metrics(ENV))
+    extreme_values = cache.get(('extreme_values',), db_version,
+                               lambda: load_extreme_values(ENV))
+
+    archive_version = archive_probe.get()
+    history_version, history_series = load_history_series(
+        cache, db_version, archive_version, plant_id, history_range, history_detail,
+        chart_width)
+
+    chart_1 = cache.get(('latest_temp_chart',), db_version,
+                        lambda: latest_readings_temp(latest_readings))
+    chart_2 = cache.get(('latest_soil_chart',), db_version,
+                        lambda: latest_readings_soil(latest_readings))
+    history_key = (plant_id, history_range, history_detail, chart_width)
+    chart_5 = cache.get(
+        ('moisture_history_chart', *history_key), history_version,
+        lambda: get_history_chart(history_series('SoilMoisture'), get_moisture_over_time))
+    chart_6 = cache.get(
+        ('temperature_history_chart', *history_key), history_version,
+        lambda: get_history_chart(history_series('Temperature'), get_temperature_over_time))
+
+    lowest_moisture, lowest_moisture_id, highest_moisture, highest_moisture_id = extreme_values[
+        'SoilMoisture']
+    lowest_temp, lowest_temp_id, highest_temp, highest_temp_id = extreme_values['Temperature']
 
     one, two, three = st.columns(3)
     with one:
-        st.metric("Number of Plants 🌿", plant_data["PlantID"].nunique())
+        st.metric("Number of Plants 🌿", metrics['plants'])
     with two:
-        st.metric("Number of Botanists 👩‍🌾 ",
-                  plant_data["BotanistEmail"].nunique())
+        st.metric("Number of Botanists 👩‍🌾 ", metrics['botanists'])
     with three:
-        st.metric("Number of Origins 🌎", plant_data["City"].nunique())
+        st.metric("Number of Origins 🌎", metrics['origins'])
 
     one, two, three, four,  = st.columns(4)
     with one:
@@ -101,7 +243,11 @@ if __name__ == "__main__":
 
     st.altair_chart(chart_1, use_container_width=True)
     st.altair_chart(chart_2, use_container_width=True)
-    st.altair_chart(chart_4, use_container_width=True)
-    st.altair_chart(chart_3, use_container_width=True)
-    st.altair_chart(chart_6, use_container_width=True)
-    st.altair_chart(chart_5, use_container_width=True)
+    st.fragment(show_last_24h_charts,
+                run_every=LIVE_REFRESH_SECONDS if live_refresh else None)(plant_id)
+    if history_detail == RAW:
+        st.caption(f"Every reading is charted up to {MAX_RAW_POINTS} readings. Longer "
+                   "histories are charted with that many shape preserving readings.")
+    show_history_charts((chart_6, chart_5), plant_id, history_range, chart_width)
+
+    show_cache_stats(cache)
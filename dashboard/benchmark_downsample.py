@@ -0,0 +1,43 @@
+"""Benchmarks the size and build time of the history charts with and without downsampling.
+Run with: python benchmark_downsample.py"""
+from time import perf_counter
+import numpy as np
+import pandas as pd
+from charts import get_moisture_over_time
+from downsample import BUCKET, LTTB, RAW, downsample, get_target_points
+
+DAYS = [1, 7, 30, 90, 400]
+
+
+def make_history(days: int) -> pd.DataFrame:
+    """Returns a minute-by-minute series of soil moisture for one plant"""
+
+    n_rows = days * 24 * 60
+    rng = np.random.default_rng(42)
+    minutes = np.arange(n_rows)
+    moisture = (30 + 5 * np.sin(minutes / (24 * 60) * 2 * np.pi)
+                + rng.normal(0, 0.5, n_rows))
+    return pd.DataFrame({
+        'TimeRecorded': pd.Timestamp('2024-01-01') + pd.to_timedelta(minutes, unit='min'),
+        'SoilMoisture': moisture.round(2),
+        'PlantID': 1
+    })
+
+
+def time_chart(data: pd.DataFrame, mode: str) -> tuple[int, int, float]:
+    """Downsamples and builds the chart spec, returning points, spec bytes and seconds"""
+
+    start = perf_counter()
+    sampled = downsample(data, 'SoilMoisture', get_target_points(), mode)
+    spec = get_moisture_over_time(sampled).to_json()
+    return len(sampled), len(spec), perf_counter() - start
+
+
+if __name__ == "__main__":
+    print(f"{'days':>5} {'mode':>7} {'points':>8} {'spec KB':>10} {'build ms':>10}")
+    for days in DAYS:
+        history = make_history(days)
+        for mode in (RAW, BUCKET, LTTB):
+            points, spec_size, seconds = time_chart(history, mode)
+            print(f"{days:>5} {mode:>7} {points:>8} {spec_size / 1024:>10.1f} "
+                  f"{seconds * 1000:>10.1f}")
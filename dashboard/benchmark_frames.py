@@ -0,0 +1,58 @@
+"""Benchmarks the memory and build time of the typed frame loader against
+converting every Decimal and letting pandas infer the types.
+Run with: python benchmark_frames.py"""
+from copy import deepcopy
+from datetime import datetime, timedelta
+from decimal import Decimal
+from time import perf_counter
+import pandas as pd
+from frames import build_frame, memory_report
+from load_from_db import format_data
+
+ROW_COUNTS = [72_000, 720_000]
+PLANTS = 50
+
+
+def make_rows(n_rows: int) -> list[dict]:
+    """Returns rows shaped like the joined 24 hour query, as pymssql returns them"""
+
+    start = datetime(2024, 4, 16)
+    return [{
+        'MeasurementRecordID': i,
+        'TimeRecorded': start + timedelta(minutes=i // PLANTS),
+        'SoilMoisture': Decimal(f"{20 + i % 17}.{i % 100:02d}"),
+        'Temperature': Decimal(f"{10 + i % 7}.{i % 100:02d}"),
+        'PlantID': i % PLANTS + 1,
+        'BotanistID': i % 3 + 1,
+        'TimeLastWatered': start,
+        'BotanistFirstName': ['Gertrude', 'Carl', 'Eliza'][i % 3],
+        'BotanistLastName': ['Jekyll', 'Linnaeus', 'Andrews'][i % 3],
+        'BotanistEmail': ['gertrude.jekyll@lnhm.co.uk', 'carl.linnaeus@lnhm.co.uk',
+                          'eliza.andrews@lnhm.co.uk'][i % 3],
+        'BotanistPhone': ['001-481-273-3691x127', '(146)994-1635x35992',
+                          '(846)669-6651x75948'][i % 3],
+        'PlantName': f"Plant {i % PLANTS + 1}",
+        'Longitude': Decimal('-118.039170'),
+        'Latitude': Decimal('33.950150'),
+        'Town': f"Town {i % PLANTS}",
+        'City': f"City {i % 20}",
+        'CountryCode': 'US',
+        'Continent': 'America'
+    } for i in range(n_rows)]
+
+
+if __name__ == "__main__":
+    for n_rows in ROW_COUNTS:
+        rows = make_rows(n_rows)
+
+        untyped_rows = deepcopy(rows)
+        start = perf_counter()
+        untyped = pd.DataFrame(format_data(untyped_rows))
+        untyped_seconds = perf_counter() - start
+
+        start = perf_counter()
+        typed = build_frame(rows)
+        typed_seconds = perf_counter() - start
+
+        print(f"{n_rows} rows: {memory_report(untyped, typed)}, "
+              f"{untyped_seconds:.2f}s -> {typed_seconds:.2f}s")
@@ -0,0 +1,82 @@
+"""Cache shared by every dashboard session, invalidated by data version probes"""
+import time
+from collections import OrderedDict
+from threading import Lock
+
+MAX_ENTRIES = 256
+PROBE_INTERVAL = 10
+
+
+class VersionedCache:
+    """Stores loaded values by key together with the data version they were loaded at.
+    A value is reused until the version passed in for its key changes."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: tuple, version, loader):
+        """Returns the cached value for key if it was loaded at this version,
+        otherwise calls loader and caches its result"""
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = loader()
+
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        """Removes every entry and resets the stats"""
+
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Returns the hit and miss counts of the cache"""
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+class VersionProbe:
+    """Returns the current version of a data source from a cheap probe function.
+    The probe runs at most once per interval, however many sessions ask."""
+
+    def __init__(self, probe, interval: float = PROBE_INTERVAL):
+        self.probe = probe
+        self.interval = interval
+        self._version = None
+        self._checked_at = None
+        self._lock = Lock()
+
+    def get(self):
+        """Returns the latest known version, probing again if it is out of date"""
+
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is None or now - self._checked_at >= self.interval:
+                self._version = self.probe()
+                self._checked_at = now
+            return self._version
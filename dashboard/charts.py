@@ -1,5 +1,6 @@
 import altair as alt
 import pandas as pd
+from frames import display_frame
 
 
 def get_latest_readings(df):
@@ -10,6 +11,7 @@ def get_latest_readings(df):
 
 def latest_readings_temp(latest_readings):
     """Creates graph of overall latest temperture readings"""
+    latest_readings = display_frame(latest_readings)
     max_y = latest_readings['Temperature'].max() + 0.5
     min_y = latest_readings['Temperature'].min() - 0.5
 
@@ -29,6 +31,7 @@ def latest_readings_temp(latest_readings):
 
 def latest_readings_soil(latest_readings):
     "Creates graph of overall latest soil moisture readings"
+    latest_readings = display_frame(latest_readings)
     max_y = latest_readings['SoilMoisture'].max() + 0.5
     min_y = latest_readings['SoilMoisture'].min() - 0.5
 
@@ -48,6 +51,7 @@ def latest_readings_soil(latest_readings):
 
 def get_temperature_over_last_24h(specific_plant_data):
     """Creates graph of temperature over last 24h for specific plant ID"""
+    specific_plant_data = display_frame(specific_plant_data)
     plant_id = specific_plant_data['PlantID'].iloc[0]
     chart = alt.Chart(specific_plant_data).mark_line().encode(
         x=alt.X('TimeRecorded:T', title='Time Recorded'),
@@ -67,6 +71,7 @@ def get_temperature_over_last_24h(specific_plant_data):
 
 def get_moisture_over_last_24h(specific_plant_data):
     """Creates graph of moisture over last 24h for specific plant ID"""
+    specific_plant_data = display_frame(specific_plant_data)
     plant_id = specific_plant_data['PlantID'].iloc[0]
     chart = alt.Chart(specific_plant_data).mark_line().encode(
         x=alt.X('TimeRecorded:T', title='Time Recorded'),
@@ -84,8 +89,21 @@ def get_moisture_over_last_24h(specific_plant_data):
     return chart
 
 
+def add_range_band(line_chart, data, column):
+    """Layers the lowest to highest range of each downsampled time bucket
+    behind a line chart, if the data has one"""
+    if f'{column}Min' not in data.columns:
+        return line_chart
+    band = alt.Chart(data).mark_area(opacity=0.3, color='#4c78a8').encode(
+        x=alt.X('TimeRecorded:T'),
+        y=alt.Y(f'{column}Min:Q'),
+        y2=alt.Y2(f'{column}Max:Q'))
+    return alt.layer(band, line_chart)
+
+
 def get_moisture_over_time(specific_archived_data):
     """Creates graph of moisture over time for specific plant ID"""
+    specific_archived_data = display_frame(specific_archived_data)
     plant_id = specific_archived_data['PlantID'].iloc[0]
     chart = alt.Chart(specific_archived_data).mark_line().encode(
         x=alt.X('TimeRecorded:T', title="Time Recorded",
@@ -97,7 +115,8 @@ def get_moisture_over_time(specific_archived_data):
             alt.Tooltip('TimeRecorded:T', title='Time Recorded',
                         format='%Y-%m-%d %H:%M:%S'),
             alt.Tooltip('SoilMoisture:Q', title='Soil Moisture'),
-            alt.Tooltip('PlantID:N', title='Plant ID')]).properties(
+            alt.Tooltip('PlantID:N', title='Plant ID')])
+    chart = add_range_band(chart, specific_archived_data, 'SoilMoisture').properties(
         title=f'Moisture Levels Over Time for Plant {plant_id} 💧')
     chart = chart.configure_title(
         fontSize=18, offset=20, orient='top', anchor='start')
@@ -106,6 +125,7 @@ def get_moisture_over_time(specific_archived_data):
 
 def get_temperature_over_time(specific_archived_data):
     """Creates graph of temperature over time for specific plant ID"""
+    specific_archived_data = display_frame(specific_archived_data)
     plant_id = specific_archived_data['PlantID'].iloc[0]
     chart = alt.Chart(specific_archived_data).mark_line().encode(
         x=alt.X('TimeRecorded:T', axis=alt.Axis(
@@ -117,7 +137,8 @@ def get_temperature_over_time(specific_archived_data):
             alt.Tooltip('TimeRecorded:T', title='Time Recorded',
                         format='%Y-%m-%d %H:%M:%S'),
             alt.Tooltip('Temperature:Q', title='Soil Moisture'),
-            alt.Tooltip('PlantID:N', title='Plant ID')]).properties(
+            alt.Tooltip('PlantID:N', title='Plant ID')])
+    chart = add_range_band(chart, specific_archived_data, 'Temperature').properties(
         title=f'Temperature Over Time for Plant {plant_id} 🌡️')
     chart = chart.configure_title(
         fontSize=18, offset=20, orient='top', anchor='start')
@@ -0,0 +1,104 @@
+"""Reduces long time series to roughly one point per pixel before they are charted"""
+import numpy as np
+import pandas as pd
+
+TIME_COLUMN = 'TimeRecorded'
+CHART_WIDTH = 1200
+PIXELS_PER_POINT = 2
+MIN_POINTS = 50
+# Altair refuses to chart more rows than this
+MAX_RAW_POINTS = 5000
+
+BUCKET = 'bucket'
+LTTB = 'lttb'
+RAW = 'raw'
+
+
+def get_target_points(width: int = CHART_WIDTH) -> int:
+    """Returns how many points a chart of the given width in pixels can usefully show"""
+
+    return max(MIN_POINTS, width // PIXELS_PER_POINT)
+
+
+def get_time_values(data: pd.DataFrame) -> np.ndarray:
+    """Returns the times of a series as nanoseconds since the epoch"""
+
+    return pd.to_datetime(data[TIME_COLUMN]).to_numpy('datetime64[ns]').astype(np.int64)
+
+
+def bucket_series(data: pd.DataFrame, column: str, n_points: int) -> pd.DataFrame:
+    """Splits a series into n_points equal time buckets and returns the mean of each,
+    with the bucket's lowest and highest values in {column}Min and {column}Max"""
+
+    if data.empty:
+        return data.assign(**{f'{column}Min': data[column], f'{column}Max': data[column]})
+
+    # Bucket positions are worked out in float, as nanoseconds times the number of
+    # points overflows int64 for spans of a few months
+    times = get_time_values(data)
+    first, span = times.min(), times.max() - times.min() + 1
+    bucket_span = span / n_points
+    buckets = np.minimum(((times - first) / bucket_span).astype(np.int64), n_points - 1)
+
+    grouped = data[column].groupby(buckets).agg(['mean', 'min', 'max'])
+    bucket_starts = first + (grouped.index.to_numpy() * bucket_span).astype(np.int64)
+
+    frame = pd.DataFrame({
+        TIME_COLUMN: pd.to_datetime(bucket_starts),
+        column: grouped['mean'].to_numpy(),
+        f'{column}Min': grouped['min'].to_numpy(),
+        f'{column}Max': grouped['max'].to_numpy()
+    })
+    if 'PlantID' in data.columns:
+        frame['PlantID'] = data['PlantID'].iloc[0]
+    return frame
+
+
+def lttb(data: pd.DataFrame, column: str, n_points: int) -> pd.DataFrame:
+    """Selects n_points rows of a series with Largest-Triangle-Three-Buckets.
+    The first and last rows are always kept, and from every bucket in between
+    the row that forms the largest triangle with its neighbours is kept, which
+    preserves the peaks and troughs that averaging would flatten."""
+
+    n_rows = len(data)
+    if n_points >= n_rows or n_points < 3:
+        return data
+
+    x = get_time_values(data).astype(np.float64)
+    y = data[column].to_numpy(np.float64)
+    bucket_size = (n_rows - 2) / (n_points - 2)
+
+    selected = np.empty(n_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n_rows - 1
+    previous = 0
+    for i in range(n_points - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n_rows)
+
+        next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(areas.argmax())
+        selected[i + 1] = previous
+
+    return data.iloc[selected]
+
+
+def downsample(data: pd.DataFrame, column: str, n_points: int = None,
+               mode: str = BUCKET) -> pd.DataFrame:
+    """Reduces a series to at most n_points points for charting.
+    'bucket' returns per-bucket means with min-max bands, 'lttb' returns a
+    shape-preserving subset of the raw rows and 'raw' returns the data as is,
+    up to MAX_RAW_POINTS rows beyond which it falls back to 'lttb' at that size."""
+
+    if mode == RAW:
+        n_points, mode = MAX_RAW_POINTS, LTTB
+    n_points = n_points or get_target_points()
+    if len(data) <= n_points:
+        return data
+    if mode == BUCKET:
+        return bucket_series(data.sort_values(TIME_COLUMN), column, n_points)
+    if mode == LTTB:
+        return lttb(data.sort_values(TIME_COLUMN), column, n_points)
+    raise ValueError(f"Unknown downsampling mode: {mode}")
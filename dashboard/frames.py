@@ -0,0 +1,92 @@
+"""Builds compact, explicitly typed DataFrames from database rows and archive files"""
+import numpy as np
+import pandas as pd
+
+FLOAT_COLUMNS = {
+    'SoilMoisture': 'float32',
+    'Temperature': 'float32',
+    'Longitude': 'float64',
+    'Latitude': 'float64'
+}
+INT_COLUMNS = {
+    'MeasurementRecordID': 'Int32',
+    'PlantID': 'Int16',
+    'BotanistID': 'Int16'
+}
+DATETIME_COLUMNS = ['TimeRecorded', 'TimeLastWatered']
+CATEGORY_COLUMNS = [
+    'BotanistFirstName', 'BotanistLastName', 'BotanistEmail', 'BotanistPhone',
+    'PlantName', 'Town', 'City', 'CountryCode', 'Continent'
+]
+# Measurements are stored to two decimal places
+DISPLAY_DECIMALS = 2
+
+
+def build_column(name: str, values: list) -> pd.Series | np.ndarray:
+    """Converts one column of values to its compact type"""
+
+    if name in FLOAT_COLUMNS:
+        return np.array(values, dtype=FLOAT_COLUMNS[name])
+    if name in INT_COLUMNS:
+        return pd.array(values, dtype=INT_COLUMNS[name])
+    if name in DATETIME_COLUMNS:
+        return pd.to_datetime(values)
+    if name in CATEGORY_COLUMNS:
+        return pd.Categorical(values)
+    return values
+
+
+def build_frame(rows: list[dict], columns: list[str] = None) -> pd.DataFrame:
+    """Builds a DataFrame from database rows one column at a time, converting
+    each column straight to its compact type instead of converting every value.
+    Measurements become float32, IDs small ints, repeated strings categories
+    and times datetime64. Decimals are converted as part of the column."""
+
+    if columns is None:
+        columns = list(rows[0].keys()) if rows else []
+
+    return pd.DataFrame(
+        {name: build_column(name, [row[name] for row in rows]) for name in columns},
+        columns=columns)
+
+
+def coerce_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """Converts the known columns of an existing frame, such as one read from an
+    archived CSV or Parquet file, to their compact types"""
+
+    dtypes = {**FLOAT_COLUMNS, **INT_COLUMNS}
+    for name in frame.columns:
+        if name in dtypes:
+            frame[name] = frame[name].astype(dtypes[name])
+        elif name in DATETIME_COLUMNS:
+            frame[name] = pd.to_datetime(frame[name])
+        elif name in CATEGORY_COLUMNS:
+            frame[name] = frame[name].astype('category')
+    return frame
+
+
+def display_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """Returns a frame to chart, with its float32 columns as float64 rounded to the
+    stored decimal places. A float32 27.36 is 27.360000610... as a float64, which
+    is what charts serialise and show in their tooltips."""
+
+    float32_columns = frame.select_dtypes('float32').columns
+    if float32_columns.empty:
+        return frame
+    return frame.astype({name: 'float64' for name in float32_columns}).round(
+        {name: DISPLAY_DECIMALS for name in float32_columns})
+
+
+def memory_usage(frame: pd.DataFrame) -> int:
+    """Returns the number of bytes a frame uses, including its strings"""
+
+    return int(frame.memory_usage(deep=True).sum())
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> str:
+    """Describes how much smaller one frame is than another"""
+
+    before_bytes, after_bytes = memory_usage(before), memory_usage(after)
+    saving = 1 - after_bytes / before_bytes if before_bytes else 0
+    return (f"{before_bytes / 1024:.1f} KB -> {after_bytes / 1024:.1f} KB "
+            f"({saving:.0%} smaller)")
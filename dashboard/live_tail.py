@@ -0,0 +1,60 @@
+"""Keeps the last 24 hours of readings in memory, fetching only new rows on refresh"""
+import time
+from datetime import datetime, timedelta
+from threading import Lock
+import pandas as pd
+from frames import build_frame
+from load_from_db import READING_COLUMNS, load_readings_since
+
+WINDOW = timedelta(hours=24)
+MIN_REFRESH_INTERVAL = 5
+
+
+class LiveTail:
+    """The readings of the last 24 hours, optionally for one plant.
+    Each refresh asks the database only for rows with a higher record ID than
+    the last one seen, appends them and drops rows that have aged out."""
+
+    def __init__(self, config, plant_id: int = None, window: timedelta = WINDOW,
+                 min_refresh_interval: float = MIN_REFRESH_INTERVAL,
+                 loader=load_readings_since):
+        self.config = config
+        self.plant_id = plant_id
+        self.window = window
+        self.min_refresh_interval = min_refresh_interval
+        self.loader = loader
+        self.last_id = 0
+        self.frame = build_frame([], READING_COLUMNS)
+        self._refreshed_at = None
+        self._lock = Lock()
+
+    def refresh(self, now: datetime = None) -> int:
+        """Fetches readings newer than the last one seen and evicts readings older
+        than the window. Refreshes within the minimum interval of the previous one
+        are skipped. Returns the number of new readings."""
+
+        with self._lock:
+            checked_at = time.monotonic()
+            if (self._refreshed_at is not None
+                    and checked_at - self._refreshed_at < self.min_refresh_interval):
+                return 0
+            self._refreshed_at = checked_at
+
+            new_frame = self.loader(self.config, self.last_id, self.plant_id)
+            if not new_frame.empty:
+                frames = [self.frame, new_frame] if not self.frame.empty else [new_frame]
+                self.frame = pd.concat(frames, ignore_index=True)
+                self.last_id = int(new_frame['MeasurementRecordID'].max())
+
+            cutoff = (now or datetime.now()) - self.window
+            if not self.frame.empty and self.frame['TimeRecorded'].iloc[0] < cutoff:
+                self.frame = self.frame[self.frame['TimeRecorded'] >= cutoff].reset_index(
+                    drop=True)
+
+            return len(new_frame)
+
+    def snapshot(self) -> pd.DataFrame:
+        """Returns a copy of the readings currently held"""
+
+        with self._lock:
+            return self.frame.copy()
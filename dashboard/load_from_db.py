@@ -1,6 +1,20 @@
 """Loads data from database"""
+from datetime import datetime
 from decimal import Decimal
+import pandas as pd
 from pymssql import connect
+from frames import build_frame
+
+LAST_24_HOURS = "TimeRecorded >= DATEADD(hour, -24, GETDATE())"
+
+READING_COLUMNS = ['MeasurementRecordID', 'TimeRecorded', 'SoilMoisture', 'Temperature',
+                   'PlantID']
+MEASUREMENT_COLUMNS = READING_COLUMNS + ['BotanistID', 'TimeLastWatered']
+
+LATEST_READINGS = f"""SELECT PlantID, TimeRecorded, SoilMoisture, Temperature,
+       ROW_NUMBER() OVER (PARTITION BY PlantID ORDER BY TimeRecorded DESC) AS RowNumber
+FROM s_epsilon.PlantMeasurementRecord
+WHERE {LAST_24_HOURS}"""
 
 
 def get_db_connection(config):
@@ -16,13 +30,24 @@ def get_db_connection(config):
     )
 
 
-def load_data(config):
-    """Loads data older than 24 hours"""
+def run_query(config, query: str, params: tuple = None) -> list[dict]:
+    """Runs a query on a new connection and returns all of its rows"""
 
     conn = get_db_connection(config)
     with conn.cursor() as cur:
-        cur.execute(
-            """SELECT PMR.*,
+        cur.execute(query, params)
+        data = cur.fetchall()
+        conn.close()
+        return data
+
+
+def load_data(config):
+    """Loads every reading from the last 24 hours, joined to its plant,
+    botanist and location"""
+
+    return run_query(
+        config,
+        f"""SELECT PMR.*,
        Bot.FirstName AS BotanistFirstName,
        Bot.LastName AS BotanistLastName,
        Bot.Email AS BotanistEmail,
@@ -37,10 +62,130 @@ def load_data(config):
 FROM s_epsilon.PlantMeasurementRecord PMR
 JOIN s_epsilon.Botanist Bot ON PMR.BotanistID = Bot.BotanistID
 JOIN s_epsilon.Plant Plant ON PMR.PlantID = Plant.PlantID
-JOIN s_epsilon.Location Loc ON Plant.LocationID = Loc.LocationID;""")
-        data = cur.fetchall()
-        conn.close()
-        return data
+JOIN s_epsilon.Location Loc ON Plant.LocationID = Loc.LocationID
+WHERE PMR.{LAST_24_HOURS};""")
+
+
+def load_frame(config) -> pd.DataFrame:
+    """Loads every reading from the last 24 hours as a compact typed DataFrame"""
+
+    return build_frame(load_data(config))
+
+
+def load_plant_ids(config) -> list[int]:
+    """Loads the IDs of the plants with readings in the last 24 hours"""
+
+    data = run_query(
+        config,
+        f"""SELECT DISTINCT PlantID
+FROM s_epsilon.PlantMeasurementRecord
+WHERE {LAST_24_HOURS}
+ORDER BY PlantID;""")
+    return [row['PlantID'] for row in data]
+
+
+def load_summary_metrics(config) -> dict:
+    """Loads the number of plants, botanists and origin cities with readings
+    in the last 24 hours"""
+
+    data = run_query(
+        config,
+        f"""SELECT COUNT(DISTINCT PMR.PlantID) AS Plants,
+       COUNT(DISTINCT PMR.BotanistID) AS Botanists,
+       COUNT(DISTINCT Loc.City) AS Origins
+FROM s_epsilon.PlantMeasurementRecord PMR
+JOIN s_epsilon.Plant Plant ON PMR.PlantID = Plant.PlantID
+JOIN s_epsilon.Location Loc ON Plant.LocationID = Loc.LocationID
+WHERE PMR.{LAST_24_HOURS};""")
+    return {'plants': data[0]['Plants'],
+            'botanists': data[0]['Botanists'],
+            'origins': data[0]['Origins']}
+
+
+def load_latest_readings(config) -> pd.DataFrame:
+    """Loads the latest reading of each plant from the last 24 hours"""
+
+    return build_frame(run_query(
+        config,
+        f"""WITH Latest AS ({LATEST_READINGS})
+SELECT Latest.PlantID, Latest.TimeRecorded, Latest.SoilMoisture, Latest.Temperature,
+       Plant.Name AS PlantName
+FROM Latest
+JOIN s_epsilon.Plant Plant ON Latest.PlantID = Plant.PlantID
+WHERE Latest.RowNumber = 1
+ORDER BY Latest.PlantID;"""),
+        ['PlantID', 'TimeRecorded', 'SoilMoisture', 'Temperature', 'PlantName'])
+
+
+def load_extreme_values(config) -> dict:
+    """Loads the lowest and highest latest soil moisture and temperature readings,
+    with the IDs of the plants they belong to.
+    e.g. {'SoilMoisture': (min_value, min_plant_id, max_value, max_plant_id), ...}"""
+
+    extreme_values = {}
+    for column in ('SoilMoisture', 'Temperature'):
+        data = format_data(run_query(
+            config,
+            f"""WITH Latest AS ({LATEST_READINGS})
+SELECT Lowest.{column} AS LowestValue, Lowest.PlantID AS LowestPlantID,
+       Highest.{column} AS HighestValue, Highest.PlantID AS HighestPlantID
+FROM (SELECT TOP 1 PlantID, {column} FROM Latest
+      WHERE RowNumber = 1 ORDER BY {column} ASC) Lowest
+CROSS JOIN (SELECT TOP 1 PlantID, {column} FROM Latest
+            WHERE RowNumber = 1 ORDER BY {column} DESC) Highest;"""))
+        if data:
+            row = data[0]
+            extreme_values[column] = (row['LowestValue'], row['LowestPlantID'],
+                                      row['HighestValue'], row['HighestPlantID'])
+        else:
+            extreme_values[column] = (None, None, None, None)
+    return extreme_values
+
+
+def load_readings_since(config, last_id: int, plant_id: int = None) -> pd.DataFrame:
+    """Loads the readings from the last 24 hours with a higher record ID than last_id,
+    optionally for a single plant. Record IDs only increase, so this is a
+    primary key range seek over just the new rows."""
+
+    plant_filter = "AND PlantID = %d" if plant_id is not None else ""
+    params = (int(last_id),) if plant_id is None else (int(last_id), int(plant_id))
+    return build_frame(run_query(
+        config,
+        f"""SELECT MeasurementRecordID, TimeRecorded, SoilMoisture, Temperature, PlantID
+FROM s_epsilon.PlantMeasurementRecord
+WHERE MeasurementRecordID > %d {plant_filter} AND {LAST_24_HOURS}
+ORDER BY MeasurementRecordID;""",
+        params), READING_COLUMNS)
+
+
+def load_readings_between(config, plant_ids: list[int], start: datetime = None,
+                          end: datetime = None, columns: list[str] = None) -> pd.DataFrame:
+    """Loads the readings of the given plants recorded between start (inclusive)
+    and end (exclusive), however old, with only the requested columns"""
+
+    columns = columns or MEASUREMENT_COLUMNS
+    unknown_columns = set(columns) - set(MEASUREMENT_COLUMNS)
+    if unknown_columns:
+        raise ValueError(f"Unknown measurement columns: {sorted(unknown_columns)}")
+    if not plant_ids:
+        return build_frame([], columns)
+
+    conditions = [f"PlantID IN ({', '.join(['%d'] * len(plant_ids))})"]
+    params = [int(plant_id) for plant_id in plant_ids]
+    if start is not None:
+        conditions.append("TimeRecorded >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append("TimeRecorded < %s")
+        params.append(end)
+
+    return build_frame(run_query(
+        config,
+        f"""SELECT {', '.join(columns)}
+FROM s_epsilon.PlantMeasurementRecord
+WHERE {' AND '.join(conditions)}
+ORDER BY TimeRecorded;""",
+        tuple(params)), columns)
 
 
 def format_data(data):
@@ -50,3 +195,16 @@ def format_data(data):
             if isinstance(value, Decimal):
                 entry[key] = float(value)
     return data
+
+
+def get_data_version(config) -> tuple:
+    """Returns the lowest and highest measurement record IDs in the database.
+    New readings raise the highest ID and archiving raises the lowest, so
+    the pair changes whenever the data does. Both are primary key seeks."""
+
+    data = run_query(
+        config,
+        """SELECT MIN(MeasurementRecordID) AS FirstID,
+       MAX(MeasurementRecordID) AS LastID
+FROM s_epsilon.PlantMeasurementRecord;""")
+    return data[0]['FirstID'], data[0]['LastID']
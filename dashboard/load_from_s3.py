@@ -4,10 +4,12 @@ import csv
 import datetime
 from os import environ as ENV, remove
 from fnmatch import fnmatch
+from hashlib import sha256
 import pytz
 import pandas as pd
 from dotenv import load_dotenv
 from boto3 import client
+from frames import coerce_frame
 
 UTC_NOW = datetime.datetime.now(pytz.utc)
 CURRENT_TIMESTAMP = UTC_NOW.astimezone(pytz.timezone('Europe/London'))
@@ -15,21 +17,40 @@ FORMATTED_TIMESTAMP = CURRENT_TIMESTAMP.strftime('%H:%M:%S')
 BUCKET_NAME = 'permian-triassic'
 FILE_STRUCTURE = '*/*/*/*'
 DIRECTORY = 'archived_data'
+SUMMARY_PREFIX = 'summaries/'
+SUMMARY_DIRECTORY = 'archived_summaries'
 COMBINED_FILE = 'COMBINED_ARCHIVED_DATA.csv'
 
 
+def list_bucket_objects(aws_client, bucket_name: str, prefix: str = '') -> list[dict]:
+    '''Returns every object in a bucket under a prefix, a page of up to 1000 at a time.'''
+
+    objects = []
+    for page in aws_client.get_paginator('list_objects_v2').paginate(Bucket=bucket_name,
+                                                                     Prefix=prefix):
+        objects.extend(page.get('Contents', []))
+    return objects
+
+
 def get_bucket_objects(aws_client, bucket_name: str) -> list[str]:
     '''Return a list of available objects in a bucket.'''
 
-    response = aws_client.list_objects(Bucket=bucket_name)
-    objects = response['Contents']
-    return [o["Key"] for o in objects]
+    return [o["Key"] for o in list_bucket_objects(aws_client, bucket_name)]
+
+
+def get_archive_version(aws_client, bucket_name: str = BUCKET_NAME) -> str:
+    '''Returns a fingerprint of the archive bucket made from its object keys and ETags,
+    which changes whenever a file is added, replaced or removed.'''
+
+    objects = sorted((o["Key"], o["ETag"]) for o in list_bucket_objects(aws_client, bucket_name))
+    return sha256(repr(objects).encode()).hexdigest()
 
 
 def filter_objects(bucket_name: str, objects: list, file_structure: str, aws_client) -> list:
-    '''Filters data that matches the file structure and has been created within the time interval'''
+    '''Filters data that matches the file structure and has been created within the time interval.
+    Summary files match the structure too, so they are left out.'''
 
-    return [o for o in objects if fnmatch(o, file_structure)]
+    return [o for o in objects if fnmatch(o, file_structure) and not o.startswith(SUMMARY_PREFIX)]
 
 
 def download_plant_data_files(aws_client, rel_obj: list, bucket: str, folder: str) -> None:
@@ -39,9 +60,10 @@ def download_plant_data_files(aws_client, rel_obj: list, bucket: str, folder: st
         os.makedirs(folder)
 
     for obj in rel_obj:
-        aws_client.download_file(bucket,
-                                 obj,
-                                 f'{folder}/{obj.replace("/", "-")}.csv')
+        file_path = f'{folder}/{obj.replace("/", "-")}.csv'
+        if os.path.exists(file_path):
+            continue
+        aws_client.download_file(bucket, obj, file_path)
 
 
 def extract(aws_client):
@@ -52,6 +74,37 @@ def extract(aws_client):
     download_plant_data_files(aws_client, data, BUCKET_NAME, DIRECTORY)
 
 
+def get_s3_client(config):
+    """Returns an S3 client using the credentials in the config"""
+
+    return client("s3",
+                  aws_access_key_id=config["AWS_ACCESS_KEY_ID"],
+                  aws_secret_access_key=config["AWS_SECRET_ACCESS_KEY"])
+
+
+def sync_archive(aws_client) -> None:
+    """Mirrors the archive bucket into the local directory.
+    Files already downloaded are kept, so only newly archived files are fetched."""
+
+    extract(aws_client)
+
+
+def sync_summaries(aws_client, directory: str = SUMMARY_DIRECTORY) -> None:
+    """Mirrors the archive summaries into the local directory, one folder per granularity,
+    e.g. summaries/day/2024/04/16/09:00:00 -> day/2024-04-16-09:00:00.csv.
+    Files already downloaded are kept, so only new summaries are fetched."""
+
+    for summary in list_bucket_objects(aws_client, BUCKET_NAME, SUMMARY_PREFIX):
+        obj = summary["Key"]
+        granularity, name = obj.removeprefix(SUMMARY_PREFIX).split('/', 1)
+        folder = f'{directory}/{granularity}'
+        file_path = f'{folder}/{name.replace("/", "-")}.csv'
+        if os.path.exists(file_path):
+            continue
+        os.makedirs(folder, exist_ok=True)
+        aws_client.download_file(BUCKET_NAME, obj, file_path)
+
+
 def combine_plant_data_files(input_files: list, output_file: str, directory: str) -> None:
     """Loads and combines relevant files from the data/ folder.
     Produces a single combined file in the data/ folder."""
@@ -83,9 +136,7 @@ def load_data_from_s3():
     """Loads data from s3 to combined csv file"""
 
     load_dotenv()
-    s3_client = client("s3",
-                       aws_access_key_id=ENV["AWS_ACCESS_KEY_ID"],
-                       aws_secret_access_key=ENV["AWS_SECRET_ACCESS_KEY"])
+    s3_client = get_s3_client(ENV)
 
     extract(s3_client)
     files = os.listdir(DIRECTORY)
@@ -93,4 +144,4 @@ def load_data_from_s3():
         os.remove(f"{DIRECTORY}/{COMBINED_FILE}")
 
     combine_plant_data_files(files, COMBINED_FILE, DIRECTORY)
-    return pd.read_csv("archived_data/COMBINED_ARCHIVED_DATA.csv")
+    return coerce_frame(pd.read_csv("archived_data/COMBINED_ARCHIVED_DATA.csv"))
@@ -0,0 +1,108 @@
+"""Queries archived plant data with DuckDB, pushing filters down to the files"""
+import os
+from datetime import datetime, timedelta
+from fnmatch import fnmatch
+import duckdb
+import pandas as pd
+from archive_schedule import ARCHIVE_LAG, TIMEZONE_MARGIN
+from frames import coerce_frame
+
+ARCHIVE_DIRECTORY = 'archived_data'
+ARCHIVE_FILE_PATTERN = '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]-*'
+ARCHIVE_TIMESTAMP_FORMAT = '%Y-%m-%d-%H:%M:%S'
+
+ARCHIVE_COLUMNS = [
+    'MeasurementRecordID', 'TimeRecorded', 'SoilMoisture', 'Temperature', 'PlantID',
+    'BotanistID', 'TimeLastWatered', 'BotanistFirstName', 'BotanistLastName',
+    'BotanistEmail', 'BotanistPhone', 'PlantName', 'Longitude', 'Latitude',
+    'Town', 'City', 'CountryCode', 'Continent'
+]
+# Types of the columns every query filters on, so they never depend on sniffing
+ARCHIVE_TYPES = {
+    'TimeRecorded': 'TIMESTAMP',
+    'PlantID': 'INTEGER'
+}
+
+
+def get_archive_timestamp(filename: str) -> datetime:
+    """Returns the time an archive file was exported, taken from its file name"""
+
+    stem = os.path.basename(filename).removesuffix('.csv').removesuffix('.parquet')
+    return datetime.strptime(stem, ARCHIVE_TIMESTAMP_FORMAT)
+
+
+def select_archive_files(directory: str, start: datetime = None) -> list[str]:
+    """Returns the archive files in a directory that can hold rows recorded at or after start.
+    Every row in a file was recorded before the file was exported minus the archive lag,
+    so files exported too early to reach start are skipped without being opened."""
+
+    if not os.path.exists(directory):
+        return []
+
+    files = sorted(f for f in os.listdir(directory) if fnmatch(f, ARCHIVE_FILE_PATTERN))
+    if start is not None:
+        files = [f for f in files
+                 if get_archive_timestamp(f) - ARCHIVE_LAG + TIMEZONE_MARGIN > start]
+
+    return [os.path.join(directory, f) for f in files]
+
+
+def get_archive_source(files: list[str]) -> tuple[str, list]:
+    """Returns a DuckDB table expression over the archive files and its parameters.
+    CSV and Parquet files are read side by side and unioned by column name."""
+
+    csv_files = [f for f in files if not f.endswith('.parquet')]
+    parquet_files = [f for f in files if f.endswith('.parquet')]
+
+    sources, params = [], []
+    if csv_files:
+        types = ", ".join(f"'{column}': '{dtype}'" for column, dtype in ARCHIVE_TYPES.items())
+        sources.append(
+            f"SELECT * FROM read_csv(?, header=true, union_by_name=true, types={{{types}}})")
+        params.append(csv_files)
+    if parquet_files:
+        sources.append("SELECT * FROM read_parquet(?, union_by_name=true)")
+        params.append(parquet_files)
+
+    return " UNION ALL BY NAME ".join(sources), params
+
+
+def query_archive(plant_ids: int | list[int], start: datetime = None, end: datetime = None,
+                  columns: list[str] = None, directory: str = ARCHIVE_DIRECTORY) -> pd.DataFrame:
+    """Returns the archived readings for the given plants between start (inclusive) and
+    end (exclusive), with only the requested columns, ordered by time recorded.
+    Plant, time and column filters are applied by DuckDB while scanning the files,
+    so only the matching rows are ever materialised in pandas."""
+
+    if isinstance(plant_ids, int):
+        plant_ids = [plant_ids]
+    plant_ids = [int(plant_id) for plant_id in plant_ids]
+
+    columns = columns or ARCHIVE_COLUMNS
+    unknown_columns = set(columns) - set(ARCHIVE_COLUMNS)
+    if unknown_columns:
+        raise ValueError(f"Unknown archive columns: {sorted(unknown_columns)}")
+
+    files = select_archive_files(directory, start)
+    if not files or not plant_ids:
+        return coerce_frame(pd.DataFrame(columns=columns))
+
+    source, params = get_archive_source(files)
+
+    conditions = [f"PlantID IN ({', '.join('?' * len(plant_ids))})"]
+    params.extend(plant_ids)
+    if start is not None:
+        conditions.append("TimeRecorded >= ?")
+        params.append(start)
+    if end is not None:
+        conditions.append("TimeRecorded < ?")
+        params.append(end)
+
+    selected_columns = ", ".join(f'"{column}"' for column in columns)
+    query = f"""SELECT {selected_columns}
+FROM ({source})
+WHERE {" AND ".join(conditions)}
+ORDER BY TimeRecorded;"""
+
+    with duckdb.connect() as conn:
+        return coerce_frame(conn.execute(query, params).df())
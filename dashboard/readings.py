@@ -0,0 +1,113 @@
+"""Queries readings across the database and the archive as one time range"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import pandas as pd
+from archive_schedule import ARCHIVE_INTERVAL, ARCHIVE_LAG, ARCHIVE_RUN_MARGIN
+from frames import build_frame
+from load_from_db import MEASUREMENT_COLUMNS, load_readings_between
+from query_archive import ARCHIVE_DIRECTORY, query_archive
+
+# The archive holds readings from before this long ago
+HOT_WINDOW = ARCHIVE_LAG
+# Readings stay in the database after they turn 24 hours old until the next daily
+# archive run, so the database is also searched this far before the boundary
+UNARCHIVED_MARGIN = ARCHIVE_INTERVAL + ARCHIVE_RUN_MARGIN
+
+
+def get_tier_ranges(start: datetime = None, end: datetime = None,
+                    now: datetime = None) -> tuple:
+    """Returns the (start, end) range to query in the database and in the archive,
+    or None for a tier the range does not reach. Either end may be None for open."""
+
+    now = now or datetime.now()
+    boundary = now - HOT_WINDOW
+
+    hot_start = boundary - UNARCHIVED_MARGIN
+    hot_range = None
+    if end is None or end > hot_start:
+        hot_range = (max(start, hot_start) if start is not None else hot_start, end)
+
+    # Archived readings were all recorded before the boundary
+    cold_range = None
+    if start is None or start < boundary:
+        cold_range = (start, min(end, boundary) if end is not None else boundary)
+
+    return hot_range, cold_range
+
+
+def get_fetched_columns(columns: list[str] = None) -> list[str]:
+    """Returns the columns to read from either tier for the requested columns. Record
+    IDs drop readings exported but not yet deleted, and times order the merged tiers."""
+
+    columns = columns or MEASUREMENT_COLUMNS
+    unknown_columns = set(columns) - set(MEASUREMENT_COLUMNS)
+    if unknown_columns:
+        raise ValueError(f"Unknown reading columns: {sorted(unknown_columns)}")
+    return list(dict.fromkeys(['MeasurementRecordID', 'TimeRecorded', *columns]))
+
+
+def get_plant_ids(plant_ids: int | list[int]) -> list[int]:
+    """Returns one or more plant IDs as a list"""
+
+    if isinstance(plant_ids, int):
+        plant_ids = [plant_ids]
+    return [int(plant_id) for plant_id in plant_ids]
+
+
+def query_archive_tier(plant_ids: int | list[int], start: datetime = None,
+                       end: datetime = None, columns: list[str] = None,
+                       directory: str = ARCHIVE_DIRECTORY, now: datetime = None,
+                       loader=query_archive) -> pd.DataFrame:
+    """Returns the archived part of query_readings on its own, for callers that cache
+    it on the archive's version and pass it back in as cold_frame"""
+
+    fetched_columns = get_fetched_columns(columns)
+    cold_range = get_tier_ranges(start, end, now)[1]
+    plant_ids = get_plant_ids(plant_ids)
+    if cold_range is None or not plant_ids:
+        return build_frame([], fetched_columns)
+    return loader(plant_ids, *cold_range, columns=fetched_columns, directory=directory)
+
+
+def query_readings(config, plant_ids: int | list[int], start: datetime = None,
+                   end: datetime = None, columns: list[str] = None,
+                   directory: str = ARCHIVE_DIRECTORY, now: datetime = None,
+                   hot_loader=load_readings_between, cold_loader=query_archive,
+                   cold_frame: pd.DataFrame = None) -> pd.DataFrame:
+    """Returns the readings of the given plants recorded between start (inclusive) and
+    end (exclusive), with only the requested columns, ordered by time recorded.
+    Each part of the range is read from the tier that holds it, both tiers are read
+    at once, and a reading found in both is kept once. An archived part already read
+    by query_archive_tier can be passed in as cold_frame instead of being read again."""
+
+    plant_ids = get_plant_ids(plant_ids)
+    columns = columns or MEASUREMENT_COLUMNS
+    fetched_columns = get_fetched_columns(columns)
+
+    hot_range = get_tier_ranges(start, end, now)[0]
+    if not plant_ids or (start is not None and end is not None and start >= end):
+        return build_frame([], columns)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        tasks = []
+        if hot_range is not None:
+            tasks.append(executor.submit(hot_loader, config, plant_ids, *hot_range,
+                                         columns=fetched_columns))
+        if cold_frame is None:
+            tasks.append(executor.submit(query_archive_tier, plant_ids, start, end,
+                                         columns=columns, directory=directory, now=now,
+                                         loader=cold_loader))
+        frames = [task.result() for task in tasks]
+    if cold_frame is not None:
+        frames.append(cold_frame)
+
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return build_frame([], columns)
+    readings = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    readings = readings.drop_duplicates('MeasurementRecordID')
+    if start is not None:
+        readings = readings[readings['TimeRecorded'] >= start]
+    if end is not None:
+        readings = readings[readings['TimeRecorded'] < end]
+    return readings.sort_values('TimeRecorded', kind='stable')[columns].reset_index(drop=True)
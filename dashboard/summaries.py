@@ -0,0 +1,85 @@
+"""Queries the per plant daily and hourly summaries of the archive with DuckDB"""
+import os
+from datetime import datetime
+import duckdb
+import pandas as pd
+from frames import coerce_frame
+from load_from_s3 import SUMMARY_DIRECTORY
+from query_archive import select_archive_files
+
+GRANULARITIES = ('day', 'hour')
+METRICS = ('SoilMoisture', 'Temperature')
+SUMMARY_COLUMNS = ['PlantID', 'PeriodStart', 'ReadingCount',
+                   *[f"{metric}{statistic}" for metric in METRICS
+                     for statistic in ('Mean', 'Min', 'Max', 'Std')],
+                   'LastWatered']
+
+
+def get_merged_statistics(metric: str) -> str:
+    """Returns the SQL merging the partial summaries of one metric. Means are
+    weighted by count and standard deviations are recombined from each part's
+    mean of squares."""
+
+    mean = f"SUM(ReadingCount * {metric}Mean) / SUM(ReadingCount)"
+    mean_of_squares = (f"SUM(ReadingCount * ({metric}Std * {metric}Std"
+                       f" + {metric}Mean * {metric}Mean)) / SUM(ReadingCount)")
+    return f"""{mean} AS {metric}Mean,
+       MIN({metric}Min) AS {metric}Min,
+       MAX({metric}Max) AS {metric}Max,
+       SQRT(GREATEST({mean_of_squares} - POWER({mean}, 2), 0)) AS {metric}Std"""
+
+
+def query_summaries(plant_ids: int | list[int], start: datetime = None, end: datetime = None,
+                    granularity: str = 'day',
+                    directory: str = SUMMARY_DIRECTORY) -> pd.DataFrame:
+    """Returns the summaries of the given plants for each day or hour starting
+    between start and end (exclusive), ordered by plant and period. Every archive
+    export summarises the part of a period it holds, so the parts of each plant's
+    period are merged into one summary."""
+
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown summary granularity: {granularity}")
+    if isinstance(plant_ids, int):
+        plant_ids = [plant_ids]
+    plant_ids = [int(plant_id) for plant_id in plant_ids]
+
+    files = select_archive_files(os.path.join(directory, granularity), start)
+    if not files or not plant_ids:
+        return coerce_frame(pd.DataFrame(columns=SUMMARY_COLUMNS))
+
+    conditions = [f"PlantID IN ({', '.join('?' * len(plant_ids))})"]
+    params = [files, *plant_ids]
+    if start is not None:
+        conditions.append(f"PeriodStart >= date_trunc('{granularity}', ?::TIMESTAMP)")
+        params.append(start)
+    if end is not None:
+        conditions.append("PeriodStart < ?")
+        params.append(end)
+
+    statistics = ",\n       ".join(get_merged_statistics(metric) for metric in METRICS)
+    query = f"""SELECT PlantID, PeriodStart, SUM(ReadingCount) AS ReadingCount,
+       {statistics},
+       MAX(LastWatered) AS LastWatered
+FROM read_csv(?, header=true, union_by_name=true,
+              types={{'PlantID': 'INTEGER', 'PeriodStart': 'TIMESTAMP',
+                      'LastWatered': 'TIMESTAMP'}})
+WHERE {" AND ".join(conditions)}
+GROUP BY PlantID, PeriodStart
+ORDER BY PlantID, PeriodStart;"""
+
+    with duckdb.connect() as conn:
+        return coerce_frame(conn.execute(query, params).df())
+
+
+def summary_series(summaries: pd.DataFrame, column: str) -> pd.DataFrame:
+    """Returns one metric of the summaries shaped like a downsampled series: the
+    mean at each period start, with the period's lowest and highest values in
+    {column}Min and {column}Max"""
+
+    return pd.DataFrame({
+        'TimeRecorded': summaries['PeriodStart'],
+        column: summaries[f'{column}Mean'],
+        f'{column}Min': summaries[f'{column}Min'],
+        f'{column}Max': summaries[f'{column}Max'],
+        'PlantID': summaries['PlantID']
+    })
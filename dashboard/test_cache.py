@@ -0,0 +1,38 @@
+"""Tests the versioned dashboard cache"""
+
+from cache import VersionedCache, VersionProbe
+
+
+def test_cache_reuses_value_at_same_version():
+    cache = VersionedCache()
+    calls = []
+    for _ in range(3):
+        value = cache.get(('plant_data',), (1, 10), lambda: calls.append(1) or 'data')
+    assert value == 'data'
+    assert len(calls) == 1
+    assert cache.stats()['hits'] == 2
+    assert cache.stats()['misses'] == 1
+
+
+def test_cache_reloads_when_version_changes():
+    cache = VersionedCache()
+    cache.get(('plant_data',), (1, 10), lambda: 'old')
+    assert cache.get(('plant_data',), (1, 11), lambda: 'new') == 'new'
+    assert cache.stats()['misses'] == 2
+
+
+def test_cache_evicts_least_recently_used():
+    cache = VersionedCache(max_entries=2)
+    cache.get(('a',), 1, lambda: 'a')
+    cache.get(('b',), 1, lambda: 'b')
+    cache.get(('a',), 1, lambda: 'a')
+    cache.get(('c',), 1, lambda: 'c')
+    assert cache.get(('b',), 1, lambda: 'reloaded') == 'reloaded'
+    assert cache.stats()['entries'] == 2
+
+
+def test_version_probe_is_throttled():
+    versions = iter([1, 2])
+    probe = VersionProbe(lambda: next(versions), interval=60)
+    assert probe.get() == 1
+    assert probe.get() == 1
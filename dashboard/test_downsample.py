@@ -0,0 +1,59 @@
+"""Tests downsampling of the history charts' series"""
+
+import numpy as np
+import pandas as pd
+
+from downsample import MAX_RAW_POINTS, RAW, bucket_series, downsample, lttb
+
+
+def make_series(n_rows):
+    return pd.DataFrame({
+        'TimeRecorded': pd.date_range('2024-04-01', periods=n_rows, freq='min'),
+        'SoilMoisture': np.sin(np.arange(n_rows) / 10),
+        'PlantID': 7
+    })
+
+
+def test_bucket_series_keeps_range_of_each_bucket():
+    data = make_series(1000)
+    sampled = bucket_series(data, 'SoilMoisture', 100)
+    assert len(sampled) == 100
+    assert (sampled['SoilMoistureMin'] <= sampled['SoilMoisture']).all()
+    assert (sampled['SoilMoisture'] <= sampled['SoilMoistureMax']).all()
+    assert sampled['SoilMoistureMax'].max() == data['SoilMoisture'].max()
+    assert (sampled['PlantID'] == 7).all()
+
+
+def test_lttb_keeps_end_points_and_extremes():
+    data = make_series(1000)
+    data.loc[500, 'SoilMoisture'] = 10
+    sampled = lttb(data, 'SoilMoisture', 50)
+    assert len(sampled) == 50
+    assert sampled.index[0] == 0
+    assert sampled.index[-1] == 999
+    assert 500 in sampled.index
+
+
+def test_downsample_leaves_short_series_alone():
+    data = make_series(20)
+    assert downsample(data, 'SoilMoisture', 50).equals(data)
+
+
+def test_raw_is_capped_at_the_rows_altair_charts():
+    assert len(downsample(make_series(4000), 'SoilMoisture', mode=RAW)) == 4000
+    sampled = downsample(make_series(MAX_RAW_POINTS + 1000), 'SoilMoisture', mode=RAW)
+    assert len(sampled) == MAX_RAW_POINTS
+    assert 'SoilMoistureMin' not in sampled.columns
+
+
+def test_bucket_series_over_more_than_a_year():
+    data = pd.DataFrame({
+        'TimeRecorded': pd.date_range('2023-01-01', '2024-02-05', freq='10min'),
+        'PlantID': 7})
+    data['SoilMoisture'] = np.arange(len(data), dtype=np.float64)
+    sampled = bucket_series(data, 'SoilMoisture', 1200)
+    assert len(sampled) == 1200
+    assert sampled['TimeRecorded'].is_monotonic_increasing
+    assert sampled['TimeRecorded'].iloc[0] == data['TimeRecorded'].iloc[0]
+    assert sampled['TimeRecorded'].iloc[-1] <= data['TimeRecorded'].iloc[-1]
+    assert sampled['SoilMoisture'].is_monotonic_increasing
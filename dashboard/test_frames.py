@@ -0,0 +1,43 @@
+"""Tests building compact typed frames"""
+
+from datetime import datetime
+from decimal import Decimal
+
+import pandas as pd
+
+from frames import build_frame, coerce_frame, display_frame
+
+
+def test_build_frame_uses_compact_types():
+    rows = [{'MeasurementRecordID': 1, 'TimeRecorded': datetime(2024, 4, 16, 12),
+             'SoilMoisture': Decimal('27.36'), 'PlantID': 2, 'PlantName': 'Corpse Flower'}]
+    frame = build_frame(rows)
+    assert str(frame['MeasurementRecordID'].dtype) == 'Int32'
+    assert str(frame['TimeRecorded'].dtype).startswith('datetime64')
+    assert str(frame['SoilMoisture'].dtype) == 'float32'
+    assert str(frame['PlantID'].dtype) == 'Int16'
+    assert str(frame['PlantName'].dtype) == 'category'
+
+
+def test_build_frame_without_rows_keeps_columns():
+    frame = build_frame([], ['TimeRecorded', 'SoilMoisture'])
+    assert frame.empty
+    assert list(frame.columns) == ['TimeRecorded', 'SoilMoisture']
+
+
+def test_coerce_frame_converts_archived_columns():
+    frame = coerce_frame(pd.DataFrame({'TimeRecorded': ['2024-04-16 12:00:00'],
+                                       'Temperature': [9.12], 'City': ['Lagos']}))
+    assert str(frame['TimeRecorded'].dtype).startswith('datetime64')
+    assert str(frame['Temperature'].dtype) == 'float32'
+    assert str(frame['City'].dtype) == 'category'
+
+
+def test_display_frame_charts_stored_values():
+    frame = build_frame([{'MeasurementRecordID': None, 'SoilMoisture': Decimal('27.36'),
+                          'PlantID': 2}])
+    assert frame['MeasurementRecordID'].isna().all()
+    displayed = display_frame(frame)
+    assert str(displayed['SoilMoisture'].dtype) == 'float64'
+    assert displayed['SoilMoisture'].tolist() == [27.36]
+    assert str(frame['SoilMoisture'].dtype) == 'float32'
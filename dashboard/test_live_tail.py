@@ -0,0 +1,52 @@
+"""Tests the incremental live tail of the last 24 hours"""
+
+from datetime import datetime
+
+from frames import build_frame
+from live_tail import LiveTail
+from load_from_db import READING_COLUMNS
+
+
+def make_loader(rows):
+    calls = []
+
+    def loader(config, last_id, plant_id):
+        calls.append(last_id)
+        return build_frame([row for row in rows if row['MeasurementRecordID'] > last_id],
+                           READING_COLUMNS)
+    return loader, calls
+
+
+def make_row(record_id, time_recorded):
+    return {'MeasurementRecordID': record_id, 'TimeRecorded': time_recorded,
+            'SoilMoisture': 30.0, 'Temperature': 12.0, 'PlantID': 1}
+
+
+def test_refresh_only_fetches_new_rows():
+    rows = [make_row(1, datetime(2024, 4, 16, 12)), make_row(2, datetime(2024, 4, 16, 13))]
+    loader, calls = make_loader(rows)
+    tail = LiveTail({}, plant_id=1, min_refresh_interval=0, loader=loader)
+
+    assert tail.refresh(now=datetime(2024, 4, 16, 14)) == 2
+    rows.append(make_row(3, datetime(2024, 4, 16, 14)))
+    assert tail.refresh(now=datetime(2024, 4, 16, 14)) == 1
+
+    assert calls == [0, 2]
+    assert list(tail.snapshot()['MeasurementRecordID']) == [1, 2, 3]
+
+
+def test_refresh_evicts_readings_older_than_window():
+    rows = [make_row(1, datetime(2024, 4, 15, 12)), make_row(2, datetime(2024, 4, 16, 13))]
+    loader, _ = make_loader(rows)
+    tail = LiveTail({}, min_refresh_interval=0, loader=loader)
+
+    tail.refresh(now=datetime(2024, 4, 16, 14))
+    assert list(tail.snapshot()['MeasurementRecordID']) == [2]
+
+
+def test_refresh_is_throttled():
+    loader, calls = make_loader([])
+    tail = LiveTail({}, min_refresh_interval=60, loader=loader)
+    tail.refresh()
+    tail.refresh()
+    assert len(calls) == 1
@@ -0,0 +1,39 @@
+"""Tests listing the archive bucket"""
+
+from load_from_s3 import get_archive_version, get_bucket_objects, list_bucket_objects
+
+
+class FakePaginator:
+    def __init__(self, keys, page_size):
+        self.keys = keys
+        self.page_size = page_size
+
+    def paginate(self, Bucket, Prefix=''):  # pylint: disable=invalid-name
+        keys = [key for key in self.keys if key.startswith(Prefix)]
+        for i in range(0, len(keys), self.page_size):
+            yield {'Contents': [{'Key': key, 'ETag': f'"{key}"'}
+                                for key in keys[i:i + self.page_size]]}
+
+
+class FakeS3:
+    def __init__(self, keys, page_size=2):
+        self.keys = keys
+        self.page_size = page_size
+
+    def get_paginator(self, operation):
+        assert operation == 'list_objects_v2'
+        return FakePaginator(self.keys, self.page_size)
+
+
+def test_listing_reads_every_page():
+    keys = ['2024/04/10/09:00:00', '2024/04/10/10:00:00', '2024/04/10/11:00:00',
+            'summaries/day/2024/04/10/09:00:00']
+    s3 = FakeS3(keys)
+    assert get_bucket_objects(s3, 'bucket') == keys
+    assert [o['Key'] for o in list_bucket_objects(s3, 'bucket', 'summaries/')] == keys[3:]
+
+
+def test_archive_version_changes_past_the_first_page():
+    keys = ['2024/04/10/09:00:00', '2024/04/10/10:00:00', '2024/04/10/11:00:00']
+    before = get_archive_version(FakeS3(keys), 'bucket')
+    assert get_archive_version(FakeS3(keys + ['2024/04/10/12:00:00']), 'bucket') != before
@@ -0,0 +1,52 @@
+"""Tests querying the archived data with DuckDB"""
+
+from datetime import datetime
+
+import pytest
+
+from query_archive import query_archive, select_archive_files
+
+ARCHIVE_HEADER = "MeasurementRecordID,TimeRecorded,SoilMoisture,Temperature,PlantID\n"
+
+
+@pytest.fixture
+def archive_directory(tmp_path):
+    (tmp_path / "2024-04-10-09:00:00.csv").write_text(
+        ARCHIVE_HEADER +
+        "1,2024-04-08 12:00:00,27.36,9.12,2\n"
+        "2,2024-04-08 12:00:00,30.01,12.5,3\n")
+    (tmp_path / "2024-04-11-09:00:00.csv").write_text(
+        ARCHIVE_HEADER +
+        "3,2024-04-09 12:00:00,28.12,9.45,2\n"
+        "4,2024-04-09 13:00:00,29.77,9.61,2\n")
+    (tmp_path / "COMBINED_ARCHIVED_DATA.csv").write_text(ARCHIVE_HEADER)
+    return str(tmp_path)
+
+
+def test_query_archive_filters_plant_and_columns(archive_directory):
+    data = query_archive(2, columns=['TimeRecorded', 'SoilMoisture'],
+                         directory=archive_directory)
+    assert list(data.columns) == ['TimeRecorded', 'SoilMoisture']
+    assert list(data['SoilMoisture']) == pytest.approx([27.36, 28.12, 29.77])
+
+
+def test_query_archive_filters_time_range(archive_directory):
+    data = query_archive([2, 3], start=datetime(2024, 4, 9),
+                         end=datetime(2024, 4, 9, 13), columns=['MeasurementRecordID'],
+                         directory=archive_directory)
+    assert list(data['MeasurementRecordID']) == [3]
+
+
+def test_select_archive_files_skips_files_before_start(archive_directory):
+    files = select_archive_files(archive_directory, start=datetime(2024, 4, 9, 12))
+    assert [f.rsplit('/', 1)[-1] for f in files] == ["2024-04-11-09:00:00.csv"]
+
+
+def test_query_archive_rejects_unknown_columns(archive_directory):
+    with pytest.raises(ValueError):
+        query_archive(2, columns=['Humidity'], directory=archive_directory)
+
+
+def test_query_archive_without_files(tmp_path):
+    data = query_archive(2, columns=['TimeRecorded'], directory=str(tmp_path / "missing"))
+    assert data.empty
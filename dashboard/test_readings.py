@@ -0,0 +1,102 @@
+"""Tests querying readings across the database and the archive"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from frames import build_frame
+from readings import get_tier_ranges, query_archive_tier, query_readings
+
+NOW = datetime(2024, 4, 16, 12)
+BOUNDARY = NOW - timedelta(hours=24)
+
+
+def make_row(record_id, time_recorded):
+    return {'MeasurementRecordID': record_id, 'TimeRecorded': time_recorded,
+            'SoilMoisture': float(record_id), 'Temperature': 12.0, 'PlantID': 1}
+
+
+def make_loader(rows, calls, tier):
+
+    def loader(*args, columns, **kwargs):
+        start, end = args[-2:]
+        calls.append((tier, start, end))
+        return build_frame([row for row in rows
+                            if (start is None or row['TimeRecorded'] >= start)
+                            and (end is None or row['TimeRecorded'] < end)], columns)
+    return loader
+
+
+def test_tier_ranges_split_at_the_boundary():
+    hot, cold = get_tier_ranges(NOW - timedelta(days=7), None, NOW)
+    assert hot == (BOUNDARY - timedelta(hours=26), None)
+    assert cold == (NOW - timedelta(days=7), BOUNDARY)
+
+
+def test_tier_ranges_skip_tiers_the_range_misses():
+    assert get_tier_ranges(NOW - timedelta(hours=1), NOW, NOW)[1] is None
+    assert get_tier_ranges(None, NOW - timedelta(days=3), NOW)[0] is None
+
+
+def test_query_readings_merges_tiers_and_drops_duplicates():
+    hot_rows = [make_row(3, BOUNDARY - timedelta(minutes=30)),
+                make_row(4, BOUNDARY + timedelta(hours=1))]
+    cold_rows = [make_row(1, BOUNDARY - timedelta(days=2)),
+                 make_row(2, BOUNDARY - timedelta(hours=1)),
+                 make_row(3, BOUNDARY - timedelta(minutes=30))]
+    calls = []
+    data = query_readings({}, 1, start=BOUNDARY - timedelta(days=7),
+                          columns=['TimeRecorded', 'SoilMoisture'], now=NOW,
+                          hot_loader=make_loader(hot_rows, calls, 'hot'),
+                          cold_loader=make_loader(cold_rows, calls, 'cold'))
+    assert list(data.columns) == ['TimeRecorded', 'SoilMoisture']
+    assert list(data['SoilMoisture']) == pytest.approx([1, 2, 3, 4])
+    assert sorted(tier for tier, _, _ in calls) == ['cold', 'hot']
+
+
+def test_query_readings_only_reads_the_tier_it_needs():
+    calls = []
+    data = query_readings({}, [1], start=NOW - timedelta(hours=6), now=NOW,
+                          columns=['MeasurementRecordID'],
+                          hot_loader=make_loader([make_row(5, NOW - timedelta(hours=1))],
+                                                 calls, 'hot'),
+                          cold_loader=make_loader([], calls, 'cold'))
+    assert list(data['MeasurementRecordID']) == [5]
+    assert calls == [('hot', NOW - timedelta(hours=6), None)]
+
+
+def test_query_readings_reads_rows_the_daily_archive_has_not_moved_yet():
+    unarchived = make_row(6, NOW - timedelta(hours=30))
+    data = query_readings({}, 1, start=NOW - timedelta(days=7), now=NOW,
+                          columns=['MeasurementRecordID'],
+                          hot_loader=make_loader([unarchived], [], 'hot'),
+                          cold_loader=make_loader([], [], 'cold'))
+    assert list(data['MeasurementRecordID']) == [6]
+
+
+def test_query_readings_rejects_unknown_columns():
+    with pytest.raises(ValueError):
+        query_readings({}, 1, columns=['Humidity'], now=NOW)
+
+
+def test_query_readings_merges_tiers_without_time_recorded_requested():
+    hot_rows = [make_row(2, BOUNDARY + timedelta(hours=1))]
+    cold_rows = [make_row(1, BOUNDARY - timedelta(days=1))]
+    data = query_readings({}, 1, start=BOUNDARY - timedelta(days=7), columns=['SoilMoisture'],
+                          now=NOW, hot_loader=make_loader(hot_rows, [], 'hot'),
+                          cold_loader=make_loader(cold_rows, [], 'cold'))
+    assert list(data.columns) == ['SoilMoisture']
+    assert list(data['SoilMoisture']) == pytest.approx([1, 2])
+
+
+def test_query_readings_reuses_an_archived_frame():
+    start = BOUNDARY - timedelta(days=7)
+    cold_frame = query_archive_tier(
+        1, start, columns=['SoilMoisture'], now=NOW,
+        loader=make_loader([make_row(1, BOUNDARY - timedelta(days=1))], [], 'cold'))
+    calls = []
+    data = query_readings({}, 1, start=start, columns=['SoilMoisture'], now=NOW,
+                          hot_loader=make_loader([make_row(2, NOW)], calls, 'hot'),
+                          cold_loader=make_loader([], calls, 'cold'), cold_frame=cold_frame)
+    assert list(data['SoilMoisture']) == pytest.approx([1, 2])
+    assert [tier for tier, _, _ in calls] == ['hot']
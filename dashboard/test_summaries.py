@@ -0,0 +1,57 @@
+"""Tests querying the archive's per plant summaries with DuckDB"""
+
+from datetime import datetime
+
+import pytest
+
+from summaries import query_summaries, summary_series
+
+SUMMARY_HEADER = ("PlantID,PeriodStart,ReadingCount,SoilMoistureMean,SoilMoistureMin,"
+                  "SoilMoistureMax,SoilMoistureStd,TemperatureMean,TemperatureMin,"
+                  "TemperatureMax,TemperatureStd,LastWatered\n")
+
+
+@pytest.fixture
+def summary_directory(tmp_path):
+    day = tmp_path / "day"
+    day.mkdir()
+    # Plant 1's readings of 10, 20 and 30, then 40, split across two exports
+    (day / "2024-04-10-09:00:00.csv").write_text(
+        SUMMARY_HEADER +
+        "1,2024-04-09 00:00:00,3,20.0,10.0,30.0,8.1650,12.0,11.0,13.0,0.8165,"
+        "2024-04-09 08:00:00\n"
+        "2,2024-04-09 00:00:00,1,50.0,50.0,50.0,0.0,15.0,15.0,15.0,0.0,\n")
+    (day / "2024-04-10-10:00:00.csv").write_text(
+        SUMMARY_HEADER +
+        "1,2024-04-09 00:00:00,1,40.0,40.0,40.0,0.0,14.0,14.0,14.0,0.0,"
+        "2024-04-09 09:00:00\n")
+    (day / "2024-04-12-09:00:00.csv").write_text(
+        SUMMARY_HEADER +
+        "1,2024-04-11 00:00:00,2,30.0,29.0,31.0,1.0,12.0,12.0,12.0,0.0,\n")
+    return str(tmp_path)
+
+
+def test_query_summaries_merges_partial_periods(summary_directory):
+    data = query_summaries(1, directory=summary_directory)
+    assert list(data['ReadingCount']) == [4, 2]
+    first = data.iloc[0]
+    assert first['SoilMoistureMean'] == pytest.approx(25.0)
+    assert first['SoilMoistureMin'] == 10.0 and first['SoilMoistureMax'] == 40.0
+    assert first['SoilMoistureStd'] == pytest.approx(11.1803, abs=1e-3)
+    assert first['LastWatered'] == datetime(2024, 4, 9, 9)
+
+
+def test_query_summaries_filters_plants_and_time(summary_directory):
+    data = query_summaries([1, 2], start=datetime(2024, 4, 11, 6),
+                           directory=summary_directory)
+    assert list(data['PeriodStart']) == [datetime(2024, 4, 11)]
+
+    series = summary_series(query_summaries(2, directory=summary_directory), 'Temperature')
+    assert list(series.columns) == ['TimeRecorded', 'Temperature', 'TemperatureMin',
+                                    'TemperatureMax', 'PlantID']
+
+
+def test_query_summaries_without_files(tmp_path):
+    assert query_summaries(1, directory=str(tmp_path)).empty
+    with pytest.raises(ValueError):
+        query_summaries(1, granularity='week', directory=str(tmp_path))
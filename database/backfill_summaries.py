@@ -0,0 +1,38 @@
+'''Writes the daily and hourly summaries of the exports already in the archive.
+
+The archive run only summarises its own export and repairs the last
+SUMMARY_REPAIR_DAYS days, so exports made before summaries were written need
+this run once for the dashboard's summary views to reach back over them.
+Exports that already have their summaries are skipped, so it is safe to rerun.
+
+Usage: python backfill_summaries.py [--days 90]'''
+import argparse
+import logging
+
+from dotenv import load_dotenv
+
+from load_from_db import get_export_time, get_s3_client, repair_summaries
+from metrics import start_run
+
+
+def parse_args():
+    """Parses the command line arguments"""
+
+    parser = argparse.ArgumentParser(description="Summarise the archived exports")
+    parser.add_argument('--days', type=int, default=None,
+                        help="only the exports of the last DAYS days (default: all)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+
+    metrics = start_run("summary_backfill")
+    try:
+        with metrics.timer("repair"):
+            repaired = repair_summaries(get_s3_client(), get_export_time(), metrics, args.days)
+        logging.info(" Summarised %d archived exports", repaired)
+    finally:
+        metrics.emit()
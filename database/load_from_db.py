@@ -5,22 +5,24 @@ import json
 import logging
 import csv
 import datetime
+import time
 import pytz
 from os import environ as ENV
 from dotenv import load_dotenv
 from pymssql import connect
-from boto3 import client
+from metrics import start_run
+from summaries import (GRANULARITIES, SUMMARY_PREFIX, get_summary_object_name,
+                       summarise_readings, write_summaries)
 
-UTC_NOW = datetime.datetime.now(pytz.utc)
-CURRENT_TIMESTAMP = UTC_NOW.astimezone(pytz.timezone('Europe/London'))
-FORMATTED_TIMESTAMP = CURRENT_TIMESTAMP.strftime('%H:%M:%S')
-
-year = CURRENT_TIMESTAMP.strftime('%Y')
-month = CURRENT_TIMESTAMP.strftime('%m')
-day = CURRENT_TIMESTAMP.strftime('%d')
 BUCKET = 'permian-triassic'
+TIMEZONE = pytz.timezone('Europe/London')
+SUMMARY_ATTEMPTS = 3
+SUMMARY_RETRY_DELAY = 1.0
+# Each run recomputes any summary missing from the last few days of exports
+SUMMARY_REPAIR_DAYS = 2
 
-OBJ_NAME = f'{year}/{month}/{day}/{FORMATTED_TIMESTAMP}'
+# Kept across warm invocations, unlike the export time which is read per run
+_s3_client = None
 
 
 def handler(event, context) -> dict:
@@ -34,6 +36,29 @@ def handler(event, context) -> dict:
     }
 
 
+def get_export_time() -> datetime.datetime:
+    """Returns the current London time, which names the exported file"""
+
+    return datetime.datetime.now(pytz.utc).astimezone(TIMEZONE)
+
+
+def get_object_name(export_time: datetime.datetime) -> str:
+    """Returns the archive object name for an export time, e.g. 2024/04/16/09:00:00"""
+
+    return export_time.strftime('%Y/%m/%d/%H:%M:%S')
+
+
+def get_s3_client():
+    """Returns an S3 client, created on first use. boto3 is imported here as it is
+    most of the module's import time, which every cold start would otherwise pay."""
+
+    global _s3_client
+    if _s3_client is None:
+        from boto3 import client
+        _s3_client = client("s3")
+    return _s3_client
+
+
 def get_db_connection(config):
     """Returns a live database connection."""
 
@@ -92,6 +117,79 @@ def upload_to_bucket(aws_client, file, bucket, obj_name):
     aws_client.upload_file(file, bucket, obj_name)
 
 
+def upload_summaries(aws_client, data, object_name, metrics) -> None:
+    """uploads per plant summaries of each day and hour of the data to the s3 bucket"""
+
+    for granularity in GRANULARITIES:
+        summaries = summarise_readings(data, granularity)
+        path = write_summaries(
+            summaries, f"summary_{granularity}_{object_name.replace('/', '-')}.csv")
+        metrics.increment("summary_rows_total", len(summaries), granularity=granularity)
+        upload_to_bucket(aws_client, path, BUCKET,
+                         get_summary_object_name(granularity, object_name))
+
+
+def upload_summaries_with_retry(aws_client, data, object_name, metrics) -> bool:
+    """uploads the summaries of an export, retrying with backoff. Returns whether they
+    were uploaded."""
+
+    for attempt in range(SUMMARY_ATTEMPTS):
+        try:
+            with metrics.timer("summarise"):
+                upload_summaries(aws_client, data, object_name, metrics)
+            return True
+        except Exception:  # pylint: disable=broad-except
+            logging.exception(" Could not upload summaries of %s (attempt %d)",
+                              object_name, attempt + 1)
+            if attempt + 1 < SUMMARY_ATTEMPTS:
+                time.sleep(SUMMARY_RETRY_DELAY * 2 ** attempt)
+    return False
+
+
+def list_keys(aws_client, prefix: str) -> list[str]:
+    """lists every object key in the bucket under a prefix"""
+
+    keys = []
+    for page in aws_client.get_paginator('list_objects_v2').paginate(Bucket=BUCKET,
+                                                                     Prefix=prefix):
+        keys.extend(o['Key'] for o in page.get('Contents', []))
+    return keys
+
+
+def read_archive_object(aws_client, object_name: str) -> list[dict]:
+    """reads the rows of an archived csv file"""
+
+    body = aws_client.get_object(Bucket=BUCKET, Key=object_name)['Body'].read()
+    return list(csv.DictReader(body.decode('utf-8').splitlines()))
+
+
+def repair_summaries(aws_client, export_time, metrics,
+                     days: int | None = SUMMARY_REPAIR_DAYS) -> int:
+    """recomputes the summaries of recent exports that have none, from their archived
+    csv files, so a failed summary upload is made good by a later run. With days None
+    every export in the archive is checked, which backfills exports made before
+    summaries were written. Returns the number of exports repaired."""
+
+    prefixes = [''] if days is None else [
+        (export_time - datetime.timedelta(days=day)).strftime('%Y/%m/%d/')
+        for day in range(days)]
+    repaired = 0
+    for prefix in prefixes:
+        summarised = [set(key.removeprefix(get_summary_object_name(granularity, ''))
+                          for key in list_keys(aws_client,
+                                               get_summary_object_name(granularity, prefix)))
+                      for granularity in GRANULARITIES]
+        for object_name in list_keys(aws_client, prefix):
+            if object_name.startswith(f"{SUMMARY_PREFIX}/") or all(
+                    object_name in names for names in summarised):
+                continue
+            data = read_archive_object(aws_client, object_name)
+            if data and upload_summaries_with_retry(aws_client, data, object_name, metrics):
+                repaired += 1
+    metrics.increment("summary_repairs_total", repaired)
+    return repaired
+
+
 def delete_from_database(config):
     """deletes data older than 24 hours from database"""
 
@@ -111,18 +209,48 @@ def main():
 
     logging.basicConfig(level=logging.INFO)
 
-    s3_client = client("s3")
+    metrics = start_run("archive")
+    try:
+        archive_old_data(metrics)
+    finally:
+        metrics.emit()
+
 
-    old_data = load_data(ENV)
+def archive_old_data(metrics):
+    """moves data older than 24 hours to the s3 bucket, timing each stage"""
+
+    s3_client = get_s3_client()
+    export_time = get_export_time()
+
+    with metrics.timer("load"):
+        old_data = load_data(ENV)
+    metrics.increment("rows_total", len(old_data))
     logging.info(" Loaded old data from database")
 
-    csv_file = f'data_{FORMATTED_TIMESTAMP}.csv'
+    csv_file = f"data_{export_time.strftime('%H:%M:%S')}.csv"
 
     if old_data:
-        convert_to_csv(old_data, csv_file)
-        upload_to_bucket(s3_client, f'/tmp/{csv_file}', BUCKET, OBJ_NAME)
+        with metrics.timer("convert"):
+            convert_to_csv(old_data, csv_file)
+        metrics.increment("bytes_total", os.path.getsize(f'/tmp/{csv_file}'))
+        with metrics.timer("upload"):
+            upload_to_bucket(s3_client, f'/tmp/{csv_file}', BUCKET,
+                             get_object_name(export_time))
         logging.info(" Uploaded csv file to s3 bucket successfully")
-        delete_from_database(ENV)
+        # The rows are archived either way: summaries that still fail are recomputed
+        # from the uploaded csv file by repair_summaries on a later run
+        if upload_summaries_with_retry(s3_client, old_data, get_object_name(export_time),
+                                       metrics):
+            logging.info(" Uploaded summaries to s3 bucket successfully")
+        with metrics.timer("delete"):
+            delete_from_database(ENV)
         logging.info(" Removed old data from database")
     else:
         logging.info(" No data to upload.")
+
+    try:
+        with metrics.timer("repair"):
+            repaired = repair_summaries(s3_client, export_time, metrics)
+        logging.info(" Repaired the summaries of %d exports", repaired)
+    except Exception:  # pylint: disable=broad-except
+        logging.exception(" Could not repair summaries")
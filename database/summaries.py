@@ -0,0 +1,75 @@
+"""Summarises archived readings per plant per day and per hour"""
+
+import csv
+import math
+import os
+from datetime import datetime
+
+SUMMARY_PREFIX = 'summaries'
+GRANULARITIES = {
+    'day': '%Y-%m-%d 00:00:00',
+    'hour': '%Y-%m-%d %H:00:00'
+}
+METRICS = ('SoilMoisture', 'Temperature')
+STATISTICS = ('Mean', 'Min', 'Max', 'Std')
+SUMMARY_COLUMNS = ['PlantID', 'PeriodStart', 'ReadingCount',
+                   *[f"{metric}{statistic}" for metric in METRICS for statistic in STATISTICS],
+                   'LastWatered']
+
+
+def get_summary_object_name(granularity: str, object_name: str) -> str:
+    """Returns the summary object name for an archive object,
+    e.g. summaries/day/2024/04/16/09:00:00"""
+
+    return f"{SUMMARY_PREFIX}/{granularity}/{object_name}"
+
+
+def to_datetime(value) -> datetime | None:
+    """Returns a time from the database, or from an archived CSV where it is text"""
+
+    if isinstance(value, str):
+        return datetime.fromisoformat(value) if value else None
+    return value
+
+
+def summarise_readings(data: list[dict], granularity: str) -> list[dict]:
+    """Returns one summary per plant per day or hour of the readings, with the
+    count, mean, min, max and population standard deviation of each metric and
+    the latest time the plant was watered. Rows may come from the database or
+    from an archived CSV. An export only holds part of a day, so summaries of
+    the same plant and period from several exports are merged by the reader."""
+
+    period_format = GRANULARITIES[granularity]
+    groups = {}
+    for row in data:
+        key = (int(row['PlantID']), to_datetime(row['TimeRecorded']).strftime(period_format))
+        groups.setdefault(key, []).append(row)
+
+    summaries = []
+    for (plant_id, period_start), rows in sorted(groups.items()):
+        summary = {'PlantID': plant_id, 'PeriodStart': period_start,
+                   'ReadingCount': len(rows)}
+        for metric in METRICS:
+            values = [float(row[metric]) for row in rows]
+            mean = sum(values) / len(values)
+            summary[f"{metric}Mean"] = round(mean, 4)
+            summary[f"{metric}Min"] = min(values)
+            summary[f"{metric}Max"] = max(values)
+            summary[f"{metric}Std"] = round(math.sqrt(
+                sum((value - mean) ** 2 for value in values) / len(values)), 4)
+        watered = [to_datetime(row['TimeLastWatered']) for row in rows
+                   if row.get('TimeLastWatered')]
+        summary['LastWatered'] = max(watered) if watered else None
+        summaries.append(summary)
+    return summaries
+
+
+def write_summaries(summaries: list[dict], filename: str) -> str:
+    """Writes summaries to a csv file in /tmp and returns its path"""
+
+    path = os.path.join('/tmp', filename)
+    with open(path, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=SUMMARY_COLUMNS)
+        writer.writeheader()
+        writer.writerows(summaries)
+    return path
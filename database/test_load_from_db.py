@@ -0,0 +1,56 @@
+"""Tests backfilling the summaries of archived exports"""
+
+from load_from_db import BUCKET, repair_summaries
+from metrics import start_run
+
+ARCHIVE_CSV = b"""MeasurementRecordID,TimeRecorded,SoilMoisture,Temperature,PlantID,TimeLastWatered
+1,2024-01-01 09:01:00,10.00,12.00,1,2024-01-01 08:00:00
+2,2024-01-01 09:02:00,20.00,14.00,1,2024-01-01 08:00:00
+"""
+
+
+class FakePaginator:
+    def __init__(self, objects):
+        self.objects = objects
+
+    def paginate(self, Bucket, Prefix=''):  # pylint: disable=invalid-name
+        assert Bucket == BUCKET
+        yield {'Contents': [{'Key': key} for key in sorted(self.objects)
+                            if key.startswith(Prefix)]}
+
+
+class FakeBody:
+    def __init__(self, body):
+        self.body = body
+
+    def read(self):
+        return self.body
+
+
+class FakeS3:
+    def __init__(self, objects):
+        self.objects = dict(objects)
+
+    def get_paginator(self, operation):
+        assert operation == 'list_objects_v2'
+        return FakePaginator(self.objects)
+
+    def get_object(self, Bucket, Key):  # pylint: disable=invalid-name
+        return {'Body': FakeBody(self.objects[Key])}
+
+    def upload_file(self, Filename, Bucket, Key):  # pylint: disable=invalid-name
+        with open(Filename, 'rb') as file:
+            self.objects[Key] = file.read()
+
+
+def test_backfill_summarises_every_archived_export():
+    s3 = FakeS3({'2024/01/02/09:00:00': ARCHIVE_CSV,
+                 '2024/01/03/09:00:00': ARCHIVE_CSV,
+                 'summaries/day/2024/01/03/09:00:00': b'done',
+                 'summaries/hour/2024/01/03/09:00:00': b'done'})
+    metrics = start_run("test")
+
+    assert repair_summaries(s3, None, metrics, days=None) == 1
+    assert 'summaries/day/2024/01/02/09:00:00' in s3.objects
+    assert 'summaries/hour/2024/01/02/09:00:00' in s3.objects
+    assert repair_summaries(s3, None, metrics, days=None) == 0
@@ -0,0 +1,51 @@
+"""Tests summarising archived readings per plant per day and hour"""
+
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from summaries import summarise_readings
+
+
+def make_row(plant_id, time_recorded, soil_moisture, temperature, last_watered):
+    return {'PlantID': plant_id, 'TimeRecorded': time_recorded,
+            'SoilMoisture': soil_moisture, 'Temperature': temperature,
+            'TimeLastWatered': last_watered}
+
+
+ROWS = [
+    make_row(1, datetime(2024, 4, 16, 9, 1), Decimal('10.00'), Decimal('12.00'),
+             datetime(2024, 4, 16, 8)),
+    make_row(1, datetime(2024, 4, 16, 9, 2), Decimal('20.00'), Decimal('14.00'),
+             datetime(2024, 4, 16, 8)),
+    make_row(1, datetime(2024, 4, 16, 10, 0), Decimal('30.00'), Decimal('13.00'),
+             datetime(2024, 4, 16, 9, 30)),
+    make_row(2, datetime(2024, 4, 16, 9, 1), Decimal('40.00'), Decimal('20.00'), None),
+]
+
+
+def test_daily_summaries_per_plant():
+    first, second = summarise_readings(ROWS, 'day')
+    assert (first['PlantID'], first['PeriodStart'], first['ReadingCount']) == (
+        1, '2024-04-16 00:00:00', 3)
+    assert first['SoilMoistureMean'] == pytest.approx(20.0)
+    assert (first['SoilMoistureMin'], first['SoilMoistureMax']) == (10.0, 30.0)
+    assert first['SoilMoistureStd'] == pytest.approx(8.1650, abs=1e-4)
+    assert first['TemperatureMean'] == pytest.approx(13.0)
+    assert first['LastWatered'] == datetime(2024, 4, 16, 9, 30)
+    assert second['PlantID'] == 2 and second['LastWatered'] is None
+
+
+def test_hourly_summaries_split_each_day():
+    summaries = summarise_readings(ROWS, 'hour')
+    assert [(s['PlantID'], s['PeriodStart'], s['ReadingCount']) for s in summaries] == [
+        (1, '2024-04-16 09:00:00', 2), (1, '2024-04-16 10:00:00', 1),
+        (2, '2024-04-16 09:00:00', 1)]
+
+
+def test_summaries_of_rows_read_back_from_an_archived_csv():
+    text_rows = [{key: '' if value is None else str(value) for key, value in row.items()}
+                 for row in ROWS]
+    assert summarise_readings(text_rows, 'day') == summarise_readings(ROWS, 'day')
+
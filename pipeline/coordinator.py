@@ -0,0 +1,106 @@
+'''Coordinates a sharded pipeline run: starts every shard at once and reports how
+long each took and which ones straggled.
+
+Run every shard locally with: python coordinator.py --shards 4
+or as invocations of the pipeline Lambda with: python coordinator.py --shards 4 --function NAME'''
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from pipeline import main
+
+# A shard taking this many times the median shard's time is reported as a straggler
+STRAGGLER_FACTOR = 1.5
+
+
+def run_shard_locally(shard_index: int, shard_count: int) -> dict:
+    """Runs the pipeline for one shard in this process and returns its result"""
+
+    return asyncio.run(main(shard_index, shard_count))
+
+
+def invoke_shard_lambda(function_name: str, shard_index: int, shard_count: int) -> dict:
+    """Runs the pipeline for one shard as a Lambda invocation and returns its result"""
+
+    from boto3 import client
+    response = client('lambda').invoke(
+        FunctionName=function_name,
+        Payload=json.dumps({'shard_index': shard_index, 'shard_count': shard_count}))
+    payload = json.loads(response['Payload'].read())
+    if 'FunctionError' in response:
+        raise RuntimeError(payload.get('errorMessage', 'Shard invocation failed'))
+    return json.loads(payload['body'])
+
+
+def summarise_shards(reports: list[dict]) -> dict:
+    """Summarises the shard reports of a run, flagging the stragglers that took
+    over STRAGGLER_FACTOR times the median shard's time"""
+
+    durations = [report['seconds'] for report in reports if 'error' not in report]
+    median = statistics.median(durations) if durations else 0.0
+    for report in reports:
+        report['straggler'] = 'error' not in report and report['seconds'] > (
+            STRAGGLER_FACTOR * median)
+
+    slowest = max((report for report in reports if 'error' not in report),
+                  key=lambda report: report['seconds'], default=None)
+    return {
+        'shards': sorted(reports, key=lambda report: report['shard']),
+        'completed': len(durations),
+        'failed': [report['shard'] for report in reports if 'error' in report],
+        'extracted': sum(report.get('extracted', 0) for report in reports),
+        'loaded': sum(report.get('loaded', 0) for report in reports),
+        'median_seconds': median,
+        'slowest_shard': slowest['shard'] if slowest else None,
+        'straggler_ratio': slowest['seconds'] / median if slowest and median else None,
+        'stragglers': [report['shard'] for report in reports if report['straggler']]
+    }
+
+
+def coordinate(shard_count: int, runner=run_shard_locally, executor_class=ProcessPoolExecutor,
+               **runner_kwargs) -> dict:
+    """Runs every shard at once and reports when each finished, how long it took
+    and which ones straggled. Failed shards are reported rather than raised."""
+
+    start = time.perf_counter()
+    reports = []
+    with executor_class(max_workers=shard_count) as executor:
+        tasks = {executor.submit(runner, shard_index=shard_index, shard_count=shard_count,
+                                 **runner_kwargs): shard_index
+                 for shard_index in range(shard_count)}
+        for task in as_completed(tasks):
+            report = {'shard': tasks[task], 'seconds': time.perf_counter() - start}
+            try:
+                report.update(task.result() or {})
+            except Exception as error:  # pylint: disable=broad-except
+                report['error'] = str(error)
+            reports.append(report)
+            print(f"Shard {report['shard']} finished after {report['seconds']:.2f}s"
+                  + (f" with an error: {report['error']}" if 'error' in report else ""))
+    return summarise_shards(reports)
+
+
+def parse_args():
+    """Parses the command line arguments"""
+
+    parser = argparse.ArgumentParser(description="Run the pipeline across shards")
+    parser.add_argument('--shards', type=int, required=True)
+    parser.add_argument('--function', default=None,
+                        help="pipeline Lambda to invoke per shard instead of local processes")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    args = parse_args()
+    if args.function:
+        summary = coordinate(args.shards, invoke_shard_lambda, ThreadPoolExecutor,
+                             function_name=args.function)
+    else:
+        summary = coordinate(args.shards)
+    print(json.dumps(summary, indent=2))
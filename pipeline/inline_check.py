@@ -0,0 +1,172 @@
+'''Checks each reading against its plant's recent baseline as soon as it is cleaned,
+so sensor faults are alerted on within a minute rather than at the hourly anomaly run.'''
+import json
+import logging
+import math
+import os
+import time
+
+from records import Reading
+
+METRICS = ('soil_moisture', 'temperature')
+EWMA_ALPHA = 0.1
+N_SIGMA = 3
+MIN_BASELINE_COUNT = 10
+ALERT_COOLDOWN = 30 * 60
+TIME_BUDGET = 0.05
+STATE_PATH = '/tmp/inline_check.json'
+
+
+class BaselineCache:
+    """An exponentially weighted mean and variance of each metric of each plant,
+    with the time of the last reading included so repeated readings are skipped.
+    Checking and updating a reading are both O(1)."""
+
+    def __init__(self, plants: dict = None):
+        self.plants = plants or {}
+
+    def check(self, plant_id: int, recording_taken: str,
+              values: dict[str, float], n_sigma: float = N_SIGMA) -> list[str] | None:
+        """Returns the metrics of a reading that are more than n_sigma deviations
+        from its plant's baseline, then adds the reading to the baseline.
+        Returns None for a reading that has already been checked."""
+
+        baseline = self.plants.setdefault(plant_id, {'last_reading': None})
+        if baseline['last_reading'] == recording_taken:
+            return None
+        baseline['last_reading'] = recording_taken
+
+        anomalous = []
+        for metric in METRICS:
+            value = values[metric]
+            count, ewma, ewm_var = baseline.get(metric, (0, value, 0.0))
+            if count >= MIN_BASELINE_COUNT and abs(value - ewma) > n_sigma * math.sqrt(ewm_var):
+                anomalous.append(metric)
+
+            delta = value - ewma
+            baseline[metric] = (count + 1, ewma + EWMA_ALPHA * delta,
+                                (1 - EWMA_ALPHA) * (ewm_var + EWMA_ALPHA * delta ** 2))
+        return anomalous
+
+    def get_baseline(self, plant_id: int, metric: str) -> tuple[int, float, float]:
+        """Returns the count, mean and variance of one metric of a plant"""
+        return self.plants[plant_id][metric]
+
+
+class AlertGate:
+    """Lets through one alert per plant and metric per cooldown period, so a plant
+    that stays anomalous does not send an alert every minute."""
+
+    def __init__(self, cooldown: float = ALERT_COOLDOWN, last_alerts: dict = None):
+        self.cooldown = cooldown
+        self.last_alerts = last_alerts or {}
+
+    def allow(self, plant_id: int, metric: str, now: float) -> bool:
+        """Whether an alert may be sent now, recording it if so"""
+
+        key = f"{plant_id}:{metric}"
+        if now - self.last_alerts.get(key, -math.inf) < self.cooldown:
+            return False
+        self.last_alerts[key] = now
+        return True
+
+
+class InlineChecker:
+    """The baselines and alert gate, kept in memory between runs in the same
+    process and in a /tmp file between fresh ones."""
+
+    def __init__(self, baselines: BaselineCache = None, gate: AlertGate = None,
+                 budget: float = TIME_BUDGET):
+        self.baselines = baselines or BaselineCache()
+        self.gate = gate or AlertGate()
+        self.budget = budget
+
+    def run(self, plant_data: list[Reading], now: float = None) -> tuple[list[dict], list[int]]:
+        """Checks cleaned readings until they are all checked or the time budget is
+        spent, and logs an alert event for each new anomaly. Returns the alerts and
+        the IDs of every plant with an anomalous reading, including plants whose
+        alerts are held back by the cooldown."""
+
+        now = now if now is not None else time.time()
+        deadline = time.perf_counter() + self.budget
+        alerts = []
+        anomalous_ids = []
+        for checked, plant in enumerate(plant_data):
+            if time.perf_counter() > deadline:
+                logging.warning("Inline anomaly check ran out of time, skipped %d readings",
+                                len(plant_data) - checked)
+                break
+
+            plant_id = int(plant.plant_id)
+            values = plant.get_values(METRICS)
+            anomalous = self.baselines.check(plant_id, plant.recording_taken, values)
+            if anomalous:
+                anomalous_ids.append(plant_id)
+            for metric in anomalous or []:
+                if self.gate.allow(plant_id, metric, now):
+                    _, mean, variance = self.baselines.get_baseline(plant_id, metric)
+                    alerts.append({
+                        'event': 'plant_anomaly',
+                        'plant_id': plant_id,
+                        'metric': metric,
+                        'value': values[metric],
+                        'baseline_mean': round(mean, 2),
+                        'baseline_std': round(math.sqrt(variance), 2),
+                        'recording_taken': plant.recording_taken,
+                        'botanist_email': plant.botanist_email
+                    })
+
+        for alert in alerts:
+            logging.warning(json.dumps(alert))
+        return alerts, anomalous_ids
+
+    def to_json(self) -> str:
+        """Serialises the baselines and alert times"""
+
+        return json.dumps({'plants': {str(k): v for k, v in self.baselines.plants.items()},
+                           'last_alerts': self.gate.last_alerts})
+
+    @classmethod
+    def from_json(cls, text: str) -> 'InlineChecker':
+        """Deserialises a checker"""
+
+        state = json.loads(text)
+        plants = {int(plant_id): {key: tuple(value) if isinstance(value, list) else value
+                                  for key, value in baseline.items()}
+                  for plant_id, baseline in state['plants'].items()}
+        return cls(BaselineCache(plants), AlertGate(last_alerts=state['last_alerts']))
+
+
+# One checker per state file, as a process may run different shards in turn
+_checkers = {}
+
+
+def get_checker(path: str = STATE_PATH) -> InlineChecker:
+    """Returns the checker this process holds for a state file, loading it from
+    the file on first use"""
+
+    if path not in _checkers:
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                _checkers[path] = InlineChecker.from_json(file.read())
+        else:
+            _checkers[path] = InlineChecker()
+    return _checkers[path]
+
+
+def save_checker(checker: InlineChecker, path: str = STATE_PATH) -> None:
+    """Saves the checker's state for the next fresh process"""
+
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(checker.to_json())
+
+
+def check_readings(plant_data: list[Reading],
+                   path: str = STATE_PATH) -> tuple[list[dict], list[int]]:
+    """Runs the inline anomaly check over freshly cleaned readings. Returns the
+    alerts sent and the IDs of the plants with anomalous readings."""
+
+    checker = get_checker(path)
+    result = checker.run(plant_data)
+    save_checker(checker, path)
+    return result
@@ -2,17 +2,36 @@
 
 import aiohttp
 import asyncio
-import pandas as pd
+import json
 import logging
 
-from csv import DictReader
-from datetime import datetime
 from os import environ as ENV
+from sys import intern
+from time import perf_counter
 from dotenv import load_dotenv
 from pymssql import connect
 
+from inline_check import STATE_PATH, check_readings
+from metrics import get_metrics, start_run, timed
+from records import Reading, parse_last_watered
+from scheduler import STATE_PATH as SCHEDULE_PATH, get_scheduler, save_scheduler
+from sharding import get_shard_plant_ids, get_shard_state_path
+
 
 API_URL = 'https://data-eng-plants-api.herokuapp.com/plants/'
+PLANT_IDS = range(1, 51)
+
+
+def handler(event, context) -> dict:
+    """event handler. The event may name the shard of the plants to run, e.g.
+    {"shard_index": 0, "shard_count": 4}"""
+
+    result = asyncio.run(main(event.get('shard_index'), event.get('shard_count')))
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps(result)
+    }
 
 
 def get_database_connection(config):
@@ -27,65 +46,41 @@ def get_database_connection(config):
     )
 
 
-async def extract_plant_data() -> list[dict]:
-    """Scrapes information from API asynchronously and returns a list of dictionaries"""
+async def extract_plant_data(plant_ids=PLANT_IDS) -> list[Reading]:
+    """Scrapes information from API asynchronously and returns a list of readings"""
 
     plant_data = []
     async with aiohttp.ClientSession() as session:
         tasks = [extract_data_for_each_plant(
-            session, plant_id) for plant_id in range(1, 51)]
+            session, plant_id) for plant_id in plant_ids]
         plant_data = await asyncio.gather(*tasks)
     return [data for data in plant_data if data is not None]
 
 
-async def extract_data_for_each_plant(session, plant_id) -> dict:
+@timed("extract_request")
+async def extract_data_for_each_plant(session, plant_id) -> Reading:
     """Extracts data for each plant asynchronously"""
 
     url = f"{API_URL}{plant_id}"
     async with session.get(url) as response:
+        get_metrics().increment("extract_responses_total", status=response.status)
         if response.status == 200:
-            plant_info = await response.json()
-            data_to_append = {
-                'id': plant_info.get('plant_id'),
-                'name': plant_info.get('name'),
-                'soil_moisture': plant_info.get('soil_moisture'),
-                'temperature': plant_info.get('temperature'),
-                'recording_taken': plant_info.get('recording_taken'),
-                'last_watered': plant_info.get('last_watered'),
-                'botanist_name': plant_info['botanist']['name'],
-                'botanist_email': plant_info['botanist']['email'],
-                'botanist_phone': plant_info['botanist']['phone']
-            }
-
-            if 'light_intensity' in plant_info:
-                data_to_append['light_intensity'] = plant_info['light_intensity']
-
-            if 'humidity' in plant_info:
-                data_to_append['humidity'] = plant_info['humidity']
-
-            if 'origin_location' in plant_info:
-                origin_location = plant_info['origin_location']
-                if len(origin_location) >= 3:
-                    data_to_append['latitude'] = origin_location[0]
-                    data_to_append['longitude'] = origin_location[1]
-                    data_to_append['origin_location'] = origin_location[-3:]
-
-            return data_to_append
+            return Reading.from_api(await response.json())
         else:
             print(f"Could not find plant {plant_id}")
 
 
-def clean_data(plant_data: list[dict]) -> list[dict]:
+def clean_data(plant_data: list[Reading]) -> list[Reading]:
     """Cleans the plant data"""
 
     # Convert numerical values to float and round to 2 decimal places
     for plant in plant_data:
-        plant['soil_moisture'] = round(float(plant['soil_moisture']), 2)
-        plant['temperature'] = round(float(plant['temperature']), 2)
+        plant.soil_moisture = round(float(plant.soil_moisture), 2)
+        plant.temperature = round(float(plant.temperature), 2)
 
     # Make name consistent and remove punctuation
     for plant in plant_data:
-        plant['name'] = plant['name'].title().replace(r'[^\w\s]', '')
+        plant.name = intern(plant.name.title().replace(r'[^\w\s]', ''))
 
     return plant_data
 
@@ -97,6 +92,7 @@ def get_botanist_id_dictionary(conn) -> dict:
 
     botanist_dict = {}
 
+    get_metrics().increment("load_round_trips_total")
     with conn.cursor(as_dict=True) as cursor:
         cursor.execute('SELECT * FROM s_epsilon.Botanist')
         for row in cursor:
@@ -104,22 +100,22 @@ def get_botanist_id_dictionary(conn) -> dict:
     return botanist_dict
 
 
-def db_query_string(data: list[dict], conn) -> str:
-    '''This outputs the data from a list of dictionaries in the form
+def db_query_string(data: list[Reading], conn) -> str:
+    '''This outputs the data from a list of readings in the form
     of a string with the specific structure:
     (value_1, value_2, ...),
     (value_1, value_2, ...),
     ...
-    where each set of parentheses represents an element (dictionary in the list).'''
+    where each set of parentheses represents an element (reading in the list).'''
 
     botanist_dict = get_botanist_id_dictionary(conn)
 
     output_string = ""
     for row in data:
         # TimeRecorded, SoilMoisture, Temperature, TimeLastWatered, PlantID, BotanistID
-        output_string += f"""( '{row['recording_taken']}', {float(row['soil_moisture'])},
-          {float(row['temperature'])}, '{str(datetime.strptime(row['last_watered'], '%a, %d %b %Y %H:%M:%S %Z'))}',
-            {int(row['id'])}, {int(botanist_dict[row['botanist_email']])} ),"""
+        output_string += f"""( '{row.recording_taken}', {float(row.soil_moisture)},
+          {float(row.temperature)}, '{parse_last_watered(row.last_watered)}',
+            {int(row.plant_id)}, {int(botanist_dict[row.botanist_email])} ),"""
 
     # Removing final unnecessary comma
     return output_string[:-1]
@@ -129,6 +125,9 @@ def db_inserting_data(query_string: str, conn) -> None:
     """This function inserts data into the PlantMeasurementRecord table, using the 
     inputted query string for the data."""
 
+    metrics = get_metrics()
+    metrics.increment("load_round_trips_total")
+    metrics.increment("load_bytes_total", len(query_string.encode('utf-8')))
     with conn.cursor(as_dict=True) as cursor:
         cursor.execute(f"""INSERT INTO s_epsilon.PlantMeasurementRecord (TimeRecorded, SoilMoisture,
                         Temperature, TimeLastWatered, PlantID, BotanistID)
@@ -136,31 +135,96 @@ def db_inserting_data(query_string: str, conn) -> None:
         conn.commit()
 
 
-async def main():
-    """Main function"""
+async def main(shard_index: int = None, shard_count: int = None) -> dict:
+    """Main function. Runs one shard of the plants if given a shard, or the one
+    in SHARD_INDEX and SHARD_COUNT, and otherwise every plant."""
+
+    if shard_index is None:
+        shard_index = int(ENV.get("SHARD_INDEX", 0))
+    if shard_count is None:
+        shard_count = int(ENV.get("SHARD_COUNT", 1))
+    plant_ids = get_shard_plant_ids(PLANT_IDS, shard_index, shard_count)
+
+    metrics = start_run("pipeline")
+    metrics.set_gauge("shard_plants", len(plant_ids), shard=shard_index)
+    try:
+        return await run_pipeline(metrics, plant_ids, shard_index, shard_count)
+    finally:
+        metrics.emit()
+
+
+async def run_pipeline(metrics, plant_ids=PLANT_IDS, shard_index: int = 0,
+                       shard_count: int = 1) -> dict:
+    """Extracts, cleans and loads one minute of readings for the given plants,
+    timing each stage. With ADAPTIVE_POLLING set only the plants due a poll are
+    extracted. Returns the numbers of plants extracted and loaded."""
+
+    # Schedule
+    scheduler = None
+    if ENV.get("ADAPTIVE_POLLING") == "true":
+        schedule_path = get_shard_state_path(SCHEDULE_PATH, shard_index, shard_count)
+        scheduler = get_scheduler(ENV, schedule_path)
+        due_ids = scheduler.get_due(plant_ids)
+        metrics.set_gauge("scheduler_due_plants", len(due_ids))
+        metrics.set_gauge("scheduler_skipped_plants", len(plant_ids) - len(due_ids))
+        logging.info("%d of %d plants are due a poll", len(due_ids), len(plant_ids))
+        plant_ids = due_ids
 
     # Extract
     print("Fetching data...")
-    plant_data = await extract_plant_data()
+    with metrics.timer("extract"):
+        plant_data = await extract_plant_data(plant_ids)
+    metrics.increment("extract_plants_total", len(plant_data))
     logging.info("Successfully collected data")
     print("--- Collecting Data ---")
 
     # Transform
+    transform_start = perf_counter()
     cleaned_data = clean_data(plant_data)
+    transform_seconds = perf_counter() - transform_start
+    metrics.observe("transform_seconds", transform_seconds)
+    metrics.increment("transform_rows_total", len(cleaned_data))
+    if transform_seconds:
+        metrics.set_gauge("transform_rows_per_second", len(cleaned_data) / transform_seconds)
     logging.info("Data successfully cleaned")
     print("--- Cleaning Data ---")
 
+    # Inline anomaly check
+    alerts, anomalous_ids = [], []
+    if ENV.get("INLINE_ANOMALY_CHECK") == "true":
+        state_path = get_shard_state_path(STATE_PATH, shard_index, shard_count)
+        with metrics.timer("inline_check"):
+            alerts, anomalous_ids = check_readings(cleaned_data, state_path)
+        metrics.increment("inline_check_alerts_total", len(alerts))
+        logging.info("Inline anomaly check raised %d alerts", len(alerts))
+
+    if scheduler is not None:
+        # Anomaly state, not alerts sent, which the cooldown holds back
+        scheduler.record(plant_ids, cleaned_data, anomalous_ids)
+        save_scheduler(scheduler, schedule_path)
+        metrics.set_gauge("scheduler_mean_interval_seconds", scheduler.mean_interval())
+
+    if not cleaned_data:
+        logging.info("No readings to load")
+        return {'plants': len(plant_ids), 'extracted': 0, 'loaded': 0}
+
     # Connect
-    connection = get_database_connection(ENV)
+    with metrics.timer("connect"):
+        connection = get_database_connection(ENV)
     logging.info("Connected to the database")
     print("--- Connecting to Database ---")
 
     # Load
-    query_string = db_query_string(cleaned_data, connection)
-    db_inserting_data(query_string, connection)
+    with metrics.timer("load"):
+        query_string = db_query_string(cleaned_data, connection)
+        db_inserting_data(query_string, connection)
+    metrics.increment("load_rows_total", len(cleaned_data))
     logging.info("Data inserted into the database")
     print("--- Inserting into Database ---")
 
+    return {'plants': len(plant_ids), 'extracted': len(plant_data), 'loaded': len(cleaned_data)}
+
+
 if __name__ == "__main__":
     load_dotenv()
     logging.basicConfig(level=logging.INFO)
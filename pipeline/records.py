@@ -0,0 +1,81 @@
+'''The reading record passed from extract through transform to load.
+
+A slotted dataclass stores its fields in fixed slots instead of a per-object
+dict, and the botanist, plant and origin strings repeat on every reading of a
+plant, so they are interned to share one copy across readings and runs.'''
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from sys import intern
+
+LAST_WATERED_FORMAT = '%a, %d %b %Y %H:%M:%S %Z'
+# Every plant has its own last watered time, so the cache holds one per plant
+# for up to this many plants. Any fewer and a full run evicts each time before
+# it is read again.
+LAST_WATERED_CACHE_SIZE = 16_384
+
+
+def intern_optional(value: str | None) -> str | None:
+    """Interns a string, passing None through"""
+
+    return intern(value) if isinstance(value, str) else value
+
+
+@lru_cache(maxsize=LAST_WATERED_CACHE_SIZE)
+def parse_last_watered(last_watered: str) -> str:
+    """Returns an API last watered time as a database timestamp string. A plant's
+    last watered time repeats on every reading until it is next watered, so each
+    one is only parsed once."""
+
+    return str(datetime.strptime(last_watered, LAST_WATERED_FORMAT))
+
+
+@dataclass(slots=True)
+class Reading:
+    """One plant's reading as returned by the plants API"""
+
+    plant_id: int
+    name: str
+    soil_moisture: float
+    temperature: float
+    recording_taken: str
+    last_watered: str
+    botanist_name: str
+    botanist_email: str
+    botanist_phone: str
+    light_intensity: float | None = None
+    humidity: float | None = None
+    latitude: str | None = None
+    longitude: str | None = None
+    origin_location: tuple[str, ...] | None = None
+
+    @classmethod
+    def from_api(cls, plant_info: dict) -> 'Reading':
+        """Builds a reading from a plants API response"""
+
+        botanist = plant_info['botanist']
+        reading = cls(
+            plant_id=plant_info.get('plant_id'),
+            name=intern_optional(plant_info.get('name')),
+            soil_moisture=plant_info.get('soil_moisture'),
+            temperature=plant_info.get('temperature'),
+            recording_taken=plant_info.get('recording_taken'),
+            last_watered=intern_optional(plant_info.get('last_watered')),
+            botanist_name=intern(botanist['name']),
+            botanist_email=intern(botanist['email']),
+            botanist_phone=intern(botanist['phone']),
+            light_intensity=plant_info.get('light_intensity'),
+            humidity=plant_info.get('humidity'))
+
+        origin_location = plant_info.get('origin_location')
+        if origin_location is not None and len(origin_location) >= 3:
+            reading.latitude = intern_optional(origin_location[0])
+            reading.longitude = intern_optional(origin_location[1])
+            reading.origin_location = tuple(intern_optional(value)
+                                            for value in origin_location[-3:])
+        return reading
+
+    def get_values(self, metrics) -> dict[str, float]:
+        """Returns the given measurements by name"""
+
+        return {metric: getattr(self, metric) for metric in metrics}
@@ -0,0 +1,142 @@
+'''Decides which plants each pipeline run polls. Every plant has its own polling
+interval between a minimum and a maximum: plants whose readings are changing
+or anomalous are polled every run, and stable plants back off, doubling their
+interval each time a poll finds little change.'''
+import json
+import math
+import os
+import time
+
+from records import Reading
+
+MIN_INTERVAL = 60
+MAX_INTERVAL = 15 * 60
+STATE_PATH = '/tmp/poll_schedule.json'
+
+# Runs start a little early or late, so plants due this close to now are polled
+DUE_SLACK = 10
+# Changes between polls at least this large count as the plant changing
+CHANGE_TOLERANCE = {'soil_moisture': 2.0, 'temperature': 1.0}
+VOLATILITY_ALPHA = 0.3
+
+
+class PlantSchedule:
+    """When a plant is next due, its current interval in seconds, its last
+    readings and how much its readings have recently been changing, relative
+    to the change tolerance"""
+
+    __slots__ = ('next_due', 'interval', 'last_values', 'volatility')
+
+    def __init__(self, next_due: float = 0.0, interval: float = MIN_INTERVAL,
+                 last_values: dict = None, volatility: float = 0.0):
+        self.next_due = next_due
+        self.interval = interval
+        self.last_values = last_values or {}
+        self.volatility = volatility
+
+    def update(self, values: dict, now: float, anomalous: bool,
+               min_interval: float, max_interval: float) -> None:
+        """Sets the next poll time from a new reading"""
+
+        changes = [abs(values[metric] - self.last_values[metric]) / tolerance
+                   for metric, tolerance in CHANGE_TOLERANCE.items()
+                   if metric in self.last_values]
+        if changes:
+            self.volatility = (VOLATILITY_ALPHA * max(changes)
+                               + (1 - VOLATILITY_ALPHA) * self.volatility)
+        self.last_values = {metric: values[metric] for metric in CHANGE_TOLERANCE}
+
+        if anomalous or not changes or self.volatility >= 1:
+            self.interval = min_interval
+        else:
+            self.interval = min(self.interval * 2, max_interval,
+                                max(min_interval, min_interval / max(self.volatility, 1e-9)))
+        self.next_due = now + self.interval
+
+    def to_list(self) -> list:
+        """Returns the schedule in the order it is stored"""
+        return [self.next_due, self.interval, self.last_values, self.volatility]
+
+
+class PollScheduler:
+    """The schedules of every plant"""
+
+    def __init__(self, plants: dict = None, min_interval: float = MIN_INTERVAL,
+                 max_interval: float = MAX_INTERVAL):
+        self.plants = plants or {}
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+    def get_due(self, plant_ids, now: float = None) -> list[int]:
+        """Returns the plants due a poll, including any not seen before"""
+
+        now = now if now is not None else time.time()
+        return [plant_id for plant_id in plant_ids
+                if plant_id not in self.plants
+                or self.plants[plant_id].next_due <= now + DUE_SLACK]
+
+    def record(self, polled_ids, readings: list[Reading], anomalous_ids=(),
+               now: float = None) -> None:
+        """Updates the schedules of the polled plants from their cleaned readings.
+        Plants that were polled but returned no reading are retried after their
+        current interval."""
+
+        now = now if now is not None else time.time()
+        anomalous_ids = set(anomalous_ids)
+        readings_by_plant = {int(reading.plant_id): reading for reading in readings}
+        for plant_id in polled_ids:
+            schedule = self.plants.setdefault(plant_id, PlantSchedule())
+            reading = readings_by_plant.get(plant_id)
+            if reading is None:
+                schedule.next_due = now + schedule.interval
+            else:
+                schedule.update(reading.get_values(CHANGE_TOLERANCE), now,
+                                plant_id in anomalous_ids,
+                                self.min_interval, self.max_interval)
+
+    def mean_interval(self) -> float:
+        """Returns the mean interval of every scheduled plant"""
+
+        if not self.plants:
+            return math.nan
+        return sum(schedule.interval for schedule in self.plants.values()) / len(self.plants)
+
+    def to_json(self) -> str:
+        """Serialises the schedules"""
+
+        return json.dumps({str(plant_id): schedule.to_list()
+                           for plant_id, schedule in self.plants.items()})
+
+    @classmethod
+    def from_json(cls, text: str, **bounds) -> 'PollScheduler':
+        """Deserialises schedules"""
+
+        return cls({int(plant_id): PlantSchedule(*values)
+                    for plant_id, values in json.loads(text).items()}, **bounds)
+
+
+# One scheduler per state file, as a process may run different shards in turn
+_schedulers = {}
+
+
+def get_scheduler(config, path: str = STATE_PATH) -> PollScheduler:
+    """Returns the scheduler this process holds for a state file, loading it from the
+    file on first use, with its bounds from POLL_MIN_INTERVAL and POLL_MAX_INTERVAL
+    in seconds"""
+
+    if path not in _schedulers:
+        bounds = {'min_interval': float(config.get("POLL_MIN_INTERVAL", MIN_INTERVAL)),
+                  'max_interval': float(config.get("POLL_MAX_INTERVAL", MAX_INTERVAL))}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                _schedulers[path] = PollScheduler.from_json(file.read(), **bounds)
+        else:
+            _schedulers[path] = PollScheduler(**bounds)
+    return _schedulers[path]
+
+
+def save_scheduler(scheduler: PollScheduler, path: str = STATE_PATH) -> None:
+    """Saves the schedules for the next fresh process"""
+
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(scheduler.to_json())
@@ -0,0 +1,39 @@
+'''Splits the plant IDs across pipeline workers.
+
+Each plant is assigned to a shard by rendezvous hashing: every shard scores the
+plant and the highest score wins. Assignments only depend on the plant ID and
+the shard count, and changing the count only moves the plants the new or
+removed shards win or lose. Sharded runs are started by coordinator.py'''
+from hashlib import blake2b
+
+
+def score(plant_id: int, shard_index: int) -> int:
+    """Returns a shard's rendezvous score for a plant"""
+
+    digest = blake2b(f"{plant_id}:{shard_index}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def get_shard(plant_id: int, shard_count: int) -> int:
+    """Returns the index of the shard a plant belongs to"""
+
+    return max(range(shard_count), key=lambda shard_index: score(plant_id, shard_index))
+
+
+def get_shard_plant_ids(plant_ids, shard_index: int, shard_count: int) -> list[int]:
+    """Returns the plant IDs that belong to one shard"""
+
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(f"Shard {shard_index} is not one of {shard_count} shards")
+    if shard_count == 1:
+        return list(plant_ids)
+    return [plant_id for plant_id in plant_ids if get_shard(plant_id, shard_count) == shard_index]
+
+
+def get_shard_state_path(path: str, shard_index: int, shard_count: int) -> str:
+    """Returns a state file's path for one shard, so shards on the same host keep
+    separate state for their own plants"""
+
+    if shard_count == 1:
+        return path
+    return path.replace('.json', f'_{shard_index}.json')
@@ -0,0 +1,67 @@
+"""Tests the inline anomaly check run by the pipeline"""
+
+from inline_check import AlertGate, BaselineCache, InlineChecker, get_checker
+from records import Reading
+
+
+def make_reading(minute: int, soil_moisture: float, temperature: float = 12.0) -> Reading:
+    return Reading(plant_id=1, name='Corpse Flower', soil_moisture=soil_moisture,
+                   temperature=temperature, recording_taken=f"2024-04-16 12:{minute:02d}:00",
+                   last_watered='Mon, 15 Apr 2024 14:10:54 GMT',
+                   botanist_name='Carl Linnaeus', botanist_email='carl.linnaeus@lnhm.co.uk',
+                   botanist_phone='(146)994-1635x35992')
+
+
+def test_baseline_flags_a_spike_once_warmed_up():
+    baselines = BaselineCache()
+    for minute in range(20):
+        assert baselines.check(1, str(minute), {'soil_moisture': 30 + minute % 2,
+                                                'temperature': 12 + minute % 2}) == []
+    assert baselines.check(1, '20', {'soil_moisture': 60, 'temperature': 12.5}) == [
+        'soil_moisture']
+
+
+def test_baseline_skips_a_repeated_reading():
+    baselines = BaselineCache()
+    baselines.check(1, '2024-04-16 12:00:00', {'soil_moisture': 30, 'temperature': 12})
+    assert baselines.check(1, '2024-04-16 12:00:00',
+                           {'soil_moisture': 30, 'temperature': 12}) is None
+    assert baselines.get_baseline(1, 'soil_moisture')[0] == 1
+
+
+def test_alert_gate_cools_down():
+    gate = AlertGate(cooldown=60)
+    assert gate.allow(1, 'temperature', 0)
+    assert not gate.allow(1, 'temperature', 30)
+    assert gate.allow(1, 'soil_moisture', 30)
+    assert gate.allow(1, 'temperature', 61)
+
+
+def test_checker_alerts_once_per_cooldown_and_round_trips():
+    checker = InlineChecker()
+    for minute in range(20):
+        checker.run([make_reading(minute, 30 + minute % 2)], now=minute * 60)
+
+    first, first_anomalous = checker.run([make_reading(20, 60)], now=20 * 60)
+    second, second_anomalous = checker.run([make_reading(21, 90)], now=21 * 60)
+    assert [(a['plant_id'], a['metric']) for a in first] == [(1, 'soil_moisture')]
+    assert second == []
+    # Still anomalous while its alerts are cooling down
+    assert first_anomalous == second_anomalous == [1]
+
+    restored = InlineChecker.from_json(checker.to_json())
+    assert restored.baselines.plants == checker.baselines.plants
+    assert restored.gate.last_alerts == checker.gate.last_alerts
+
+
+def test_checker_stops_when_out_of_time():
+    checker = InlineChecker(budget=-1)
+    assert checker.run([make_reading(0, 30)]) == ([], [])
+    assert checker.baselines.plants == {}
+
+
+def test_checkers_are_kept_per_state_file(tmp_path):
+    first = get_checker(str(tmp_path / "inline_check_0.json"))
+    second = get_checker(str(tmp_path / "inline_check_1.json"))
+    assert first is not second
+    assert get_checker(str(tmp_path / "inline_check_0.json")) is first
@@ -0,0 +1,77 @@
+"""Tests the run metrics shared by the pipeline components"""
+
+import asyncio
+import csv
+
+import pytest
+
+from metrics import Metrics, get_metrics, start_run, timed
+
+
+def test_timer_records_durations_and_errors():
+    metrics = Metrics("test")
+    with metrics.timer("stage"):
+        pass
+    with pytest.raises(ValueError):
+        with metrics.timer("stage"):
+            raise ValueError
+    summary = metrics.to_dict()
+    assert summary['histograms']['stage_seconds']['count'] == 2
+    assert summary['counters']['stage_errors_total'] == 1
+
+
+def test_counters_are_kept_per_label():
+    metrics = Metrics("test")
+    metrics.increment("responses_total", status=200)
+    metrics.increment("responses_total", status=200)
+    metrics.increment("responses_total", status=404)
+    assert metrics.to_dict()['counters'] == {'responses_total{status="200"}': 2,
+                                             'responses_total{status="404"}': 1}
+
+
+def test_timed_records_into_the_current_run():
+    @timed("request")
+    async def request():
+        return 1
+
+    start_run("first")
+    asyncio.run(request())
+    metrics = start_run("second")
+    asyncio.run(request())
+    asyncio.run(request())
+    assert get_metrics() is metrics
+    assert metrics.to_dict()['histograms']['request_seconds']['count'] == 2
+
+
+def test_prometheus_histogram_buckets_are_cumulative():
+    metrics = Metrics("pipeline")
+    for value in (0.001, 0.02, 0.3, 100):
+        metrics.observe("request_seconds", value, status=200)
+    text = metrics.to_prometheus()
+    assert '# TYPE pipeline_request_seconds histogram' in text
+    assert 'pipeline_request_seconds_bucket{status="200",le="0.025"} 2' in text
+    assert 'pipeline_request_seconds_bucket{status="200",le="60"} 3' in text
+    assert 'pipeline_request_seconds_bucket{status="200",le="+Inf"} 4' in text
+    assert 'pipeline_request_seconds_count{status="200"} 4' in text
+
+
+def test_prometheus_type_lines_are_written_once_per_metric():
+    metrics = Metrics("pipeline")
+    metrics.increment("responses_total", status=200)
+    metrics.increment("responses_total", status=404)
+    metrics.observe("request_seconds", 0.1, status=200)
+    metrics.observe("request_seconds", 0.2, status=404)
+    lines = metrics.to_prometheus().splitlines()
+    assert lines.count('# TYPE pipeline_responses_total counter') == 1
+    assert lines.count('# TYPE pipeline_request_seconds histogram') == 1
+    assert 'pipeline_responses_total{status="404"} 1' in lines
+
+
+def test_emit_appends_csv_rows(tmp_path):
+    for _ in range(2):
+        metrics = Metrics("pipeline")
+        metrics.increment("rows_total", 50)
+        metrics.emit("csv", str(tmp_path))
+    with open(tmp_path / "pipeline.csv", encoding='utf-8') as file:
+        rows = [row for row in csv.DictReader(file) if row['metric'] == 'rows_total']
+    assert [row['value'] for row in rows] == ['50', '50']
@@ -0,0 +1,49 @@
+"""Tests the reading record built from API responses"""
+
+import json
+
+import pytest
+
+from records import Reading, parse_last_watered
+
+plant_test_data = {
+    "botanist": {
+        "email": "carl.linnaeus@lnhm.co.uk",
+        "name": "Carl Linnaeus",
+        "phone": "(146)994-1635x35992"
+    },
+    "last_watered": "Mon, 15 Apr 2024 14:10:54 GMT",
+    "name": "Corpse flower",
+    "origin_location": [
+        "7.65649",
+        "4.92235",
+        "Efon-Alaaye",
+        "NG",
+        "Africa/Lagos"
+    ],
+    "plant_id": 2,
+    "recording_taken": "2024-04-16 12:21:22",
+    "soil_moisture": 27.36278335759782,
+    "temperature": 9.117554081392257
+}
+
+
+def test_reading_from_api():
+    reading = Reading.from_api(plant_test_data)
+    assert reading.plant_id == 2
+    assert reading.soil_moisture == pytest.approx(27.3628)
+    assert reading.origin_location == ('Efon-Alaaye', 'NG', 'Africa/Lagos')
+    assert reading.latitude == '7.65649'
+    assert reading.humidity is None
+    assert not hasattr(reading, '__dict__')
+
+
+def test_reading_strings_are_shared_between_readings():
+    first = Reading.from_api(json.loads(json.dumps(plant_test_data)))
+    second = Reading.from_api(json.loads(json.dumps(plant_test_data)))
+    assert first.botanist_email is second.botanist_email
+    assert first.origin_location[2] is second.origin_location[2]
+
+
+def test_parse_last_watered():
+    assert parse_last_watered("Mon, 15 Apr 2024 14:10:54 GMT") == "2024-04-15 14:10:54"
@@ -0,0 +1,62 @@
+"""Tests the adaptive polling scheduler"""
+
+from records import Reading
+from scheduler import PollScheduler, get_scheduler
+
+
+def make_reading(plant_id: int, soil_moisture: float, temperature: float = 12.0) -> Reading:
+    return Reading(plant_id=plant_id, name='Corpse Flower', soil_moisture=soil_moisture,
+                   temperature=temperature, recording_taken='2024-04-16 12:21:22',
+                   last_watered='Mon, 15 Apr 2024 14:10:54 GMT',
+                   botanist_name='Carl Linnaeus', botanist_email='carl.linnaeus@lnhm.co.uk',
+                   botanist_phone='(146)994-1635x35992')
+
+
+def test_new_plants_are_due_at_once():
+    scheduler = PollScheduler()
+    assert scheduler.get_due([1, 2, 3], now=0) == [1, 2, 3]
+
+
+def test_stable_plants_back_off_up_to_the_maximum():
+    scheduler = PollScheduler(min_interval=60, max_interval=300)
+    now = 0
+    intervals = []
+    for _ in range(8):
+        scheduler.record([1], [make_reading(1, 30.0)], now=now)
+        intervals.append(scheduler.plants[1].interval)
+        now = scheduler.plants[1].next_due
+    assert intervals == [60, 120, 240, 300, 300, 300, 300, 300]
+    assert scheduler.get_due([1], now=now - 60) == []
+    assert scheduler.get_due([1], now=now) == [1]
+
+
+def test_changing_and_anomalous_plants_are_polled_at_the_minimum():
+    scheduler = PollScheduler(min_interval=60, max_interval=900)
+    for minute in range(6):
+        scheduler.record([1, 2], [make_reading(1, 30.0), make_reading(2, 30.0)],
+                         now=minute * 60)
+    assert scheduler.plants[1].interval > 60
+
+    scheduler.record([1, 2], [make_reading(1, 30.0), make_reading(2, 45.0)], now=400)
+    assert scheduler.plants[2].interval == 60
+    scheduler.record([1], [make_reading(1, 30.0)], anomalous_ids=[1], now=400)
+    assert scheduler.plants[1].interval == 60
+
+
+def test_missing_readings_keep_the_interval_and_state_round_trips():
+    scheduler = PollScheduler(min_interval=60, max_interval=900)
+    scheduler.record([1], [make_reading(1, 30.0)], now=0)
+    scheduler.record([1], [make_reading(1, 30.0)], now=60)
+    scheduler.record([1], [], now=180)
+    assert scheduler.plants[1].next_due == 180 + scheduler.plants[1].interval
+
+    restored = PollScheduler.from_json(scheduler.to_json(), max_interval=900)
+    assert restored.get_due([1, 2], now=200) == [2]
+    assert restored.plants[1].last_values == {'soil_moisture': 30.0, 'temperature': 12.0}
+
+
+def test_schedulers_are_kept_per_state_file(tmp_path):
+    first = get_scheduler({}, str(tmp_path / "poll_schedule_0.json"))
+    second = get_scheduler({}, str(tmp_path / "poll_schedule_1.json"))
+    assert first is not second
+    assert get_scheduler({}, str(tmp_path / "poll_schedule_0.json")) is first
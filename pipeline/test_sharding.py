@@ -0,0 +1,46 @@
+"""Tests assigning plants to shards and coordinating a sharded run"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from coordinator import coordinate
+from sharding import get_shard, get_shard_plant_ids
+
+PLANT_IDS = range(1, 2001)
+
+
+def test_shards_cover_every_plant_once_and_are_balanced():
+    shards = [get_shard_plant_ids(PLANT_IDS, index, 4) for index in range(4)]
+    assert sorted(plant_id for shard in shards for plant_id in shard) == list(PLANT_IDS)
+    assert all(400 < len(shard) < 600 for shard in shards)
+
+
+def test_adding_a_shard_only_moves_plants_to_it():
+    moved = [plant_id for plant_id in PLANT_IDS
+             if get_shard(plant_id, 4) != get_shard(plant_id, 5)]
+    assert all(get_shard(plant_id, 5) == 4 for plant_id in moved)
+    assert 300 < len(moved) < 500
+
+
+def test_unknown_shard_is_rejected():
+    with pytest.raises(ValueError):
+        get_shard_plant_ids(PLANT_IDS, 4, 4)
+
+
+def fake_shard(shard_index, shard_count):
+    if shard_index == 2:
+        raise ConnectionError("API unavailable")
+    time.sleep(0.3 if shard_index == 3 else 0.05)
+    plants = len(get_shard_plant_ids(PLANT_IDS, shard_index, shard_count))
+    return {'plants': plants, 'extracted': plants, 'loaded': plants}
+
+
+def test_coordinator_reports_failures_and_stragglers():
+    summary = coordinate(5, fake_shard, ThreadPoolExecutor)
+    assert summary['completed'] == 4
+    assert summary['failed'] == [2]
+    assert summary['slowest_shard'] == 3
+    assert summary['stragglers'] == [3]
+    assert summary['loaded'] == len(PLANT_IDS) - len(get_shard_plant_ids(PLANT_IDS, 2, 5))
@@ -0,0 +1,16 @@
+'''When the archive Lambda moves readings from the database to S3, for the
+components that read both. It is kept once in shared/ and linked into each
+component like metrics.py.
+
+The archive runs once a day and exports the rows recorded more than 24 hours
+before it runs, so a reading stays in the database until the first run after
+it turns 24 hours old: up to ARCHIVE_LAG + ARCHIVE_INTERVAL after it was
+recorded. Archive file names are in London time, so allow an hour either side
+of UTC.'''
+from datetime import timedelta
+
+ARCHIVE_LAG = timedelta(hours=24)
+ARCHIVE_INTERVAL = timedelta(hours=24)
+TIMEZONE_MARGIN = timedelta(hours=1)
+# Time allowed for a late or slow archive run
+ARCHIVE_RUN_MARGIN = timedelta(hours=2)
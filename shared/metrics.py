@@ -0,0 +1,217 @@
+'''Timers, counters and histograms for one run of a pipeline component, printed as
+one JSON line at the end of the run and optionally exported for Prometheus or as
+CSV. It is kept once in shared/ and linked into each component; the component
+images copy it in from a shared build context:
+docker build --build-context shared=../shared .'''
+import csv
+import functools
+import inspect
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+PROMETHEUS_EXPORT = "prometheus"
+CSV_EXPORT = "csv"
+METRICS_DIRECTORY = "/tmp/metrics"
+
+# Upper bounds in seconds of the buckets that timings are counted in
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PERCENTILES = (50, 95, 99)
+
+
+def get_key(name: str, labels: dict) -> tuple:
+    """Returns the key a metric is stored under"""
+    return (name, tuple(sorted((key, str(value)) for key, value in labels.items())))
+
+
+def format_labels(labels: tuple) -> str:
+    """Formats a metric's labels as Prometheus does, e.g. {status="200"}"""
+
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """Returns the nearest-rank percentile of a sorted list"""
+
+    index = max(0, min(len(values) - 1, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+def summarise(values: list[float]) -> dict:
+    """Returns the count, sum, extremes and percentiles of histogram values"""
+
+    ordered = sorted(values)
+    summary = {'count': len(ordered), 'sum': sum(ordered),
+               'min': ordered[0], 'max': ordered[-1]}
+    summary.update({f"p{percent}": percentile(ordered, percent) for percent in PERCENTILES})
+    return summary
+
+
+class Metrics:
+    """The metrics recorded during one run of a component"""
+
+    def __init__(self, component: str):
+        self.component = component
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started_at = datetime.now(timezone.utc)
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        """Adds to a counter"""
+
+        key = get_key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        """Records the latest value of a measurement"""
+        self.gauges[get_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Adds a value to a histogram"""
+        self.histograms.setdefault(get_key(name, labels), []).append(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Times the enclosed block into the histogram name_seconds, counting the
+        errors it raises in name_errors_total"""
+
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.increment(f"{name}_errors_total", **labels)
+            raise
+        finally:
+            self.observe(f"{name}_seconds", time.perf_counter() - start, **labels)
+
+    def to_dict(self) -> dict:
+        """Returns every metric of the run"""
+
+        def name_of(key):
+            return key[0] + format_labels(key[1])
+
+        return {
+            'component': self.component,
+            'run_id': self.run_id,
+            'started_at': self.started_at.isoformat(),
+            'duration_seconds': (datetime.now(timezone.utc) - self.started_at).total_seconds(),
+            'counters': {name_of(key): value for key, value in self.counters.items()},
+            'gauges': {name_of(key): value for key, value in self.gauges.items()},
+            'histograms': {name_of(key): summarise(values)
+                           for key, values in self.histograms.items()}
+        }
+
+    def to_prometheus(self) -> str:
+        """Returns the metrics in the Prometheus text exposition format, with one
+        TYPE line per metric followed by the samples of each of its label sets"""
+
+        lines = []
+        for kind, metrics in (('counter', self.counters), ('gauge', self.gauges)):
+            previous = None
+            for (name, labels), value in sorted(metrics.items()):
+                full_name = f"{self.component}_{name}"
+                if name != previous:
+                    lines.append(f"# TYPE {full_name} {kind}")
+                    previous = name
+                lines.append(f"{full_name}{format_labels(labels)} {value}")
+
+        previous = None
+        for (name, labels), values in sorted(self.histograms.items()):
+            full_name = f"{self.component}_{name}"
+            if name != previous:
+                lines.append(f"# TYPE {full_name} histogram")
+                previous = name
+            for bound in BUCKETS:
+                count = sum(value <= bound for value in values)
+                lines.append(f"{full_name}_bucket"
+                             f"{format_labels(labels + (('le', str(bound)),))} {count}")
+            lines.append(f"{full_name}_bucket{format_labels(labels + (('le', '+Inf'),))} "
+                         f"{len(values)}")
+            lines.append(f"{full_name}_sum{format_labels(labels)} {sum(values)}")
+            lines.append(f"{full_name}_count{format_labels(labels)} {len(values)}")
+        return "\n".join(lines) + "\n"
+
+    def to_rows(self) -> list[dict]:
+        """Returns one row per metric statistic, for CSV export"""
+
+        metrics = self.to_dict()
+        common = {'run_id': self.run_id, 'started_at': metrics['started_at'],
+                  'component': self.component}
+        rows = [{**common, 'metric': 'duration_seconds', 'statistic': 'value',
+                 'value': metrics['duration_seconds']}]
+        for kind in ('counters', 'gauges'):
+            rows.extend({**common, 'metric': name, 'statistic': 'value', 'value': value}
+                        for name, value in metrics[kind].items())
+        for name, summary in metrics['histograms'].items():
+            rows.extend({**common, 'metric': name, 'statistic': statistic, 'value': value}
+                        for statistic, value in summary.items())
+        return rows
+
+    def emit(self, export: str = None, directory: str = METRICS_DIRECTORY) -> dict:
+        """Prints the run's metrics as one JSON line and exports them in the format
+        named by export, or METRICS_EXPORT. Returns the metrics."""
+
+        metrics = self.to_dict()
+        print(json.dumps({'metrics': metrics}, default=str), flush=True)
+
+        export = export or os.environ.get("METRICS_EXPORT")
+        if export == PROMETHEUS_EXPORT:
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f"{self.component}.prom"), 'w',
+                      encoding='utf-8') as file:
+                file.write(self.to_prometheus())
+        elif export == CSV_EXPORT:
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"{self.component}.csv")
+            write_header = not os.path.exists(path)
+            with open(path, 'a', newline='', encoding='utf-8') as file:
+                writer = csv.DictWriter(file, fieldnames=['run_id', 'started_at', 'component',
+                                                          'metric', 'statistic', 'value'])
+                if write_header:
+                    writer.writeheader()
+                writer.writerows(self.to_rows())
+        return metrics
+
+
+_metrics = Metrics("default")
+
+
+def start_run(component: str) -> Metrics:
+    """Starts recording the metrics of a new run, discarding any from a previous
+    run in the same process"""
+
+    global _metrics
+    _metrics = Metrics(component)
+    return _metrics
+
+
+def get_metrics() -> Metrics:
+    """Returns the metrics of the current run"""
+    return _metrics
+
+
+def timed(name: str, **labels):
+    """Decorator that times every call of a function, or coroutine function, into
+    the metrics of the run in progress when it is called"""
+
+    def decorator(function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with get_metrics().timer(name, **labels):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with get_metrics().timer(name, **labels):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
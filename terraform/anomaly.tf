@@ -40,6 +40,7 @@ resource "aws_lambda_function" "anomaly_lambda_function" {
       DB_HOST=var.DB_HOST
       DB_PORT=var.DB_PORT
       DB_NAME=var.DB_NAME
+      ANOMALY_MODE="sql"
     }
   }
 }